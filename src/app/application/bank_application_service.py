@@ -1,8 +1,15 @@
 # bank_actions.py
 
 from app.infra.logger_adapter import logger
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from app.domain.account_aggregates import AccountAggregates, month_key
+from app.domain.ledger import Ledger, to_cents
+from app.domain.transaction_store import TransactionPage, TransactionStore
+from app.infra.ledger_journal import JournalError, LedgerJournal, OpenAccountEvent, TransferEvent
 
 @dataclass
 class Transaction:
@@ -10,77 +17,317 @@ class Transaction:
     to: str
     amount: float
     from_account: str
+    timestamp: float = field(default_factory=time.time)
 
 @dataclass
 class Account:
     balance: float
     transactions: List[Transaction]
 
+# Simulated in-memory accounts
+SEED_ACCOUNTS: Dict[str, Dict[str, float]] = {
+    "rodrigo.barreiros": {
+        "corrente": 1500.0,
+        "savings": 3000.0
+    }
+}
+
+def transaction_journal() -> TransactionStore:
+    """Journal for ledger accounts: columnar history materialized as `Transaction` rows."""
+    return TransactionStore(row_factory=Transaction)
+
 class BankApplicationService:
-    def __init__(self):
-        # Simulated in-memory accounts
-        self._accounts: Dict[str, Dict[str, Account]] = {
-            "rodrigo.barreiros": {
-                "corrente": Account(balance=1500.0, transactions=[]),
-                "savings": Account(balance=3000.0, transactions=[])
-            }
-        }
+    def __init__(
+        self,
+        ledger: Optional[Ledger] = None,
+        journal: Optional[LedgerJournal] = None,
+        snapshot_every: int = 0
+    ):
+        # Balances live in the ledger, keyed by (user_id, account_type); a shared
+        # ledger must be built with Ledger(journal_factory=transaction_journal)
+        self.ledger = ledger or Ledger(journal_factory=transaction_journal)
+        # With a journal every account opening and transfer is durable before it is
+        # reported (a transfer whose commit fails is undone), and a snapshot is taken
+        # every `snapshot_every` transfers (0: never)
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        self._accounts: Dict[str, List[str]] = {}
+        # Totals kept up to date on every transfer, so summaries never scan history
+        self._aggregates: Dict[Tuple[str, str], AccountAggregates] = {}
+        self._snapshot_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._transfers_since_snapshot = 0
+        if journal is not None:
+            self._recover()
+        for user_id, accounts in SEED_ACCOUNTS.items():
+            for account_type, balance in accounts.items():
+                self.open_account(user_id, account_type, balance)
+
+    def open_account(self, user_id: str, account_type: str, balance: float = 0.0) -> None:
+        """Register an account, opening it in the ledger unless it already exists there."""
+        key = (user_id, account_type)
+        if not self.ledger.has_account(key):
+            if self.journal is not None:
+                self.journal.commit(self.journal.append(OpenAccountEvent(user_id, account_type, to_cents(balance))))
+            self.ledger.open_account(key, balance)
+        self._register(key)
 
     def get_balance(self, user_id: str, account_type: str) -> Tuple[Optional[float], str]:
         """Get the balance for a specific account type and return both the balance and response message."""
-        user_accounts = self._accounts.get(user_id)
-        if not user_accounts:
-            return None, "Usuário não encontrado."
-        
-        account = user_accounts.get(account_type)
-        if not account:
-            return None, f"Tipo de conta '{account_type}' não encontrado."
-        
-        return account.balance, f"O saldo da sua conta {account_type} é R$ {account.balance:.2f}."
+        error = self._check_account(user_id, account_type)
+        if error:
+            return None, error
+
+        balance = self.ledger.balance((user_id, account_type))
+        return balance, f"O saldo da sua conta {account_type} é R$ {balance:.2f}."
 
     def transfer(self, user_id: str, from_account: str, to_recipient: str, amount: float) -> Tuple[bool, str]:
         """Transfer money from one account to a recipient and return both success status and response message."""
-        user_accounts = self._accounts.get(user_id)
-        if not user_accounts:
-            return False, "Usuário não encontrado."
-
-        account = user_accounts.get(from_account)
-        if not account:
-            return False, f"Tipo de conta '{from_account}' não encontrado."
-            
-        if account.balance < amount:
-            return False, "Saldo insuficiente para realizar a transferência."
+        error = self._check_account(user_id, from_account)
+        if error:
+            return False, error
+        # Entities may carry the amount as text; the ledger works in whole cents
+        try:
+            cents = to_cents(amount)
+        except (TypeError, ValueError, ArithmeticError):
+            return False, "O valor da transferência é inválido."
+        if cents <= 0:
+            return False, "O valor da transferência deve ser positivo."
+        amount = cents / 100
 
-        # Perform transfer
-        account.balance -= amount
-        account.transactions.append(
-            Transaction(
-                type="transferência",
-                to=to_recipient,
-                amount=amount,
-                from_account=from_account
-            )
-        )
+        try:
+            debited = self._debit((user_id, from_account), to_recipient, amount)
+        except JournalError as e:
+            logger.error(f"Transfer from {(user_id, from_account)} not recorded: {e}")
+            return False, "Não foi possível registrar a transferência. Tente novamente mais tarde."
+        if not debited:
+            return False, "Saldo insuficiente para realizar a transferência."
+        if self.journal is not None:
+            try:
+                self._maybe_snapshot()
+            except JournalError as e:
+                # The transfer itself is durable; only the snapshot is missing
+                logger.error(f"Ledger snapshot failed: {e}")
         return True, f"Transferido R$ {amount:.2f} para {to_recipient} da sua conta {from_account}."
 
-    def get_transactions(self, user_id: str, account_type: str) -> Tuple[List[Transaction], str]:
-        """Get transaction history for a specific account and return both transactions and response message."""
-        user_accounts = self._accounts.get(user_id)
-        if not user_accounts:
-            return [], "Usuário não encontrado."
+    def _debit(
+        self,
+        key: Tuple[str, str],
+        recipient: str,
+        amount: float,
+        timestamp: Optional[float] = None,
+        log: bool = True
+    ) -> bool:
+        """Debit the account; returns False if the balance is insufficient.
+
+        When logged, the debit is undone and `JournalError` raised if the
+        journal cannot make it durable.
+        """
+        transaction = Transaction(type="transferência", to=recipient, amount=amount, from_account=key[1])
+        if timestamp is not None:
+            transaction.timestamp = timestamp
+        cents = to_cents(amount)
+        aggregates, history = self._aggregates[key], self.ledger.journal(key)
+        seq, stored_at = None, None
 
-        account = user_accounts.get(account_type)
-        if not account:
-            return [], f"Tipo de conta '{account_type}' não encontrado."
+        def on_commit():
+            # Balance check, debit, record, journal append and aggregates happen atomically
+            # under the account lock; the history may have clamped the timestamp, so use the
+            # stored one. The append only buffers the record: the fsync waits below, after
+            # the lock is released, so other transfers can share it.
+            nonlocal seq, stored_at
+            stored_at = history.last_timestamp
+            if log and self.journal is not None:
+                seq = self.journal.append(TransferEvent(key[0], key[1], recipient, cents, stored_at))
+            aggregates.record(cents, recipient, stored_at)
 
-        if not account.transactions:
-            return [], "Você não tem transações recentes."
+        if not self.ledger.transfer(key, amount, entry=transaction, on_commit=on_commit):
+            return False
+        if seq is not None:
+            try:
+                self.journal.commit(seq)
+            except JournalError:
+                # The journal stops at its first failed write, so every debit recorded on
+                # this account after this one fails too and is undone the same way
+                self.ledger.revert(key, amount, pop_entry=True, on_revert=lambda: aggregates.unrecord(cents, recipient, stored_at))
+                raise
+        return True
+
+    def get_transactions(
+        self,
+        user_id: str,
+        account_type: str,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Tuple[List[Transaction], str]:
+        """Get transaction history for a specific account and return both transactions and response message.
+
+        `limit` keeps only the latest transactions, `start`/`end` (epoch
+        seconds) restrict the period and `cursor` continues from an earlier
+        page; only the returned rows are materialized. Use
+        `get_transactions_page` to get the cursor of the next page.
+        """
+        page, message = self.get_transactions_page(user_id, account_type, limit, cursor, start, end)
+        return page.transactions, message
+
+    def get_transactions_page(
+        self,
+        user_id: str,
+        account_type: str,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Tuple[TransactionPage, str]:
+        """Like `get_transactions`, returning the page with its `next_cursor` (None on the oldest page) and the response message."""
+        error = self._check_account(user_id, account_type)
+        if error:
+            return TransactionPage([], None), error
+
+        page = self.ledger.journal((user_id, account_type)).query(limit=limit, cursor=cursor, start=start, end=end)
+        if not page.transactions:
+            return page, "Você não tem transações recentes."
 
         transactions_text = "Suas transações recentes:\n" + "\n".join(
             f"- {t.type} para {t.to} (R$ {t.amount:.2f}) da conta {t.from_account}"
-            for t in account.transactions
+            for t in page.transactions
         )
-        return account.transactions, transactions_text
+        return page, transactions_text
+
+    def get_summary(
+        self,
+        user_id: str,
+        account_type: str,
+        month: Optional[str] = None,
+        top: int = 3
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Get outflow totals and top recipients from the running aggregates and return both the summary and response message.
+
+        `month` is "YYYY-MM" and defaults to the current month.
+        """
+        error = self._check_account(user_id, account_type)
+        if error:
+            return None, error
+
+        month = month or month_key(time.time())
+        key = (user_id, account_type)
+        summary = self.ledger.inspect(key, lambda balance, journal: self._aggregates[key].summary(month, top))
+        message = f"Em {month} você transferiu R$ {summary['month_outflow']:.2f} da sua conta {account_type}."
+        if summary["top_recipients"]:
+            message += " Principais destinatários: " + ", ".join(
+                f"{recipient} (R$ {total:.2f})" for recipient, total in summary["top_recipients"]
+            ) + "."
+        return summary, message
+
+    def check_aggregates(self, user_id: str, account_type: str) -> Tuple[bool, str]:
+        """Rebuild an account's aggregates from the raw ledger and compare them with the running ones.
+
+        On a mismatch the rebuilt aggregates replace the running ones.
+        """
+        error = self._check_account(user_id, account_type)
+        if error:
+            return False, error
+
+        key = (user_id, account_type)
+
+        def compare(balance: float, journal: Any) -> bool:
+            rebuilt = AccountAggregates.rebuild(balance, journal)
+            if rebuilt.snapshot() == self._aggregates[key].snapshot():
+                return True
+            self._aggregates[key] = rebuilt
+            return False
+
+        if self.ledger.inspect(key, compare):
+            return True, "Agregados consistentes com o histórico."
+        logger.warning(f"Aggregates for {key} diverged from the ledger; rebuilt.")
+        return False, "Agregados divergentes; reconstruídos a partir do histórico."
+
+    def snapshot(self) -> None:
+        """Write a snapshot of every account, so a restart only replays journal entries made after it."""
+        if self.journal is None:
+            raise ValueError("Snapshots need a journal.")
+
+        def capture(accounts: Dict[Any, Tuple[float, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+            # With every account locked no transfer can start, and rotate first makes the ones
+            # still waiting for their commit durable, so the new segment starts exactly here
+            segment = self.journal.rotate()
+            captured = []
+            for (user_id, account_type), (balance, history) in accounts.items():
+                strings, columns = history.dump()
+                captured.append({
+                    "user_id": user_id,
+                    "account_type": account_type,
+                    "balance_cents": to_cents(balance),
+                    "aggregates": self._aggregates[(user_id, account_type)].snapshot(),
+                    "strings": strings,
+                    "columns": columns
+                })
+            return segment, captured
+
+        with self._snapshot_lock:
+            segment, accounts = self.ledger.inspect_all(capture)
+            self.journal.write_snapshot(segment, accounts)
+        logger.info(f"Ledger snapshot written: {len(accounts)} accounts, journal segment {segment}.")
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+
+    def _maybe_snapshot(self) -> None:
+        if not self.snapshot_every:
+            return
+        # Counted under its own lock, so transfers never wait for a snapshot being written
+        with self._counter_lock:
+            self._transfers_since_snapshot += 1
+            due = self._transfers_since_snapshot >= self.snapshot_every
+            if due:
+                self._transfers_since_snapshot = 0
+        if due:
+            self.snapshot()
+
+    def _recover(self) -> None:
+        """Load the latest snapshot and replay the journal written after it."""
+        loaded = self.journal.load_snapshot()
+        segment = 0
+        if loaded is not None:
+            segment, accounts = loaded
+            for account in accounts:
+                key = (account["user_id"], account["account_type"])
+                history = transaction_journal()
+                history.restore(account["strings"], account["columns"])
+                self.ledger.open_account(key, Decimal(account["balance_cents"]).scaleb(-2), journal=history)
+                self._aggregates[key] = AccountAggregates.from_snapshot(account["aggregates"])
+                self._register(key)
+
+        replayed = 0
+        for event in self.journal.replay(segment):
+            key = (event.user_id, event.account_type)
+            if isinstance(event, OpenAccountEvent):
+                if not self.ledger.has_account(key):
+                    self.ledger.open_account(key, Decimal(event.balance_cents).scaleb(-2))
+                self._register(key)
+            elif not self._debit(key, event.recipient, event.amount_cents / 100, event.timestamp, log=False):
+                logger.warning(f"Journaled transfer from {key} no longer fits the balance; skipped.")
+            replayed += 1
+        logger.info(f"Ledger recovered: snapshot segment {segment}, {replayed} journal events replayed.")
+
+    def _register(self, key: Tuple[str, str]) -> None:
+        if key not in self._aggregates:
+            self._aggregates[key] = self.ledger.inspect(key, AccountAggregates.rebuild)
+        user_id, account_type = key
+        account_types = self._accounts.setdefault(user_id, [])
+        if account_type not in account_types:
+            account_types.append(account_type)
+
+    def _check_account(self, user_id: str, account_type: str) -> Optional[str]:
+        account_types = self._accounts.get(user_id)
+        if not account_types:
+            return "Usuário não encontrado."
+        if account_type not in account_types:
+            return f"Tipo de conta '{account_type}' não encontrado."
+        return None
 
     def get_help(self) -> str:
         """Get help message about available operations."""
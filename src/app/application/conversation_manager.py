@@ -1,9 +1,24 @@
-from typing import Dict, Any, Tuple, Optional
+import asyncio
+from typing import Dict, Any, Tuple, Optional, Protocol
 from app.domain.intent_service import IntentService
 from app.domain.user_session import UserSession
 from app.domain.default_entity_manager import DefaultEntityManager
 from app.application.intent_handler import IntentHandler
 
+# Answers that decline a pending transfer; anything else confirms it
+_DECLINE_ANSWERS = {"não", "nao", "n", "cancelar", "cancela"}
+
+
+class SessionStore(Protocol):
+    """Persists sessions; `flush` writes the turn's changes in one go."""
+
+    def save_session(self, session: UserSession) -> None:
+        ...
+
+    def flush(self) -> int:
+        ...
+
+
 class ConversationManager:
     def __init__(
         self,
@@ -11,13 +26,15 @@ class ConversationManager:
         default_entity_manager: DefaultEntityManager,
         intent_handler: IntentHandler,
         assistant_name: str,
-        intent_service: Optional[IntentService] = None
+        intent_service: Optional[IntentService] = None,
+        session_store: Optional[SessionStore] = None
     ):
         self.user_session = user_session
         self.default_entity_manager = default_entity_manager
         self.intent_handler = intent_handler
         self.assistant_name = assistant_name
         self.intent_service = intent_service or IntentService()
+        self.session_store = session_store
 
     def process_message(self, message: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """
@@ -26,6 +43,36 @@ class ConversationManager:
         - Optional[str]: message type (error, info, warning, or None)
         - Optional[str]: message content
         """
+        early_response = self._start_turn(message)
+        if early_response is not None:
+            return self._end_turn(early_response)
+
+        result = self.intent_service.process_message(
+            self.user_session.user_id,
+            self.user_session.history,
+            message
+        )
+        return self._end_turn(self._finish_turn(result))
+
+    async def aprocess_message(self, message: str) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Async variant of `process_message`; awaits intent detection so many sessions can share one event loop.
+
+        The bank calls may wait for the ledger journal's fsync, so the steps
+        that make them run in a worker thread instead of on the loop.
+        """
+        early_response = await asyncio.to_thread(self._start_turn, message)
+        if early_response is not None:
+            return self._end_turn(early_response)
+
+        result = await self.intent_service.aprocess_message(
+            self.user_session.user_id,
+            self.user_session.history,
+            message
+        )
+        return self._end_turn(await asyncio.to_thread(self._finish_turn, result))
+
+    def _start_turn(self, message: str) -> Optional[Tuple[bool, Optional[str], Optional[str]]]:
+        """Record the message and answer turns that need no intent detection."""
         self.user_session.add_to_history(f"{self.user_session.user_name}: {message}")
         
         if message.lower() in {"exit", "quit", "sair"}:
@@ -33,20 +80,20 @@ class ConversationManager:
 
         # Check if we're in a transfer confirmation flow
         if self.user_session.previous_result and self.user_session.previous_result.get("intent") == "transfer" and not self.user_session.previous_result.get("missing_entities"):
-            # Handle the confirmation response
-            success, msg_type, response = self.intent_handler.handle_transfer_confirmation(
-                self.user_session.previous_result.get("entities", {})
-            )
-            # Clear the previous result after handling confirmation
+            entities = self.user_session.previous_result.get("entities", {})
+            # Clear the previous result whatever the answer
             self.user_session.previous_result = {}
+            words = message.lower().replace(",", " ").replace(".", " ").split()
+            if words and words[0] in _DECLINE_ANSWERS:
+                return True, "info", "Transferência cancelada."
+            # Handle the confirmation response
+            success, msg_type, response = self.intent_handler.handle_transfer_confirmation(entities)
             return True, msg_type, response
 
-        result = self.intent_service.process_message(
-            self.user_session.user_id,
-            self.user_session.history,
-            message
-        )
+        return None
 
+    def _finish_turn(self, result: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Turn the detected intent into the response for the user."""
         if self._handle_previous_missing_entities(result):
             return True, None, None
 
@@ -81,6 +128,13 @@ class ConversationManager:
         
         return response_tuple
 
+    def _end_turn(self, response: Tuple[bool, Optional[str], Optional[str]]) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Persist the session and the turn's state changes together, if a store is configured."""
+        if self.session_store:
+            self.session_store.save_session(self.user_session)
+            self.session_store.flush()
+        return response
+
     def _handle_previous_missing_entities(self, result: Dict[str, Any]) -> bool:
         """Handle missing entities from previous result."""
         if self.user_session.previous_result.get("missing_entities"):
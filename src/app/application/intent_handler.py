@@ -1,16 +1,25 @@
 from typing import Dict, Any, Tuple, Optional
 from datetime import datetime, timedelta
+from app.domain.intent_classifier import normalize_text
 from app.domain.intent_service import IntentService
 from app.application.bank_application_service import BankApplicationService
 
+# Transactions listed when the user does not ask for a specific number
+DEFAULT_TRANSACTIONS_LIMIT = 10
+
+# Account names as users (and the intent tiers) say them, normalized, mapped to the bank's account keys
+ACCOUNT_ALIASES = {"poupanca": "savings", "conta poupanca": "savings", "conta corrente": "corrente"}
+
 class IntentHandler:
     def __init__(
         self,
         intent_service: IntentService,
-        user_id: str
+        user_id: str,
+        bank_service: Optional[BankApplicationService] = None
     ):
         self.intent_service = intent_service
-        self.bank_service = BankApplicationService()
+        # Share one service between handlers so every user sees the same ledger
+        self.bank_service = bank_service or BankApplicationService()
         self.user_id = user_id
 
     def handle_transaction(self, intent: str, entities: Dict[str, Any]) -> Tuple[str, str]:
@@ -28,7 +37,7 @@ class IntentHandler:
 
     def _handle_get_balance(self, entities: Dict[str, Any]) -> Tuple[str, str]:
         """Route balance inquiry to bank service."""
-        account_type = entities.get("account_type", "corrente")
+        account_type = self._account_type(entities)
         _, message = self.bank_service.get_balance(self.user_id, account_type)
         return "get_balance", message
 
@@ -45,8 +54,12 @@ class IntentHandler:
 
     def _handle_get_transactions(self, entities: Dict[str, Any]) -> Tuple[str, str]:
         """Route transaction history request to bank service."""
-        account_type = entities.get("account_type", "corrente")
-        _, message = self.bank_service.get_transactions(self.user_id, account_type)
+        account_type = self._account_type(entities)
+        try:
+            limit = max(1, int(entities.get("limit") or DEFAULT_TRANSACTIONS_LIMIT))
+        except (TypeError, ValueError):
+            limit = DEFAULT_TRANSACTIONS_LIMIT
+        _, message = self.bank_service.get_transactions(self.user_id, account_type, limit=limit)
         return "get_transactions", message
 
     def _handle_get_help(self) -> Tuple[str, str]:
@@ -67,14 +80,20 @@ class IntentHandler:
         if not entities.get("amount") or not entities.get("recipient"):
             return False, "error", "Dados da transferência incompletos."
 
-        transfer_successful = self.bank_service.transfer(
+        success, message = self.bank_service.transfer(
             self.user_id,
-            entities["amount"],
+            self._account_type(entities),
             entities["recipient"],
-            entities.get("account_type", "corrente")
+            entities["amount"]
         )
 
-        if transfer_successful:
-            return True, "success", f"Transferência de R${entities['amount']:.2f} para {entities['recipient']} realizada com sucesso!"
+        if success:
+            return True, "success", f"Transferência de R${float(entities['amount']):.2f} para {entities['recipient']} realizada com sucesso!"
         else:
-            return False, "error", "Não foi possível realizar a transferência. Verifique seu saldo e tente novamente." 
\ No newline at end of file
+            return False, "error", f"Não foi possível realizar a transferência. {message}" 
+
+    @staticmethod
+    def _account_type(entities: Dict[str, Any]) -> str:
+        """The bank's key for the account in the entities, "corrente" when none is given."""
+        account_type = entities.get("account_type", "corrente")
+        return ACCOUNT_ALIASES.get(normalize_text(str(account_type)), account_type)
@@ -0,0 +1,135 @@
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.domain.ledger import to_cents
+
+# (day start, next day start, day key, month key) of the last day looked up
+_last_day: Tuple[float, float, str, str] = (0.0, 0.0, "", "")
+
+
+def period_keys(timestamp: float) -> Tuple[str, str]:
+    """Local-calendar day ("YYYY-MM-DD") and month ("YYYY-MM") of a timestamp.
+
+    Consecutive transfers nearly always fall on the same day, so the last
+    day's bounds are cached and most lookups skip date formatting.
+    """
+    global _last_day
+    start, end, day, month = _last_day
+    if not start <= timestamp < end:
+        moment = datetime.fromtimestamp(timestamp)
+        midnight = datetime(moment.year, moment.month, moment.day)
+        day, month = midnight.strftime("%Y-%m-%d"), midnight.strftime("%Y-%m")
+        _last_day = (midnight.timestamp(), (midnight + timedelta(days=1)).timestamp(), day, month)
+    return day, month
+
+
+def day_key(timestamp: float) -> str:
+    return period_keys(timestamp)[0]
+
+
+def month_key(timestamp: float) -> str:
+    return period_keys(timestamp)[1]
+
+
+class AccountAggregates:
+    """Running totals of one account, updated in O(1) for every debit.
+
+    Keeps the running balance, outflow per day ("YYYY-MM-DD") and per month
+    ("YYYY-MM") and the total sent to each recipient, all in integer cents,
+    so summaries never scan the transaction history. Callers serialize
+    `record` (the ledger runs it under the account lock).
+    """
+
+    def __init__(self, opening_cents: int = 0):
+        self.opening_cents = opening_cents
+        self.balance_cents = opening_cents
+        self.outflow_cents = 0
+        self.count = 0
+        self.daily: Counter = Counter()
+        self.monthly: Counter = Counter()
+        self.recipients: Counter = Counter()
+
+    @classmethod
+    def rebuild(cls, balance: float, transactions: Iterable[Any]) -> "AccountAggregates":
+        """Recompute from scratch, given the current balance and every debit recorded so far."""
+        aggregates = cls()
+        for transaction in transactions:
+            aggregates.record(to_cents(transaction.amount), transaction.to, transaction.timestamp)
+        aggregates.balance_cents = to_cents(balance)
+        aggregates.opening_cents = aggregates.balance_cents + aggregates.outflow_cents
+        return aggregates
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "AccountAggregates":
+        """Inverse of `snapshot`."""
+        aggregates = cls(snapshot["opening_cents"])
+        aggregates.balance_cents = snapshot["balance_cents"]
+        aggregates.outflow_cents = snapshot["outflow_cents"]
+        aggregates.count = snapshot["count"]
+        aggregates.daily.update(snapshot["daily"])
+        aggregates.monthly.update(snapshot["monthly"])
+        aggregates.recipients.update(snapshot["recipients"])
+        return aggregates
+
+    def record(self, amount_cents: int, recipient: str, timestamp: float) -> None:
+        self.balance_cents -= amount_cents
+        self.outflow_cents += amount_cents
+        self.count += 1
+        day, month = period_keys(timestamp)
+        self.daily[day] += amount_cents
+        self.monthly[month] += amount_cents
+        self.recipients[recipient] += amount_cents
+
+    def unrecord(self, amount_cents: int, recipient: str, timestamp: float) -> None:
+        """Take back a `record`, for a debit that was undone."""
+        self.balance_cents += amount_cents
+        self.outflow_cents -= amount_cents
+        self.count -= 1
+        day, month = period_keys(timestamp)
+        self.daily[day] -= amount_cents
+        self.monthly[month] -= amount_cents
+        self.recipients[recipient] -= amount_cents
+        if not self.recipients[recipient]:
+            # Keep recipients that received nothing out of the top list
+            del self.recipients[recipient]
+
+    @property
+    def balance(self) -> float:
+        return self.balance_cents / 100
+
+    def day_total(self, day: str) -> float:
+        return self.daily[day] / 100
+
+    def month_total(self, month: str) -> float:
+        return self.monthly[month] / 100
+
+    def top_recipients(self, n: int = 3) -> List[Tuple[str, float]]:
+        """The `n` recipients that received the most, largest first."""
+        top = heapq.nlargest(n, self.recipients.items(), key=lambda item: item[1])
+        return [(recipient, cents / 100) for recipient, cents in top]
+
+    def summary(self, month: Optional[str] = None, top: int = 3) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "balance": self.balance,
+            "outflow": self.outflow_cents / 100,
+            "count": self.count,
+            "top_recipients": self.top_recipients(top)
+        }
+        if month is not None:
+            summary["month"] = month
+            summary["month_outflow"] = self.month_total(month)
+        return summary
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every total, for comparing two aggregates."""
+        return {
+            "opening_cents": self.opening_cents,
+            "balance_cents": self.balance_cents,
+            "outflow_cents": self.outflow_cents,
+            "count": self.count,
+            "daily": {key: value for key, value in self.daily.items() if value},
+            "monthly": {key: value for key, value in self.monthly.items() if value},
+            "recipients": {key: value for key, value in self.recipients.items() if value}
+        }
@@ -0,0 +1,120 @@
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# Speaker names seen so far, shared by every session; code 0 means "no speaker prefix"
+_speaker_names: List[str] = [""]
+_speaker_codes: Dict[str, int] = {"": 0}
+_speaker_lock = threading.Lock()
+
+
+def speaker_code(name: str) -> int:
+    """Small integer code for a speaker name, assigned on first sight."""
+    code = _speaker_codes.get(name)
+    if code is None:
+        with _speaker_lock:
+            code = _speaker_codes.get(name)
+            if code is None:
+                code = _speaker_codes[name] = len(_speaker_names)
+                _speaker_names.append(name)
+    return code
+
+
+class CompactHistory:
+    """Fixed-capacity ring buffer of "Name: message" lines.
+
+    The speaker is stored as a small integer code instead of a repeated
+    prefix and lines are rendered back to "Name: message" only when read.
+    Once `capacity` lines are held, each append overwrites the oldest one.
+
+    Indices are positions in the whole conversation, so `len()` keeps
+    counting every line ever appended and slices by absolute position work
+    the same way they do on a plain list; lines that fell out of the buffer
+    are simply missing from the result.
+    """
+
+    __slots__ = ("capacity", "_speakers", "_messages", "_total")
+
+    def __init__(self, capacity: int = 32, lines: Optional[List[str]] = None):
+        self.capacity = capacity
+        self._speakers = array("I", bytes(4 * capacity))
+        self._messages: List[Optional[str]] = [None] * capacity
+        self._total = 0
+        for line in lines or ():
+            self.append(line)
+
+    def append(self, line: str) -> None:
+        name, separator, message = line.partition(": ")
+        if not separator or not name or "\n" in name:
+            name, message = "", line
+        slot = self._total % self.capacity
+        self._speakers[slot] = speaker_code(name)
+        self._messages[slot] = message
+        self._total += 1
+
+    def extend(self, lines: List[str]) -> None:
+        for line in lines:
+            self.append(line)
+
+    @property
+    def first_index(self) -> int:
+        """Absolute index of the oldest line still held."""
+        return max(0, self._total - self.capacity)
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.first_index, self._total):
+            yield self._render(index)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._total)
+            first = self.first_index
+            return [self._render(index) for index in range(start, stop, step) if index >= first]
+        index = key + self._total if key < 0 else key
+        if not self.first_index <= index < self._total:
+            raise IndexError("history line no longer held")
+        return self._render(index)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, CompactHistory)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"CompactHistory({list(self)!r})"
+
+    def _render(self, index: int) -> str:
+        slot = index % self.capacity
+        name = _speaker_names[self._speakers[slot]]
+        message = self._messages[slot]
+        return f"{name}: {message}" if name else message
+
+
+class CompactUserSession:
+    """Memory-lean drop-in for `UserSession`: slotted, with a bounded ring-buffer history."""
+
+    __slots__ = ("user_id", "user_name", "account_number", "history", "previous_result")
+
+    def __init__(
+        self,
+        user_id: str,
+        user_name: str,
+        account_number: str,
+        history: Optional[List[str]] = None,
+        previous_result: Optional[Dict[str, Any]] = None,
+        history_capacity: int = 32
+    ):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.account_number = account_number
+        self.history = CompactHistory(history_capacity, history)
+        self.previous_result = previous_result or {}
+
+    def add_to_history(self, message: str):
+        self.history.append(message)
+
+    def clear_previous_result(self):
+        self.previous_result = {}
@@ -0,0 +1,131 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+Tokenizer = Callable[[str], int]
+Summarizer = Callable[[str, List[str]], str]
+
+SUMMARY_HEADER = "Resumo da conversa anterior:"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Llama on Portuguese text)."""
+    return estimate_tokens_from_chars(len(text))
+
+
+def estimate_tokens_from_chars(chars: int) -> int:
+    return math.ceil(chars / 4)
+
+
+def compact_summarizer(previous_summary: str, new_lines: List[str], max_chars: int = 80) -> str:
+    """Fold new history lines into the summary as one truncated bullet each."""
+    items = [previous_summary] if previous_summary else []
+    for line in new_lines:
+        line = " ".join(line.split())
+        if len(line) > max_chars:
+            line = line[:max_chars - 1].rstrip() + "…"
+        items.append(f"- {line}")
+    return "\n".join(items)
+
+
+@dataclass
+class HistoryWindow:
+    """The history text sent to the LLM for one turn, with its size."""
+    text: str
+    tokens: int
+    verbatim_turns: int
+    folded_turns: int
+
+
+@dataclass
+class _SessionSummary:
+    folded: int = 0
+    summary: str = ""
+    lines: List[str] = field(default_factory=list)
+
+
+class HistoryPolicy:
+    """Keeps the prompt history within a token budget.
+
+    The last `keep_last_turns` lines are sent verbatim; older lines are folded
+    into a rolling summary once, when they leave the verbatim window, so each
+    turn only summarizes what is new. When the summary outgrows the budget its
+    oldest bullets are dropped.
+
+    Summaries of at most `max_sessions` users are kept, least recently used
+    first out; an evicted user's summary is rebuilt from the history on
+    their next turn.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 400,
+        keep_last_turns: int = 6,
+        tokenizer: Tokenizer = estimate_tokens,
+        summarizer: Summarizer = compact_summarizer,
+        max_sessions: int = 10_000
+    ):
+        self.token_budget = token_budget
+        self.keep_last_turns = keep_last_turns
+        self.tokenizer = tokenizer
+        self.summarizer = summarizer
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _SessionSummary]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, user_id: str, history: List[str]) -> HistoryWindow:
+        """Return the budgeted history text for the user's next prompt."""
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._sessions[user_id] = _SessionSummary()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(user_id)
+            if len(history) < session.folded:
+                # History was reset or replaced: start a new summary
+                session = self._sessions[user_id] = _SessionSummary()
+
+            verbatim = history[-self.keep_last_turns:] if self.keep_last_turns > 0 else []
+            fold_until = len(history) - len(verbatim)
+            if fold_until > session.folded:
+                session.summary = self.summarizer(session.summary, history[session.folded:fold_until])
+                session.lines = session.summary.split("\n")
+                session.folded = fold_until
+
+            verbatim_text = "\n".join(verbatim)
+            verbatim_tokens = self.tokenizer(verbatim_text)
+            while len(verbatim) > 1 and verbatim_tokens > self.token_budget:
+                verbatim = verbatim[1:]
+                verbatim_text = "\n".join(verbatim)
+                verbatim_tokens = self.tokenizer(verbatim_text)
+
+            summary_text = self._fit_summary(session, self.token_budget - verbatim_tokens)
+            text = f"{summary_text}\n\n{verbatim_text}" if summary_text else verbatim_text
+            return HistoryWindow(
+                text=text,
+                tokens=self.tokenizer(text),
+                verbatim_turns=len(verbatim),
+                folded_turns=session.folded
+            )
+
+    def forget(self, user_id: str) -> None:
+        """Drop the rolling summary kept for a user."""
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def _fit_summary(self, session: _SessionSummary, budget: int) -> str:
+        if not session.lines or budget <= 0:
+            return ""
+        # Drop the oldest bullets until the summary fits; trimming is persisted
+        # so later turns do not pay for re-trimming the same lines.
+        while session.lines:
+            text = "\n".join([SUMMARY_HEADER] + session.lines)
+            if self.tokenizer(text) <= budget:
+                return text
+            session.lines.pop(0)
+            session.summary = "\n".join(session.lines)
+        return ""
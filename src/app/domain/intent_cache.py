@@ -0,0 +1,99 @@
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.domain.intent_classifier import normalize_text
+
+_SPEAKER_PREFIX = re.compile(r"^[^:\n]{1,40}:\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;]+$")
+
+
+class IntentCache:
+    """Bounded LRU cache of parsed intent results with time-based expiry.
+
+    Keys are fingerprints of the last `history_window` history lines plus the
+    user input, normalized so that trivially different messages ("Qual meu
+    saldo?" / "qual meu saldo") share an entry. Speaker prefixes are only
+    dropped from history lines; the user input is kept whole.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 300.0,
+        history_window: int = 2,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.history_window = history_window
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(text: str, strip_speaker: bool = False) -> str:
+        """Lowercase, strip accents, repeated spaces, trailing punctuation and, optionally, the speaker prefix."""
+        text = text.strip()
+        if strip_speaker:
+            text = _SPEAKER_PREFIX.sub("", text)
+        return _TRAILING_PUNCTUATION.sub("", normalize_text(text))
+
+    def fingerprint(self, history: List[str], user_input: str) -> str:
+        """Build the cache key for a (history window, user input) pair."""
+        window = history[-self.history_window:] if self.history_window > 0 else []
+        parts = [self.normalize(line, strip_speaker=True) for line in window]
+        parts.append(self.normalize(user_input))
+        return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, result = entry
+            if self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(result)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a copy of `result`, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (self._clock(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
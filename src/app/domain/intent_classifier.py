@@ -0,0 +1,41 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Protocol
+
+INTENTS = ["transfer", "get_balance", "get_transactions", "get_help", "unknown"]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class IntentClassifier(Protocol):
+    """Local (non-LLM) intent tier consulted by `IntentService` before the LLM."""
+
+    def classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Return a result dict when confident enough, otherwise None to defer."""
+        ...
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WHITESPACE.sub(" ", text)
+
+
+def extract_entities(normalized_text: str) -> Dict[str, Any]:
+    """Extract the entities a local tier can infer safely (account type only)."""
+    if "poupanca" in normalized_text:
+        return {"account_type": "poupança"}
+    if "corrente" in normalized_text:
+        return {"account_type": "corrente"}
+    return {}
+
+
+def build_result(intent: str, entities: Optional[Dict[str, Any]] = None, missing_entities: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Build a result dict with the same shape the LLM is asked to return."""
+    return {
+        "intent": intent,
+        "entities": entities or {},
+        "missing_entities": missing_entities or [],
+        "next_question": ""
+    }
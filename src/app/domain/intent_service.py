@@ -1,11 +1,21 @@
-import re
 import json
+import hashlib
+from collections import Counter
 from app.infra.logger_adapter import logger
-from typing import Dict, Any, List
-from app.infra.llm_adapter import query_llm
-from app.domain.state_repository import get_user_state, update_user_state
+from typing import Dict, Any, List, Optional, Tuple
+from app.infra.llm_adapter import LLMClient, LLMCompletion, get_default_client, query_llm
+from app.infra.async_llm_adapter import AsyncOllamaClient, aquery_llm, get_default_async_client
+from app.infra.json_extractor import JsonNotFoundError, extract_json
+from app.infra.circuit_breaker import CircuitBreaker
+from app.domain.intent_cache import IntentCache
+from app.domain.intent_classifier import INTENTS, IntentClassifier
+from app.domain.history_policy import HistoryPolicy, estimate_tokens, estimate_tokens_from_chars
+from app.domain.llm_context_cache import LLMContextCache
+from app.domain.prompt_builder import PromptBuilder, render_history
+from app.domain.state_repository import clear_user_state, get_user_state, update_user_state
 
-SYSTEM_PROMPT = """
+# Static part of the prompt: identical on every turn, so Ollama can keep it in its context
+SYSTEM_PROMPT_PREFIX = """
 Você é um assistente financeiro conversando com o usuário.
 
 Sua tarefa é analisar a conversa anterior e a mensagem mais recente do usuário, e retornar um JSON com:
@@ -28,6 +38,7 @@ Atenção:
 - A conversa pode ter múltiplas mensagens. Use o histórico para entender o contexto.
 - Se a mensagem do usuário responde a uma pergunta anterior, atualize as entidades com essa resposta.
 - Algumas solicitações não terão entidades e portanto também não terão entidades faltantes: consultar saldo por exemplo.
+- Em "get_transactions", se o usuário pedir uma quantidade (ex.: "últimas 5 transações"), informe-a como a entidade "limit" (número inteiro).
 - Sua resposta deve ser APENAS um JSON válido, sem explicações ou comentários.
 - Nunca pergunte pelo número da conta do usuário. Ele já é conhecido e fornecido como `account_number`.
 - Responda sempre em português.
@@ -44,7 +55,9 @@ Formato esperado:
   "missing_entities": [],
   "next_question": ""
 }}
+"""
 
+TURN_PROMPT = """
 Histórico da conversa:
 {history}
 
@@ -52,48 +65,304 @@ Mensagem atual do usuário:
 {user_input}
 """
 
+# Sent on top of a reused context: only the messages the model has not seen yet
+CONTINUATION_PROMPT = """
+Novas mensagens da conversa:
+{history}
+
+Mensagem atual do usuário:
+{user_input}
+
+Responda apenas com o JSON para a mensagem atual, no mesmo formato.
+"""
+
+SYSTEM_PROMPT = SYSTEM_PROMPT_PREFIX + TURN_PROMPT
+
+# Contract of the reply, sent as Ollama's `format` when structured output is on
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": INTENTS},
+        "entities": {"type": "object"},
+        "missing_entities": {"type": "array", "items": {"type": "string"}},
+        "next_question": {"type": "string"}
+    },
+    "required": ["intent", "entities", "missing_entities", "next_question"]
+}
+
 class IntentService:
-    def __init__(self, user_account_number: int = 987654321):
+    def __init__(
+        self,
+        user_account_number: int = 987654321,
+        llm_client: Optional[LLMClient] = None,
+        async_llm_client: Optional[AsyncOllamaClient] = None,
+        cache: Optional[IntentCache] = None,
+        classifiers: Optional[List[IntentClassifier]] = None,
+        history_policy: Optional[HistoryPolicy] = None,
+        context_cache: Optional[LLMContextCache] = None,
+        structured_output: bool = False,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        fallback_classifier: Optional[IntentClassifier] = None
+    ):
         self.user_account_number = user_account_number
+        self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
+        self.cache = cache
+        self.classifiers = classifiers or []
+        self.history_policy = history_policy
+        self.context_cache = context_cache
+        self.structured_output = structured_output
+        self.circuit_breaker = circuit_breaker
+        self.fallback_classifier = fallback_classifier
+        if context_cache and llm_client and not hasattr(llm_client, "complete"):
+            raise ValueError("Context reuse needs an LLM client that implements complete().")
+        if structured_output and llm_client and not hasattr(llm_client, "complete"):
+            raise ValueError("Structured output needs an LLM client that implements complete().")
+        if circuit_breaker and llm_client and not hasattr(llm_client, "complete"):
+            raise ValueError("The circuit breaker needs an LLM client that implements complete().")
+        self._completion_options = {"format": INTENT_SCHEMA} if structured_output else {}
+        self._parse_stats = Counter()
+        self._system_prefix = SYSTEM_PROMPT_PREFIX.format(user_account_number=user_account_number)
+        self._prefix_key = hashlib.blake2b(self._system_prefix.encode("utf-8"), digest_size=16).hexdigest()
+        self._turn_prompt = PromptBuilder(self._system_prefix, TURN_PROMPT)
+        self._continuation_prompt = PromptBuilder("", CONTINUATION_PROMPT)
+        self._prompt_stats: Dict[str, Dict[str, int]] = {}
 
-    def process_message(self, user_id: str, history: List[str], user_input: str) -> Dict[str, Any]:
+    def process_message(self, user_id: str, history: List[str], user_input: str, use_cache: bool = True) -> Dict[str, Any]:
         """Process a user message and return the intent and entities."""
-        prompt = SYSTEM_PROMPT.format(
-            history="\n".join(history),
-            user_input=user_input,
-            user_account_number=self.user_account_number
-        )
+        local_result = self._classify_locally(user_id, user_input)
+        if local_result is not None:
+            return self._store_result(user_id, local_result)
 
-        response = query_llm(prompt)
+        cache_key = self._cache_key(user_id, history, user_input, use_cache)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return self._store_result(user_id, cached)
 
-        logger.debug("Prompt:\n", prompt)
-        logger.debug("RAW LLM RESPONSE:\n", response)
+        if self.circuit_breaker and not self.circuit_breaker.allow_request():
+            return self._degraded_result(user_id, user_input)
 
-        # Tenta encontrar JSON dentro da resposta (mesmo que mal formatado)
-        start = response.find("{")
-        end = response.rfind("}") + 1
+        if self.context_cache or self.structured_output or self.circuit_breaker:
+            prompt, context = self._build_completion_prompt(user_id, history, user_input)
+            completion = self._complete(prompt, context)
+            self._remember_context(user_id, history, completion)
+            response = completion.text
+        else:
+            prompt = self._build_prompt(user_id, history, user_input)
+            response = self.llm_client.generate(prompt) if self.llm_client else query_llm(prompt)
+        return self._cache_result(cache_key, self._handle_response(user_id, prompt, response))
 
-        if start == -1 or end == -1:
-            return {"error": "No JSON block found in response."}
+    async def aprocess_message(self, user_id: str, history: List[str], user_input: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Async variant of `process_message`; awaits the LLM instead of blocking the thread."""
+        local_result = self._classify_locally(user_id, user_input)
+        if local_result is not None:
+            return self._store_result(user_id, local_result)
+
+        cache_key = self._cache_key(user_id, history, user_input, use_cache)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return self._store_result(user_id, cached)
+
+        if self.circuit_breaker and not self.circuit_breaker.allow_request():
+            return self._degraded_result(user_id, user_input)
+
+        if self.context_cache or self.structured_output or self.circuit_breaker:
+            prompt, context = self._build_completion_prompt(user_id, history, user_input)
+            completion = await self._acomplete(prompt, context)
+            self._remember_context(user_id, history, completion)
+            response = completion.text
+        elif self.async_llm_client:
+            prompt = self._build_prompt(user_id, history, user_input)
+            response = await self.async_llm_client.generate(prompt)
+        else:
+            prompt = self._build_prompt(user_id, history, user_input)
+            response = await aquery_llm(prompt)
+        return self._cache_result(cache_key, self._handle_response(user_id, prompt, response))
+
+    def get_prompt_stats(self, user_id: str) -> Dict[str, int]:
+        """Size of the last prompt sent to the LLM for this user."""
+        return self._prompt_stats.get(user_id, {})
+
+    def get_parse_stats(self) -> Dict[str, int]:
+        """How many LLM replies took each parse path.
+
+        `strict` replies were valid schema JSON, `fallback` ones asked for
+        structured output but needed the tolerant parser (backends that ignore
+        `format`), `tolerant` ones never asked for it, and `failed` ones could
+        not be parsed at all.
+        """
+        return {path: self._parse_stats[path] for path in ("strict", "fallback", "tolerant", "failed")}
+
+    def forget(self, user_id: str) -> None:
+        """Drop everything kept for the user: conversation state, history summary, LLM context and prompt stats."""
+        clear_user_state(user_id)
+        if self.history_policy:
+            self.history_policy.forget(user_id)
+        if self.context_cache:
+            self.context_cache.invalidate(user_id)
+        self._prompt_stats.pop(user_id, None)
+
+    def _has_pending_flow(self, user_id: str) -> bool:
+        """Whether the user is answering a follow-up question, where older context matters."""
+        return bool(get_user_state(user_id).get("missing_entities"))
+
+    def _classify_locally(self, user_id: str, user_input: str) -> Optional[Dict[str, Any]]:
+        """Try the local classifier tiers in order; None means the LLM has to decide."""
+        if not self.classifiers or self._has_pending_flow(user_id):
+            return None
+        for classifier in self.classifiers:
+            result = classifier.classify(user_input)
+            if result is not None:
+                return result
+        return None
+
+    def _cache_key(self, user_id: str, history: List[str], user_input: str, use_cache: bool) -> Optional[str]:
+        if not self.cache or not use_cache or self._has_pending_flow(user_id):
+            return None
+        return self.cache.fingerprint(history, user_input)
 
-        json_like = response[start:end]
+    def _cache_result(self, cache_key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        if cache_key and "error" not in result:
+            self.cache.put(cache_key, result)
+        return result
 
-        # Correção tosca: adiciona aspas nas chaves
-        json_fixed = re.sub(r'(\s*)(\w+):', r'\1"\2":', json_like)
+    def _build_prompt(self, user_id: str, history: List[str], user_input: str) -> str:
+        """Render the full system prompt for the current turn."""
+        if self.history_policy:
+            window = self.history_policy.render(user_id, history)
+            rendered_history, history_tokens = window.text, window.tokens
+        else:
+            rendered_history = render_history(history)
+            history_tokens = estimate_tokens_from_chars(sum(len(segment) for segment in rendered_history))
 
+        prompt = self._turn_prompt.build(rendered_history, user_input)
+        self._record_prompt_stats(user_id, prompt, history_tokens)
+        return prompt
+
+    def _degraded_result(self, user_id: str, user_input: str) -> Dict[str, Any]:
+        """Answer without the LLM while the circuit is open."""
+        logger.debug("Circuit open, answering without the LLM")
+        # A pending flow needs the LLM to merge the answer into the open entities
+        if self.fallback_classifier and not self._has_pending_flow(user_id):
+            result = self.fallback_classifier.classify(user_input)
+            if result is not None:
+                return self._store_result(user_id, result)
+        return {"error": "LLM unavailable, please try again shortly."}
+
+    def _complete(self, prompt: str, context: Optional[List[int]]) -> LLMCompletion:
+        client = self.llm_client or get_default_client()
+        # None means no outcome: a cancelled call must still give back its probe slot
+        ok = None
+        try:
+            completion = client.complete(prompt, context=context, **self._completion_options)
+            ok = completion.ok
+            return completion
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self._record_llm_outcome(ok)
+
+    async def _acomplete(self, prompt: str, context: Optional[List[int]]) -> LLMCompletion:
+        client = self.async_llm_client or get_default_async_client()
+        # None means no outcome: a cancelled call must still give back its probe slot
+        ok = None
         try:
-            data = json.loads(json_fixed)
-            # Ensure intent is always present and valid
-            if "intent" not in data or data["intent"] not in ["transfer", "get_balance", "get_transactions", "get_help", "unknown"]:
-                data["intent"] = "unknown"
-            
-            update_user_state(user_id, {
-                "intent": data.get("intent"),
-                "entities": data.get("entities", {}),
-                "missing_entities": data.get("missing_entities", []),
-                "next_question": data.get("next_question")
-            })
-            return data
+            completion = await client.complete(prompt, context=context, **self._completion_options)
+            ok = completion.ok
+            return completion
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self._record_llm_outcome(ok)
+
+    def _record_llm_outcome(self, ok: Optional[bool]) -> None:
+        if not self.circuit_breaker:
+            return
+        if ok is None:
+            self.circuit_breaker.release()
+        else:
+            self.circuit_breaker.record(ok)
+
+    def _build_completion_prompt(self, user_id: str, history: List[str], user_input: str) -> Tuple[str, Optional[List[int]]]:
+        if self.context_cache:
+            return self._build_context_prompt(user_id, history, user_input)
+        return self._build_prompt(user_id, history, user_input), None
+
+    def _build_context_prompt(self, user_id: str, history: List[str], user_input: str) -> Tuple[str, Optional[List[int]]]:
+        """Render only the new messages when Ollama still holds the session's context."""
+        session_context = self.context_cache.lookup(user_id, self._prefix_key, len(history))
+        if session_context is None:
+            return self._build_prompt(user_id, history, user_input), None
+
+        history_text = "\n".join(history[session_context.history_length:])
+        prompt = self._continuation_prompt.build(history_text, user_input)
+        self._record_prompt_stats(user_id, prompt, self._count_tokens(history_text))
+        return prompt, session_context.tokens
+
+    def _remember_context(self, user_id: str, history: List[str], completion) -> None:
+        if not self.context_cache:
+            return
+        tokens = completion.context if completion.ok else None
+        self.context_cache.store(user_id, self._prefix_key, len(history), tokens)
+
+    def _count_tokens(self, text: str) -> int:
+        return self.history_policy.tokenizer(text) if self.history_policy else estimate_tokens(text)
+
+    def _record_prompt_stats(self, user_id: str, prompt: str, history_tokens: int) -> None:
+        self._prompt_stats[user_id] = {
+            "prompt_chars": len(prompt),
+            "prompt_tokens": self._count_tokens(prompt),
+            "history_tokens": history_tokens
+        }
+
+    def _handle_response(self, user_id: str, prompt: str, response: str) -> Dict[str, Any]:
+        """Parse the raw LLM response and persist the resulting state."""
+        logger.debug("Prompt:\n", prompt)
+        logger.debug("RAW LLM RESPONSE:\n", response)
+
+        data = self._parse_strict(response) if self.structured_output else None
+        if data is not None:
+            self._parse_stats["strict"] += 1
+            return self._store_result(user_id, data)
+
+        try:
+            data = extract_json(response)
+        except JsonNotFoundError:
+            self._parse_stats["failed"] += 1
+            return {"error": "No JSON block found in response."}
         except json.JSONDecodeError as e:
             logger.debug("JSON error:", e)
+            self._parse_stats["failed"] += 1
             return {"error": "LLM returned an unexpected format."}
+
+        self._parse_stats["fallback" if self.structured_output else "tolerant"] += 1
+        # Ensure intent is always present and valid
+        if "intent" not in data or data["intent"] not in INTENTS:
+            data["intent"] = "unknown"
+
+        return self._store_result(user_id, data)
+
+    @staticmethod
+    def _parse_strict(response: str) -> Optional[Dict[str, Any]]:
+        """Parse a schema-constrained reply; None when it does not honour the schema."""
+        try:
+            data = json.loads(response)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or data.get("intent") not in INTENTS:
+            return None
+        if not isinstance(data.get("entities"), dict) or not isinstance(data.get("missing_entities"), list):
+            return None
+        return data
+
+    def _store_result(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist the detected intent in the user's state and return it."""
+        update_user_state(user_id, {
+            "intent": data.get("intent"),
+            "entities": data.get("entities", {}),
+            "missing_entities": data.get("missing_entities", []),
+            "next_question": data.get("next_question")
+        })
+        return data
@@ -0,0 +1,195 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def to_cents(amount: Any) -> int:
+    """Convert a money amount to integer cents, so sums never drift."""
+    return int(Decimal(str(amount)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+@dataclass
+class _LedgerAccount:
+    balance_cents: int
+    entries: Any
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class Ledger:
+    """Account balances that stay consistent under concurrent transfers.
+
+    Every account has its own lock, so transfers between unrelated accounts
+    never wait on each other. A transfer takes the locks of both accounts in
+    sorted id order (a fixed global order, so two opposite transfers cannot
+    deadlock), checks the balance and applies the debit and the credit
+    before releasing either lock. Balances are kept in integer cents.
+
+    Entries go to a per-account journal built by `journal_factory`: a list
+    by default, or anything with `append`, `pop` and iteration, such as a
+    `TransactionStore`.
+    """
+
+    def __init__(self, journal_factory: Callable[[], Any] = list):
+        self.journal_factory = journal_factory
+        self._accounts: Dict[Hashable, _LedgerAccount] = {}
+        self._registry_lock = threading.Lock()
+
+    def open_account(self, account_id: Hashable, balance: Any = 0, journal: Any = None) -> None:
+        """Open an account, with a fresh journal unless a restored one is given."""
+        with self._registry_lock:
+            if account_id in self._accounts:
+                raise ValueError(f"Account {account_id!r} already exists.")
+            entries = journal if journal is not None else self.journal_factory()
+            self._accounts[account_id] = _LedgerAccount(to_cents(balance), entries)
+
+    def has_account(self, account_id: Hashable) -> bool:
+        return account_id in self._accounts
+
+    def balance(self, account_id: Hashable) -> float:
+        account = self._account(account_id)
+        with account.lock:
+            return account.balance_cents / 100
+
+    def entries(self, account_id: Hashable) -> List[Any]:
+        """Entries recorded on the account, oldest first."""
+        account = self._account(account_id)
+        with account.lock:
+            return list(account.entries)
+
+    def journal(self, account_id: Hashable) -> Any:
+        """The account's journal itself, for journals that support their own queries."""
+        return self._account(account_id).entries
+
+    def inspect(self, account_id: Hashable, reader: Callable[[float, Any], T]) -> T:
+        """Call `reader(balance, journal)` under the account lock, for reads that must not interleave with transfers."""
+        account = self._account(account_id)
+        with account.lock:
+            return reader(account.balance_cents / 100, account.entries)
+
+    def transfer(
+        self,
+        source: Hashable,
+        amount: Any,
+        destination: Optional[Hashable] = None,
+        entry: Any = None,
+        on_commit: Optional[Callable[[], None]] = None
+    ) -> bool:
+        """Move `amount` from `source` to `destination` atomically.
+
+        Without a destination the money leaves the ledger (a payment to an
+        outside recipient). `entry`, if given, is recorded on the source
+        account together with the debit and `on_commit` runs before the
+        locks are released, so derived state is updated atomically with it.
+        If `on_commit` raises, the debit, the credit and the entry are undone
+        before the exception propagates. Returns False, changing nothing,
+        when the source balance is insufficient.
+        """
+        cents = to_cents(amount)
+        if cents <= 0:
+            raise ValueError("Transfer amount must be positive.")
+        if destination == source:
+            raise ValueError("Source and destination must differ.")
+
+        debited = self._account(source)
+        credited = self._account(destination) if destination is not None else None
+        ordered = sorted([source] if destination is None else [source, destination], key=_lock_order)
+        locks = [self._accounts[account_id].lock for account_id in ordered]
+        for lock in locks:
+            lock.acquire()
+        try:
+            if debited.balance_cents < cents:
+                return False
+            debited.balance_cents -= cents
+            if credited is not None:
+                credited.balance_cents += cents
+            if entry is not None:
+                debited.entries.append(entry)
+            if on_commit is not None:
+                try:
+                    on_commit()
+                except BaseException:
+                    debited.balance_cents += cents
+                    if credited is not None:
+                        credited.balance_cents -= cents
+                    if entry is not None:
+                        debited.entries.pop()
+                    raise
+            return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def revert(
+        self,
+        source: Hashable,
+        amount: Any,
+        destination: Optional[Hashable] = None,
+        pop_entry: bool = False,
+        on_revert: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Undo an applied transfer, e.g. one whose commit failed after `transfer` returned.
+
+        `pop_entry` removes the newest entry of the source account, which is
+        only right when every transfer recorded on it after the undone one
+        is undone as well (as with a journal that stops at its first failed
+        write). `on_revert` runs under the same locks.
+        """
+        cents = to_cents(amount)
+        debited = self._account(source)
+        credited = self._account(destination) if destination is not None else None
+        ordered = sorted([source] if destination is None else [source, destination], key=_lock_order)
+        locks = [self._accounts[account_id].lock for account_id in ordered]
+        for lock in locks:
+            lock.acquire()
+        try:
+            debited.balance_cents += cents
+            if credited is not None:
+                credited.balance_cents -= cents
+            if pop_entry:
+                debited.entries.pop()
+            if on_revert is not None:
+                on_revert()
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def total(self) -> float:
+        """Sum of every balance, read under all account locks at once."""
+        with self._all_locked() as accounts:
+            return sum(account.balance_cents for account in accounts.values()) / 100
+
+    def inspect_all(self, reader: Callable[[Dict[Hashable, Tuple[float, Any]]], T]) -> T:
+        """Call `reader({account_id: (balance, journal)})` with every account locked, for a consistent cut."""
+        with self._all_locked() as accounts:
+            return reader({
+                account_id: (account.balance_cents / 100, account.entries)
+                for account_id, account in accounts.items()
+            })
+
+    @contextmanager
+    def _all_locked(self) -> Iterator[Dict[Hashable, _LedgerAccount]]:
+        with self._registry_lock:
+            ordered = sorted(self._accounts, key=_lock_order)
+        accounts = {account_id: self._accounts[account_id] for account_id in ordered}
+        for account in accounts.values():
+            account.lock.acquire()
+        try:
+            yield accounts
+        finally:
+            for account in reversed(list(accounts.values())):
+                account.lock.release()
+
+    def _account(self, account_id: Hashable) -> _LedgerAccount:
+        try:
+            return self._accounts[account_id]
+        except KeyError:
+            raise KeyError(f"Unknown account {account_id!r}.") from None
+
+
+def _lock_order(account_id: Hashable) -> str:
+    # repr gives one total order even when ids mix types
+    return repr(account_id)
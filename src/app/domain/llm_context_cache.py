@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class SessionContext:
+    """Ollama `context` tokens for a session and how much of its history they cover."""
+    tokens: List[int]
+    history_length: int
+    prefix_key: str
+
+
+class LLMContextCache:
+    """Per-session store of the `context` arrays Ollama returns.
+
+    Sending a session's context back with the next prompt lets Ollama skip
+    re-evaluating the static system prompt and the history it has already
+    seen. An entry is dropped, and the next turn falls back to a full prompt,
+    when the history no longer extends what was covered, the static prefix
+    changed, the context grew past `max_context_tokens`, or a call returned
+    no context (errors, streams cancelled early).
+    """
+
+    def __init__(self, max_sessions: int = 10000, max_context_tokens: int = 6144):
+        self.max_sessions = max_sessions
+        self.max_context_tokens = max_context_tokens
+        self._sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, user_id: str, prefix_key: str, history_length: int) -> Optional[SessionContext]:
+        """Return the reusable context for the user, or None when a full prompt is needed."""
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if (
+                entry.prefix_key != prefix_key
+                or history_length < entry.history_length
+                or len(entry.tokens) > self.max_context_tokens
+            ):
+                del self._sessions[user_id]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+    def store(self, user_id: str, prefix_key: str, history_length: int, tokens: Optional[List[int]]) -> None:
+        """Remember the context returned for the user's last call; no tokens invalidates it."""
+        if not tokens:
+            self.invalidate(user_id)
+            return
+        with self._lock:
+            self._sessions[user_id] = SessionContext(tokens, history_length, prefix_key)
+            self._sessions.move_to_end(user_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            if self._sessions.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,95 @@
+from typing import Iterable, List, Sequence, Union
+
+
+class RenderedHistory(list):
+    """History list that keeps a pre-rendered, newline-joined copy of its lines.
+
+    Appending lines (the only thing a conversation does) adds just the new
+    lines to the rendered buffer. The buffer is a short list of text segments
+    that `PromptBuilder` joins straight into the prompt, so a turn copies the
+    history text once instead of re-joining every line and re-formatting the
+    template. Segments are merged every `max_segments` turns to keep the list
+    short. Any mutation other than appending re-renders on the next read.
+    """
+
+    max_segments = 64
+
+    def __init__(self, lines: Iterable[str] = ()):
+        super().__init__(lines)
+        self._segments: List[str] = []
+        self._rendered_count = 0
+
+    def segments(self) -> List[str]:
+        """The rendered history as text segments; do not mutate the returned list."""
+        count = len(self)
+        if self._rendered_count > count:
+            self._invalidate()
+        if self._rendered_count < count:
+            new_text = "\n".join(self[self._rendered_count:])
+            self._segments.append(f"\n{new_text}" if self._rendered_count else new_text)
+            self._rendered_count = count
+            if len(self._segments) > self.max_segments:
+                self._segments = ["".join(self._segments)]
+        return self._segments
+
+    @property
+    def text(self) -> str:
+        """The lines joined with newlines, as the prompt expects them."""
+        segments = self.segments()
+        return segments[0] if len(segments) == 1 else "".join(segments)
+
+    def _invalidate(self) -> None:
+        self._segments = []
+        self._rendered_count = 0
+
+    def _mutating(name):
+        def method(self, *args, **kwargs):
+            self._invalidate()
+            return getattr(list, name)(self, *args, **kwargs)
+        method.__name__ = name
+        return method
+
+    # Anything that is not an append at the end invalidates the rendered buffer
+    __setitem__ = _mutating("__setitem__")
+    __delitem__ = _mutating("__delitem__")
+    __imul__ = _mutating("__imul__")
+    insert = _mutating("insert")
+    pop = _mutating("pop")
+    remove = _mutating("remove")
+    clear = _mutating("clear")
+    sort = _mutating("sort")
+    reverse = _mutating("reverse")
+    del _mutating
+
+
+def render_history(history: List[str]) -> List[str]:
+    """Render history for the prompt as text segments, reusing the cached rendering when there is one."""
+    if isinstance(history, RenderedHistory):
+        return history.segments()
+    return ["\n".join(history)]
+
+
+class PromptBuilder:
+    """Composes the prompt from cached segments instead of re-formatting a template every turn.
+
+    The template is split once around its `{history}` and `{user_input}`
+    placeholders; `build` only concatenates the static pieces with the two
+    dynamic ones.
+    """
+
+    def __init__(self, prefix: str, turn_template: str):
+        before_history, _, rest = turn_template.partition("{history}")
+        between, _, after_input = rest.partition("{user_input}")
+        self._head = prefix + self._unescape(before_history)
+        self._between = self._unescape(between)
+        self._tail = self._unescape(after_input)
+
+    def build(self, history: Union[str, Sequence[str]], user_input: str) -> str:
+        """Concatenate the cached segments with the history (text or segments) and the user input."""
+        if isinstance(history, str):
+            return "".join((self._head, history, self._between, user_input, self._tail))
+        return "".join((self._head, *history, self._between, user_input, self._tail))
+
+    @staticmethod
+    def _unescape(segment: str) -> str:
+        return segment.replace("{{", "{").replace("}}", "}")
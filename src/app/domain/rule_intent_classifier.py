@@ -0,0 +1,89 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from app.domain.intent_classifier import build_result, extract_entities, normalize_text
+
+@dataclass
+class IntentRule:
+    intent: str
+    pattern: str
+    weight: float
+
+# Patterns run against normalized text (lowercase, no accents)
+DEFAULT_RULES = [
+    IntentRule("get_balance", r"\bsaldo\b", 0.9),
+    IntentRule("get_balance", r"\bquanto (eu )?tenho\b", 0.9),
+    IntentRule("get_balance", r"\bpoupanca\b", 0.5),
+    IntentRule("get_transactions", r"\bextrato\b", 0.95),
+    IntentRule("get_transactions", r"\b(transacoes|movimentacoes|lancamentos)\b", 0.9),
+    IntentRule("get_transactions", r"\bhistorico\b", 0.7),
+    IntentRule("get_help", r"\bajuda\b|\bajudar\b|\bsocorro\b", 0.9),
+    IntentRule("get_help", r"\bo que (voce )?(pode|sabe|consegue) fazer\b", 0.95),
+    IntentRule("get_help", r"\b(comandos|opcoes|servicos|funcionalidades)\b", 0.85),
+]
+
+# Messages that mention money movement or negate a request always go to the LLM
+DEFAULT_BLOCKERS = [
+    r"\btransf",
+    r"\b(envi|mand|pag|deposit)\w*",
+    r"\bpix\b",
+    r"\d",
+    r"\b(nao|nem|nunca)\b",
+]
+
+
+class RuleIntentClassifier:
+    """Compiled keyword rules that answer obvious intents without calling the LLM."""
+
+    def __init__(
+        self,
+        rules: Optional[List[IntentRule]] = None,
+        blockers: Optional[List[str]] = None,
+        threshold: float = 0.8
+    ):
+        self.threshold = threshold
+        self._rules: List[Tuple[str, Pattern[str], float]] = [
+            (rule.intent, re.compile(rule.pattern), rule.weight)
+            for rule in (rules if rules is not None else DEFAULT_RULES)
+        ]
+        patterns = blockers if blockers is not None else DEFAULT_BLOCKERS
+        self._blocker = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        self.hits = 0
+        self.fallthroughs = 0
+
+    def score(self, user_input: str) -> Tuple[str, float]:
+        """Return the best intent and its confidence in [0, 1]."""
+        text = normalize_text(user_input)
+        if self._blocker and self._blocker.search(text):
+            return "unknown", 0.0
+
+        scores: Dict[str, float] = {}
+        for intent, pattern, weight in self._rules:
+            if pattern.search(text):
+                scores[intent] = min(1.0, scores.get(intent, 0.0) + weight)
+        if not scores:
+            return "unknown", 0.0
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_intent, best_score = ranked[0]
+        # Competing intents in the same message lower the confidence
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return best_intent, best_score - runner_up
+
+    def classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Return a result dict when the rules are confident, otherwise None."""
+        intent, confidence = self.score(user_input)
+        if confidence < self.threshold:
+            self.fallthroughs += 1
+            return None
+        self.hits += 1
+        return build_result(intent, extract_entities(normalize_text(user_input)))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.fallthroughs
+        return {
+            "hits": self.hits,
+            "fallthroughs": self.fallthroughs,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
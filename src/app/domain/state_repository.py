@@ -1,31 +1,161 @@
 # state_store.py
 
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Protocol
+
+
+def new_state() -> Dict[str, Any]:
+    """State of a user with no dialog in progress."""
+    return {
+        "intent": None,
+        "entities": {},
+        "missing": [],
+        "next_question": None
+    }
+
+
+class StateBackend(Protocol):
+    """Storage for per-user dialog state used by the module-level functions."""
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        ...
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> None:
+        ...
+
+    def clear(self, user_id: str) -> None:
+        ...
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # user_id -> [state, last_access]; ordered from least to most recently used
+        self.entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+
+class StateStore:
+    """In-memory per-user state, sharded by user id so concurrent turns rarely contend.
+
+    Each shard has its own lock and keeps its entries in LRU order. An entry
+    idle for more than `ttl_seconds` is dropped, and a shard holding more
+    than its share of `max_entries` evicts its least recently used users.
+    """
+
+    def __init__(
+        self,
+        num_shards: int = 16,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 1800.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.num_shards = num_shards
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._shard_capacity = max(1, math.ceil(max_entries / num_shards))
+        self._shards = [_Shard() for _ in range(num_shards)]
+        self._clock = clock
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        """Return the user's state, creating it if it doesn't exist."""
+        shard = self._shard(user_id)
+        with shard.lock:
+            return self._touch(shard, user_id)
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> None:
+        """Update the user's state with the provided values."""
+        shard = self._shard(user_id)
+        with shard.lock:
+            self._touch(shard, user_id).update(updates)
+
+    def clear(self, user_id: str) -> None:
+        """Remove the user's state."""
+        shard = self._shard(user_id)
+        with shard.lock:
+            shard.entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy per shard and how many entries were evicted (LRU) or expired (TTL)."""
+        occupancy = []
+        evictions = expirations = 0
+        for shard in self._shards:
+            with shard.lock:
+                occupancy.append(len(shard.entries))
+                evictions += shard.evictions
+                expirations += shard.expirations
+        return {
+            "entries": sum(occupancy),
+            "max_entries": self.max_entries,
+            "shard_occupancy": occupancy,
+            "evictions": evictions,
+            "expirations": expirations
+        }
+
+    def _shard(self, user_id: str) -> _Shard:
+        return self._shards[hash(user_id) % self.num_shards]
+
+    def _touch(self, shard: _Shard, user_id: str) -> Dict[str, Any]:
+        now = self._clock()
+        self._expire(shard, now)
+        entry = shard.entries.get(user_id)
+        if entry is None:
+            entry = shard.entries[user_id] = [new_state(), now]
+            self._evict(shard)
+        else:
+            entry[1] = now
+            shard.entries.move_to_end(user_id)
+        return entry[0]
+
+    def _expire(self, shard: _Shard, now: float) -> None:
+        # LRU order is also last-access order, so expired entries sit at the front
+        entries = shard.entries
+        while entries:
+            user_id, entry = next(iter(entries.items()))
+            if now - entry[1] <= self.ttl_seconds:
+                break
+            del entries[user_id]
+            shard.expirations += 1
+
+    def _evict(self, shard: _Shard) -> None:
+        while len(shard.entries) > self._shard_capacity:
+            shard.entries.popitem(last=False)
+            shard.evictions += 1
+
+
 # In-memory repository to track state per user
-state = {}
+store: StateBackend = StateStore()
+
+
+def set_state_store(backend: StateBackend) -> StateBackend:
+    """Swap the backend used by the functions below; returns the previous one."""
+    global store
+    previous, store = store, backend
+    return previous
+
+
 
 def get_user_state(user_id):
     """
     Initializes and returns the user's state if it doesn't exist.
     """
-    if user_id not in state:
-        state[user_id] = {
-            "intent": None,
-            "entities": {},
-            "missing": [],
-            "next_question": None
-        }
-    return state[user_id]
+    return store.get(user_id)
 
 def update_user_state(user_id, updates):
     """
     Updates the user's state with the provided values.
     """
-    user_state = get_user_state(user_id)
-    user_state.update(updates)
+    store.update(user_id, updates)
 
 def clear_user_state(user_id):
     """
     Removes the user's state from memory.
     """
-    if user_id in state:
-        del state[user_id]
+    store.clear(user_id)
@@ -0,0 +1,237 @@
+"""TF-IDF + logistic regression intent model used as a first local tier.
+
+Train and evaluate from the `src/` folder:
+
+    python -m app.domain.tfidf_intent_classifier train --holdout 0.2
+    python -m app.domain.tfidf_intent_classifier evaluate
+
+`train` writes the held-out examples next to the model, and `evaluate`
+scores the model on them unless `--data` points at other examples that
+were not used for training.
+"""
+import argparse
+import json
+import pickle
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+from app.domain.intent_classifier import build_result, extract_entities, normalize_text
+from app.infra.logger_adapter import logger
+
+SRC_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_MODEL_PATH = SRC_DIR / "app" / "resources" / "intent_model.pkl"
+DEFAULT_CORPORA = [
+    SRC_DIR / "app" / "resources" / "intent_corpus.json",
+    SRC_DIR / "tests" / "resources" / "multi_turn_scenarios.json",
+    SRC_DIR / "tests" / "resources" / "dialogs.json",
+]
+
+# Intents that need entities only the LLM can extract, or that the LLM may still resolve
+DEFAULT_DEFERRED_INTENTS = ("transfer", "unknown")
+
+Example = Tuple[str, str]
+
+
+def load_examples(paths: Iterable[Path]) -> List[Example]:
+    """Load (text, intent) pairs from corpus, dialog or multi-turn scenario files."""
+    examples: List[Example] = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        for record in records:
+            if "steps" in record:
+                # Only steps with an explicit label; follow-up answers depend on context
+                examples.extend(
+                    (step["input"], step["expect_intent"])
+                    for step in record["steps"] if "expect_intent" in step
+                )
+            elif "expected_intent" in record:
+                examples.append((record["input"], record["expected_intent"]))
+            else:
+                examples.append((record["text"], record["intent"]))
+    return examples
+
+
+def build_pipeline() -> Pipeline:
+    """Word and character n-gram TF-IDF features feeding a linear classifier."""
+    features = FeatureUnion([
+        ("words", TfidfVectorizer(preprocessor=normalize_text, ngram_range=(1, 2), sublinear_tf=True)),
+        ("chars", TfidfVectorizer(preprocessor=normalize_text, analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True)),
+    ])
+    return Pipeline([
+        ("features", features),
+        ("classifier", LogisticRegression(max_iter=1000, C=10.0)),
+    ])
+
+
+class TfidfIntentClassifier:
+    """Trainable intent model that answers with a probability and defers to the LLM below a threshold.
+
+    The model is loaded from `model_path` when the classifier is built (when no
+    file exists it is trained in memory from the default corpora), so no
+    request pays for it. Pass `load=False` to train it yourself.
+    Answered results carry the model's probability as "confidence".
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[Path] = DEFAULT_MODEL_PATH,
+        threshold: float = 0.7,
+        deferred_intents: Sequence[str] = DEFAULT_DEFERRED_INTENTS,
+        load: bool = True
+    ):
+        self.model_path = Path(model_path) if model_path else None
+        self.threshold = threshold
+        self.deferred_intents = set(deferred_intents)
+        self.hits = 0
+        self.fallthroughs = 0
+        self._pipeline: Optional[Pipeline] = self._load() if load and self.model_path else None
+
+    def train(self, examples: Sequence[Example]) -> "TfidfIntentClassifier":
+        texts = [text for text, _ in examples]
+        labels = [intent for _, intent in examples]
+        pipeline = build_pipeline()
+        pipeline.fit(texts, labels)
+        self._pipeline = pipeline
+        return self
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        path = Path(path or self.model_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self._require_pipeline(), f)
+        return path
+
+    def predict(self, user_input: str) -> Tuple[str, float]:
+        """Return the most likely intent and its probability."""
+        pipeline = self._require_pipeline()
+        probabilities = pipeline.predict_proba([user_input])[0]
+        best = probabilities.argmax()
+        return str(pipeline.classes_[best]), float(probabilities[best])
+
+    def classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Return a result dict when the model is confident, otherwise None."""
+        intent, probability = self.predict(user_input)
+        if probability < self.threshold or intent in self.deferred_intents:
+            self.fallthroughs += 1
+            return None
+        self.hits += 1
+        result = build_result(intent, extract_entities(normalize_text(user_input)))
+        result["confidence"] = probability
+        return result
+
+    def evaluate(self, examples: Sequence[Example]) -> Dict[str, Any]:
+        """Return accuracy and per-message prediction latency over labeled examples."""
+        self._require_pipeline()
+        correct = 0
+        latencies = []
+        for text, expected in examples:
+            started = time.perf_counter()
+            intent, _ = self.predict(text)
+            latencies.append(time.perf_counter() - started)
+            correct += intent == expected
+        latencies.sort()
+        count = len(examples)
+        return {
+            "examples": count,
+            "accuracy": correct / count if count else 0.0,
+            "latency_mean_ms": 1000 * sum(latencies) / count if count else 0.0,
+            "latency_p95_ms": 1000 * latencies[int(0.95 * (count - 1))] if count else 0.0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.fallthroughs
+        return {
+            "hits": self.hits,
+            "fallthroughs": self.fallthroughs,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
+
+    def _require_pipeline(self) -> Pipeline:
+        if self._pipeline is None:
+            raise RuntimeError("Intent model not loaded; call train() first.")
+        return self._pipeline
+
+    def _load(self) -> Pipeline:
+        if self.model_path and self.model_path.exists():
+            with open(self.model_path, "rb") as f:
+                return pickle.load(f)
+        logger.info(f"Intent model not found at {self.model_path}; training from the default corpora.")
+        return self.train(load_examples(DEFAULT_CORPORA))._pipeline
+
+
+def holdout_path(model_path: Path) -> Path:
+    """Where `train` stores the examples it held out from `model_path`."""
+    return Path(model_path).with_suffix(".holdout.json")
+
+
+def split_examples(examples: Sequence[Example], holdout: float, seed: int = 42) -> Tuple[List[Example], List[Example]]:
+    """Stratified train/test split so every intent appears on both sides.
+
+    Copies of a message (after normalization) stay on the same side, so the
+    test set never contains text the model was trained on.
+    """
+    by_intent: Dict[str, Dict[str, List[Example]]] = {}
+    for example in examples:
+        by_intent.setdefault(example[1], {}).setdefault(normalize_text(example[0]), []).append(example)
+    rng = random.Random(seed)
+    train, test = [], []
+    for copies in by_intent.values():
+        group = list(copies.values())
+        rng.shuffle(group)
+        cut = int(round(len(group) * holdout))
+        test.extend(example for same in group[:cut] for example in same)
+        train.extend(example for same in group[cut:] for example in same)
+    return train, test
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train or evaluate the TF-IDF intent model.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="train the model and save it to disk")
+    train_parser.add_argument("--data", nargs="+", type=Path, default=DEFAULT_CORPORA)
+    train_parser.add_argument("--output", type=Path, default=DEFAULT_MODEL_PATH)
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="fraction held out for evaluation")
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="evaluate a saved model")
+    evaluate_parser.add_argument(
+        "--data", nargs="+", type=Path,
+        help="examples not used for training (default: the split held out by train)"
+    )
+    evaluate_parser.add_argument("--model", type=Path, default=DEFAULT_MODEL_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        examples = load_examples(args.data)
+        train, test = split_examples(examples, args.holdout) if args.holdout else (examples, [])
+        classifier = TfidfIntentClassifier(model_path=args.output, load=False).train(train)
+        path = classifier.save()
+        print(f"Trained on {len(train)} examples -> {path}")
+        heldout = holdout_path(path)
+        if test:
+            with open(heldout, "w", encoding="utf-8") as f:
+                json.dump([{"text": text, "intent": intent} for text, intent in test], f, ensure_ascii=False, indent=2)
+            print(json.dumps(classifier.evaluate(test), indent=2))
+        elif heldout.exists():
+            # Everything was used for training, so an older split is no longer held out
+            heldout.unlink()
+    else:
+        data = args.data or [holdout_path(args.model)]
+        if not args.data and not data[0].exists():
+            parser.error(f"No held-out split at {data[0]}; train with --holdout or pass --data with examples not used for training.")
+        if not args.model.exists():
+            parser.error(f"No model at {args.model}; run train first.")
+        classifier = TfidfIntentClassifier(model_path=args.model)
+        print(json.dumps(classifier.evaluate(load_examples(data)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
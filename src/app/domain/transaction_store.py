@@ -0,0 +1,151 @@
+import threading
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.domain.ledger import to_cents
+
+
+@dataclass
+class TransactionPage:
+    """A page of transactions, oldest first, and the cursor for the page before it (None when done)."""
+    transactions: List[Any]
+    next_cursor: Optional[int]
+
+
+class _Interner:
+    """Maps repeated strings (recipients, types, account names) to small integer codes."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class TransactionStore:
+    """Columnar, append-only transaction history of one account.
+
+    Rows live in typed arrays (timestamps, amounts in cents, interned type,
+    recipient and source-account codes) instead of one object per
+    transaction. Timestamps are kept non-decreasing, so a date range is
+    found by bisection in O(log n) and a page only materializes the rows it
+    returns, through `row_factory(type, to, amount, from_account, timestamp)`.
+
+    Appends are expected under the owning account's lock. Every method also
+    takes the store's own lock, so a read never sees a row half appended or
+    half removed by `pop`.
+    """
+
+    def __init__(self, row_factory: Callable[..., Any] = dict):
+        self.row_factory = row_factory
+        self._timestamps = array("d")
+        self._amounts = array("q")
+        self._types = array("I")
+        self._recipients = array("I")
+        self._sources = array("I")
+        self._strings = _Interner()
+        self._lock = threading.Lock()
+        self._size = 0
+
+    def append(self, transaction: Any) -> None:
+        """Record a transaction with `type`, `to`, `amount`, `from_account` and `timestamp` attributes."""
+        with self._lock:
+            timestamp = float(transaction.timestamp)
+            if self._size and timestamp < self._timestamps[-1]:
+                # Keep the column sorted for bisection; clocks can step backwards
+                timestamp = self._timestamps[-1]
+            self._timestamps.append(timestamp)
+            self._amounts.append(to_cents(transaction.amount))
+            self._types.append(self._strings.code(transaction.type))
+            self._recipients.append(self._strings.code(transaction.to))
+            self._sources.append(self._strings.code(transaction.from_account))
+            self._size += 1
+
+    def pop(self) -> Any:
+        """Remove and return the newest row, e.g. to undo an append whose transfer failed."""
+        with self._lock:
+            if not self._size:
+                raise IndexError("pop from an empty TransactionStore")
+            row = self._row(self._size - 1)
+            self._size -= 1
+            for column in self._columns():
+                column.pop()
+            return row
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """Stored timestamp of the newest row (after clamping), or None when empty."""
+        with self._lock:
+            return self._timestamps[self._size - 1] if self._size else None
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            rows = [self._row(index) for index in range(self._size)]
+        return iter(rows)
+
+    def query(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> TransactionPage:
+        """Return the latest `limit` transactions with `start <= timestamp < end`, before `cursor`.
+
+        Pass the returned `next_cursor` back to get the page of older rows.
+        """
+        with self._lock:
+            size = self._size
+            low = bisect_left(self._timestamps, start, 0, size) if start is not None else 0
+            high = bisect_left(self._timestamps, end, 0, size) if end is not None else size
+            if cursor is not None:
+                high = min(high, cursor)
+            first = max(low, high - limit) if limit is not None else low
+            rows = [self._row(index) for index in range(first, high)] if first < high else []
+        return TransactionPage(rows, first if first > low else None)
+
+    def count_between(self, start: float, end: float) -> int:
+        """Number of transactions with `start <= timestamp < end`."""
+        with self._lock:
+            return bisect_left(self._timestamps, end, 0, self._size) - bisect_left(self._timestamps, start, 0, self._size)
+
+    def dump(self) -> Tuple[List[str], List[bytes]]:
+        """Interned strings and the raw bytes of each column, for snapshots."""
+        with self._lock:
+            size = self._size
+            columns = [column[:size].tobytes() for column in self._columns()]
+            return list(self._strings.values), columns
+
+    def restore(self, strings: List[str], columns: List[bytes]) -> None:
+        """Load the output of `dump` into this empty store."""
+        with self._lock:
+            if self._size:
+                raise ValueError("Can only restore into an empty store.")
+            for value in strings:
+                self._strings.code(value)
+            for column, data in zip(self._columns(), columns):
+                column.frombytes(data)
+            self._size = len(self._timestamps)
+
+    def _columns(self) -> List[array]:
+        return [self._timestamps, self._amounts, self._types, self._recipients, self._sources]
+
+    def _row(self, index: int) -> Any:
+        strings = self._strings.values
+        return self.row_factory(
+            type=strings[self._types[index]],
+            to=strings[self._recipients[index]],
+            amount=self._amounts[index] / 100,
+            from_account=strings[self._sources[index]],
+            timestamp=self._timestamps[index]
+        )
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from typing import List, Dict, Any
+from app.domain.prompt_builder import RenderedHistory
 
 @dataclass
 class UserSession:
@@ -12,6 +13,9 @@ class UserSession:
     def __post_init__(self):
         if self.previous_result is None:
             self.previous_result = {}
+        if not isinstance(self.history, RenderedHistory):
+            # Keeps the prompt rendering of the history incremental
+            self.history = RenderedHistory(self.history)
 
     def add_to_history(self, message: str):
         self.history.append(message)
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import ssl
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.infra.llm_adapter import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    MODEL,
+    OLLAMA_URL,
+    LLMCompletion,
+    StreamCollector,
+    build_payload,
+)
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _StaleConnection(ConnectionError):
+    """Raised when a pooled keep-alive socket was closed by the server before answering."""
+
+
+class AsyncOllamaClient:
+    """Asyncio Ollama client speaking HTTP/1.1 over a pool of keep-alive streams.
+
+    A single event loop can keep many requests in flight; `pool_size` bounds how
+    many sockets are open against Ollama at the same time.
+    """
+
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = MODEL,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        stream: bool = False
+    ):
+        parts = urlsplit(url)
+        self.url = url
+        self.model = model
+        self.stream = stream
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or (443 if parts.scheme == "https" else 80)
+        self._path = parts.path or "/"
+        self._ssl = ssl.create_default_context() if parts.scheme == "https" else None
+
+        self._idle: List[_Connection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._requests = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._connections_opened = 0
+        self._connections_reused = 0
+        self._in_flight = 0
+        self._early_stops = 0
+
+    async def generate(self, prompt: str, stream: Optional[bool] = None) -> str:
+        """Send a prompt to Ollama and return the raw text response.
+
+        In streaming mode the generation is cancelled as soon as the first
+        top-level JSON object closes, so trailing chatter is never produced.
+        """
+        return (await self.complete(prompt, stream=stream)).text
+
+    async def complete(
+        self,
+        prompt: str,
+        stream: Optional[bool] = None,
+        context: Optional[List[int]] = None,
+        format: Optional[Dict[str, Any]] = None
+    ) -> LLMCompletion:
+        """Like `generate`, but also returns Ollama's `context` tokens and whether the call succeeded."""
+        stream = self.stream if stream is None else stream
+        payload = build_payload(prompt, self.model, stream=stream, context=context, format=format)
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            if stream:
+                return await self._complete_streaming(payload)
+            body = await self._post(payload)
+            data = json.loads(body)
+            if "response" not in data:
+                return LLMCompletion(text="Resposta inesperada.", ok=False)
+            return LLMCompletion(text=data["response"], context=data.get("context"))
+
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            return LLMCompletion(text="Timeout: Ollama demorou demais para responder.", ok=False)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            self._errors += 1
+            return LLMCompletion(text=f"Erro ao conectar com Ollama: {e}", ok=False)
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and connection reuse statistics."""
+        return {
+            "requests": self._requests,
+            "timeouts": self._timeouts,
+            "errors": self._errors,
+            "early_stops": self._early_stops,
+            "in_flight": self._in_flight,
+            "connections_opened": self._connections_opened,
+            "connections_reused": self._connections_reused,
+            "idle_connections": len(self._idle),
+            "pool_size": self.pool_size
+        }
+
+    async def close(self) -> None:
+        """Close every idle pooled connection."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _complete_streaming(self, payload: Dict[str, Any]) -> LLMCompletion:
+        collector = StreamCollector()
+        pending = b""
+        body = self._stream(payload)
+        try:
+            async for chunk in body:
+                if collector.finished:
+                    continue  # drain the terminating chunk so the socket can be reused
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if collector.feed_line(line):
+                        break
+                if collector.early_stop:
+                    break
+            if pending and not collector.finished:
+                collector.feed_line(pending)
+        finally:
+            # Closing the generator early drops the socket, which makes Ollama stop generating
+            await body.aclose()
+        if collector.early_stop:
+            self._early_stops += 1
+        return collector.completion()
+
+    async def _post(self, payload: Dict[str, Any]) -> bytes:
+        chunks = []
+        async for chunk in self._stream(payload):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _stream(self, payload: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """POST `payload` and yield the response body as it arrives.
+
+        The connection goes back to the pool only when the body was fully
+        consumed; a consumer that stops early gets the socket closed instead,
+        which is how a generation is cancelled on the Ollama side.
+        """
+        self._bind_loop()
+        body = json.dumps(payload).encode("utf-8")
+        async with self._slots:
+            connection, reused = await self._acquire()
+            try:
+                try:
+                    headers = await self._send(connection, body)
+                except _StaleConnection:
+                    if not reused:
+                        raise
+                    connection, reused = await self._open(), False
+                    headers = await self._send(connection, body)
+                if reused:
+                    self._connections_reused += 1
+
+                async for chunk in self._read_body(connection[0], headers):
+                    yield chunk
+            except BaseException:
+                connection[1].close()
+                raise
+            else:
+                if headers.get("connection", "").lower() == "close":
+                    connection[1].close()
+                else:
+                    self._idle.append(connection)
+
+    def _bind_loop(self) -> None:
+        # Streams belong to the loop that opened them; start over on a new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def _acquire(self) -> Tuple[_Connection, bool]:
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection[0].at_eof() and not connection[1].is_closing():
+                return connection, True
+            connection[1].close()
+        return await self._open(), False
+
+    async def _open(self) -> _Connection:
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port, ssl=self._ssl),
+            self.connect_timeout
+        )
+        self._connections_opened += 1
+        return connection
+
+    async def _send(self, connection: _Connection, body: bytes) -> Dict[str, str]:
+        reader, writer = connection
+        request_head = (
+            f"POST {self._path} HTTP/1.1\r\n"
+            f"Host: {self._host}:{self._port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n"
+        ).encode("ascii")
+        try:
+            writer.write(request_head + body)
+            await writer.drain()
+        except ConnectionError as e:
+            raise _StaleConnection(str(e)) from e
+
+        status_line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+        if not status_line:
+            raise _StaleConnection()
+        parts = status_line.decode("latin-1").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ValueError(f"Resposta HTTP inválida: {status_line!r}")
+
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if parts[0] == "HTTP/1.0":
+            headers.setdefault("connection", "close")
+        return headers
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> AsyncIterator[bytes]:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Trailer section ends with an empty line
+                    while (await asyncio.wait_for(reader.readline(), self.read_timeout)) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                chunk = await asyncio.wait_for(reader.readexactly(size + 2), self.read_timeout)
+                yield chunk[:-2]
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining > 0:
+                chunk = await asyncio.wait_for(reader.read(min(remaining, 65536)), self.read_timeout)
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            headers["connection"] = "close"
+            while True:
+                chunk = await asyncio.wait_for(reader.read(65536), self.read_timeout)
+                if not chunk:
+                    return
+                yield chunk
+
+
+_default_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOllamaClient]" = weakref.WeakKeyDictionary()
+
+
+class ConcurrencyLimitedLLM:
+    """Caps how many calls to an async LLM client run at once; the rest wait their turn.
+
+    Keeps the backend at the parallelism it can actually decode while any
+    number of sessions share it.
+    """
+
+    def __init__(self, client: Any, max_concurrency: int = 4):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting = 0
+        self._running = 0
+        self._calls = 0
+
+    async def generate(self, prompt: str, **options) -> str:
+        return (await self.complete(prompt, **options)).text
+
+    async def complete(self, prompt: str, **options) -> LLMCompletion:
+        slots = self._bind_loop()
+        self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        self._calls += 1
+        try:
+            return await self.client.complete(prompt, **options)
+        finally:
+            self._running -= 1
+            slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "waiting": self._waiting,
+            "calls": self._calls
+        }
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+
+def get_default_async_client() -> AsyncOllamaClient:
+    """Return the client used by `aquery_llm` for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _default_clients.get(loop)
+    if client is None:
+        client = AsyncOllamaClient()
+        _default_clients[loop] = client
+    return client
+
+
+async def aquery_llm(prompt):
+    return await get_default_async_client().generate(prompt)
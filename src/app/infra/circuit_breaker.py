@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling the LLM after repeated failures so turns do not wait for timeouts.
+
+    Closed: calls go through; `failure_threshold` consecutive failures open
+    the circuit. Open: calls are rejected for `reset_timeout` seconds.
+    Half-open: up to `half_open_probes` calls at a time are let through as
+    probes; `success_threshold` successful probes close the circuit and any
+    failed probe opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        half_open_probes: int = 1,
+        success_threshold: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        history_size: int = 50
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.success_threshold = success_threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._probes_in_flight = 0
+        self._opened_at = 0.0
+
+        self._transitions: Counter = Counter()
+        self._history: Deque[Tuple[float, str, str]] = deque(maxlen=history_size)
+        self._rejected = 0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the LLM now; every allowed call must be followed by `record` or `release`."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                self._probes += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, ok: bool) -> None:
+        """Report the outcome of an allowed call."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not ok:
+                    self._transition(OPEN)
+                    return
+                self._successes += 1
+                if self._successes >= self.success_threshold:
+                    self._transition(CLOSED)
+                return
+
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """End an allowed call without an outcome, e.g. when it was cancelled, freeing its probe slot."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state plus transition counts, recent transitions, rejected calls and probes."""
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "transitions": dict(self._transitions),
+                "recent_transitions": list(self._history),
+                "rejected": self._rejected,
+                "probes": self._probes
+            }
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        now = self._clock()
+        self._transitions[f"{self._state}->{state}"] += 1
+        self._history.append((now, self._state, state))
+        self._state = state
+        self._failures = 0
+        self._successes = 0
+        self._probes_in_flight = 0
+        if state == OPEN:
+            self._opened_at = now
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.domain.intent_classifier import build_result, extract_entities, normalize_text
+from app.domain.rule_intent_classifier import RuleIntentClassifier
+from app.infra.llm_adapter import LLMCompletion
+
+_CURRENT_MESSAGE = re.compile(r"Mensagem atual do usuário:\n(.*?)\n*(?:\n\n|\Z)", re.S)
+_TRANSFER = re.compile(r"\b(transf|envi|mand|pag|pix)")
+_AMOUNT = re.compile(r"(\d+(?:[.,]\d{1,2})?)")
+_RECIPIENT = re.compile(r"\bpara (?:a |o )?([A-Za-zÀ-ÿ]+)", re.I)
+
+_QUESTIONS = {
+    "amount": "Qual valor você deseja transferir?",
+    "recipient": "Para quem você deseja transferir?"
+}
+
+
+def current_message(prompt: str) -> str:
+    """The user's latest message inside an intent prompt (the whole prompt if it has no such section)."""
+    match = _CURRENT_MESSAGE.search(prompt)
+    return match.group(1).strip() if match else prompt.strip()
+
+
+def fake_reply(prompt: str, classifier: Optional[RuleIntentClassifier] = None) -> str:
+    """Answer an intent prompt the way the model is asked to, from the current message alone."""
+    message = current_message(prompt)
+    text = normalize_text(message)
+
+    entities: Dict[str, Any] = extract_entities(text)
+    amount = _AMOUNT.search(text)
+    if amount:
+        entities["amount"] = float(amount.group(1).replace(",", "."))
+    recipient = _RECIPIENT.search(message)
+    if recipient:
+        entities["recipient"] = recipient.group(1).capitalize()
+
+    missing: List[str] = []
+    if _TRANSFER.search(text) or ("amount" in entities or "recipient" in entities):
+        intent = "transfer"
+        missing = [name for name in ("amount", "recipient") if name not in entities]
+    else:
+        intent, confidence = (classifier or RuleIntentClassifier(blockers=[])).score(message)
+        if confidence < 0.5:
+            intent = "unknown"
+
+    result = build_result(intent, entities, missing)
+    if missing:
+        result["next_question"] = _QUESTIONS[missing[0]]
+    return json.dumps(result, ensure_ascii=False)
+
+
+class FakeLLM:
+    """Stand-in for Ollama in tests and benchmarks: answers from keyword rules after `latency_ms`.
+
+    Implements `LLMClient` and `complete()`. Tracks how many calls were in
+    flight at once, so tests can check concurrency limits.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self._classifier = RuleIntentClassifier(blockers=[])
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def generate(self, prompt: str, **options) -> str:
+        return self.complete(prompt, **options).text
+
+    def complete(self, prompt: str, **options) -> LLMCompletion:
+        self._enter()
+        try:
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            return LLMCompletion(text=fake_reply(prompt, self._classifier))
+        finally:
+            self._leave()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+class AsyncFakeLLM(FakeLLM):
+    """Async variant of `FakeLLM`, a stand-in for `AsyncOllamaClient`."""
+
+    async def generate(self, prompt: str, **options) -> str:
+        return (await self.complete(prompt, **options)).text
+
+    async def complete(self, prompt: str, **options) -> LLMCompletion:
+        self._enter()
+        try:
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return LLMCompletion(text=fake_reply(prompt, self._classifier))
+        finally:
+            self._leave()
@@ -0,0 +1,150 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_decoder = json.JSONDecoder()
+
+# Outside a string only braces and quotes matter for finding where the object closes
+_OUTSIDE = re.compile(r'[{}"]')
+_BEFORE_START = re.compile(r"\{")
+_STRING_END = re.compile(r'["\\]')
+
+# One token per match: a string, a structural character, a bare word or whitespace
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"?|[{}\[\]:,]|[^\s{}\[\]:,"]+|\s+', re.S)
+_BARE_KEY = re.compile(r"[A-Za-z_][\w-]*|'[^']*'")
+
+
+class JsonNotFoundError(ValueError):
+    """The text has no JSON object in it."""
+
+
+class JsonExtractor:
+    """Pulls the first top-level JSON object out of LLM output, fed whole or in stream chunks.
+
+    Each fragment is scanned once, jumping between quotes and braces, to track
+    where the first object closes; text before it and after it is ignored.
+    `result` parses the object as strict JSON and only falls back to
+    `repair_json` (unquoted keys, trailing commas) when that fails.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.complete = False
+        self.in_string = False
+        self.escaped = False
+        self._parts: List[str] = []
+
+    def feed(self, fragment: str) -> int:
+        """Consume a fragment; return the index just past the closing brace, or -1 if still open."""
+        if self.complete:
+            return 0
+        start = 0 if self.started else -1
+        pos = 0
+        if self.escaped and fragment:
+            self.escaped = False
+            pos = 1
+        while True:
+            if self.in_string:
+                match = _STRING_END.search(fragment, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    if match.end() == len(fragment):
+                        self.escaped = True
+                        break
+                    pos = match.end() + 1
+                    continue
+                self.in_string = False
+                pos = match.end()
+                continue
+
+            match = (_OUTSIDE if self.started else _BEFORE_START).search(fragment, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char == "{":
+                if not self.started:
+                    self.started = True
+                    start = match.start()
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    self._parts.append(fragment[start:pos])
+                    return pos
+
+        if start >= 0:
+            self._parts.append(fragment[start:])
+        return -1
+
+    @property
+    def text(self) -> str:
+        """The object text seen so far, from its opening brace."""
+        return "".join(self._parts)
+
+    def result(self) -> Dict[str, Any]:
+        """Parse the extracted object.
+
+        Raises `JsonNotFoundError` when no object started and
+        `json.JSONDecodeError` when it cannot be parsed even after repair.
+        """
+        if not self.started:
+            raise JsonNotFoundError("No JSON block found in response.")
+        text = self.text
+        try:
+            data, _ = _decoder.raw_decode(text)
+        except json.JSONDecodeError:
+            data = json.loads(repair_json(text))
+        if not isinstance(data, dict):
+            raise json.JSONDecodeError("Expected a JSON object", text, 0)
+        return data
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """Return the first JSON object found in `text`; see `JsonExtractor.result` for errors."""
+    extractor = JsonExtractor()
+    extractor.feed(text)
+    return extractor.result()
+
+
+def repair_json(text: str) -> str:
+    """Quote bare object keys and drop trailing commas, leaving strings untouched."""
+    tokens = _TOKEN.findall(text)
+    out: List[str] = []
+    containers: List[str] = []
+    expect_key = False
+    for index, token in enumerate(tokens):
+        first = token[0]
+        if first in "{[":
+            containers.append(first)
+            expect_key = first == "{"
+        elif first in "}]":
+            if containers:
+                containers.pop()
+            expect_key = False
+        elif first == ",":
+            following = _next_significant(tokens, index)
+            if following is not None and following in "}]":
+                continue
+            expect_key = bool(containers) and containers[-1] == "{"
+        elif first == ":":
+            expect_key = False
+        elif expect_key and _BARE_KEY.fullmatch(token) and _next_significant(tokens, index) == ":":
+            token = json.dumps(token.strip("'"))
+            expect_key = False
+        elif not first.isspace():
+            expect_key = False
+        out.append(token)
+    return "".join(out)
+
+
+def _next_significant(tokens: List[str], index: int) -> Optional[str]:
+    for token in tokens[index + 1:]:
+        if not token.isspace():
+            return token[0]
+    return None
@@ -0,0 +1,336 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from app.infra.logger_adapter import logger
+
+_OPEN_ACCOUNT = 1
+_TRANSFER = 2
+
+# Record: payload length and CRC32, then the payload (kind byte + fields)
+_RECORD_HEADER = struct.Struct("<II")
+_OPEN_FIELDS = struct.Struct("<Bq")
+_TRANSFER_FIELDS = struct.Struct("<Bqd")
+_STRING_LENGTH = struct.Struct("<H")
+
+_SNAPSHOT_MAGIC = b"LDGSNAP1"
+_SNAPSHOT_HEADER = struct.Struct("<QI")
+_BLOB_LENGTH = struct.Struct("<Q")
+
+_SEGMENT_SUFFIX = ".journal"
+_SNAPSHOT_FILE = "ledger.snapshot"
+
+
+class OpenAccountEvent(NamedTuple):
+    user_id: str
+    account_type: str
+    balance_cents: int
+
+
+class TransferEvent(NamedTuple):
+    user_id: str
+    account_type: str
+    recipient: str
+    amount_cents: int
+    timestamp: float
+
+
+LedgerEvent = Union[OpenAccountEvent, TransferEvent]
+
+
+class JournalError(RuntimeError):
+    """The journal is closed, or a write or fsync failed and it no longer accepts records."""
+
+
+def encode_event(event: LedgerEvent) -> bytes:
+    """Serialize one event as a length-prefixed, checksummed record."""
+    if isinstance(event, TransferEvent):
+        payload = _TRANSFER_FIELDS.pack(_TRANSFER, event.amount_cents, event.timestamp)
+        strings = (event.user_id, event.account_type, event.recipient)
+    else:
+        payload = _OPEN_FIELDS.pack(_OPEN_ACCOUNT, event.balance_cents)
+        strings = (event.user_id, event.account_type)
+    for value in strings:
+        data = value.encode("utf-8")
+        payload += _STRING_LENGTH.pack(len(data)) + data
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_events(buffer: Any, offset: int = 0) -> Iterator[Tuple[LedgerEvent, int]]:
+    """Yield `(event, end_offset)` for each intact record; stops at the first torn or corrupt one."""
+    size = len(buffer)
+    while offset + _RECORD_HEADER.size <= size:
+        length, checksum = _RECORD_HEADER.unpack_from(buffer, offset)
+        end = offset + _RECORD_HEADER.size + length
+        # One copy per record: the CRC and the fields are read from it rather than from the map
+        payload = buffer[offset + _RECORD_HEADER.size:end]
+        if end > size or not length or zlib.crc32(payload) != checksum:
+            return
+        kind = payload[0]
+        if kind == _TRANSFER:
+            _, amount_cents, timestamp = _TRANSFER_FIELDS.unpack_from(payload)
+            user_id, account_type, recipient = _read_strings(payload, _TRANSFER_FIELDS.size, 3)
+            yield TransferEvent(user_id, account_type, recipient, amount_cents, timestamp), end
+        elif kind == _OPEN_ACCOUNT:
+            _, balance_cents = _OPEN_FIELDS.unpack_from(payload)
+            user_id, account_type = _read_strings(payload, _OPEN_FIELDS.size, 2)
+            yield OpenAccountEvent(user_id, account_type, balance_cents), end
+        else:
+            return
+        offset = end
+
+
+def _read_strings(payload: bytes, offset: int, count: int) -> List[str]:
+    values = []
+    for _ in range(count):
+        length = payload[offset] | payload[offset + 1] << 8
+        offset += 2
+        values.append(payload[offset:offset + length].decode("utf-8"))
+        offset += length
+    return values
+
+
+class LedgerJournal:
+    """Append-only, durable log of ledger events, with snapshots for fast restarts.
+
+    Events go to numbered segment files in `directory`. `append` only
+    buffers a record and returns its sequence number; `commit(seq)` returns
+    once that record is on disk. Commits are grouped: the first waiting
+    writer writes and fsyncs everything buffered so far, so writers that
+    arrived meanwhile are covered by the same fsync.
+
+    `rotate` starts a new segment; a snapshot taken at that point covers
+    every older segment, which `write_snapshot` then deletes. On restart,
+    `load_snapshot` maps the snapshot file and `replay` reads only the
+    segments written after it.
+
+    A failed write or fsync stops the journal: that commit and every later
+    `append` or `commit` of a record not yet durable raise `JournalError`,
+    and the segment is truncated back to the end of the last durable record,
+    so records whose commit failed are not replayed on restart. If even the
+    truncation fails, the error is logged and those records may come back.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._pending = bytearray()
+        self._seq = 0
+        self._durable_seq = 0
+        self._failure: Optional[BaseException] = None
+        self._closed = False
+
+        self.records = 0
+        self.fsyncs = 0
+        self.bytes_written = 0
+
+        segments = self.segments()
+        self._segment = segments[-1] if segments else 1
+        self._truncate_torn_tail(self._segment_path(self._segment))
+        self._open_segment()
+
+    def segments(self) -> List[int]:
+        """Numbers of the segment files on disk, oldest first."""
+        return sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+
+    def append(self, event: LedgerEvent) -> int:
+        """Buffer an event; returns the sequence number to pass to `commit`."""
+        record = encode_event(event)
+        with self._lock:
+            self._check_usable()
+            self._pending += record
+            self._seq += 1
+            self.records += 1
+            return self._seq
+
+    def commit(self, seq: Optional[int] = None) -> None:
+        """Block until record `seq` (default: everything appended so far) is fsynced.
+
+        Raises `JournalError` when the record can no longer become durable.
+        """
+        if seq is None:
+            seq = self._seq
+        if seq <= self._durable_seq:
+            return
+        with self._commit_lock:
+            # A previous leader may have synced this record while we waited
+            if seq <= self._durable_seq:
+                return
+            self._sync()
+
+    def rotate(self) -> int:
+        """Sync and close the current segment and start the next one; returns its number."""
+        with self._commit_lock:
+            self._sync()
+            with self._lock:
+                self._file.close()
+                self._segment += 1
+                self._open_segment()
+                return self._segment
+
+    def replay(self, from_segment: int = 0) -> Iterator[LedgerEvent]:
+        """Yield every durable event in segments `from_segment` and later, in order."""
+        for segment in self.segments():
+            if segment < from_segment:
+                continue
+            with open(self._segment_path(segment), "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for event, _ in decode_events(mapped):
+                        yield event
+
+    def write_snapshot(self, segment: int, accounts: List[Dict[str, Any]]) -> None:
+        """Atomically replace the snapshot with one covering every segment before `segment`.
+
+        Each account is a JSON-serializable dict, except for an optional
+        "columns" list of byte strings that is stored raw after it.
+        """
+        path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        with open(path + ".tmp", "wb") as file:
+            file.write(_SNAPSHOT_MAGIC + _SNAPSHOT_HEADER.pack(segment, len(accounts)))
+            for account in accounts:
+                columns = account.get("columns", [])
+                meta = dict(account, columns=[len(column) for column in columns])
+                data = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+                file.write(_BLOB_LENGTH.pack(len(data)) + data)
+                for column in columns:
+                    file.write(column)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        self._sync_directory()
+        for old in self.segments():
+            if old < segment:
+                os.remove(self._segment_path(old))
+
+    def load_snapshot(self) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        """Return `(segment, accounts)` from the latest snapshot, or None when there is none."""
+        path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a ledger snapshot.")
+            segment, count = _SNAPSHOT_HEADER.unpack_from(mapped, len(_SNAPSHOT_MAGIC))
+            offset = len(_SNAPSHOT_MAGIC) + _SNAPSHOT_HEADER.size
+            view = memoryview(mapped)
+            accounts = []
+            try:
+                for _ in range(count):
+                    (length,) = _BLOB_LENGTH.unpack_from(mapped, offset)
+                    offset += _BLOB_LENGTH.size
+                    account = json.loads(bytes(view[offset:offset + length]))
+                    offset += length
+                    columns = []
+                    for size in account["columns"]:
+                        columns.append(view[offset:offset + size].tobytes())
+                        offset += size
+                    account["columns"] = columns
+                    accounts.append(account)
+            finally:
+                view.release()
+        return segment, accounts
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "segment": self._segment,
+            "records": self.records,
+            "fsyncs": self.fsyncs,
+            "bytes_written": self.bytes_written,
+            "records_per_fsync": self.records / self.fsyncs if self.fsyncs else 0.0
+        }
+
+    def close(self) -> None:
+        """Commit what is pending and close the segment; later appends and commits raise `JournalError`."""
+        with self._commit_lock:
+            try:
+                if self._failure is None and not self._closed:
+                    self._sync()
+            finally:
+                with self._lock:
+                    self._closed = True
+                    self._file.close()
+
+    def _sync(self) -> None:
+        # Caller holds the commit lock, so only one writer touches the file
+        with self._lock:
+            self._check_usable()
+            data, upto = self._pending, self._seq
+            self._pending = bytearray()
+        if data:
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[self._file.write(view):]
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                # Part of `data` may be on disk: retrying could write it twice, so stop here
+                with self._lock:
+                    self._failure = e
+                logger.error(f"Journal write to {self._file.name} failed: {e}")
+                self._discard_undurable()
+                raise JournalError("Journal write failed; records after the last commit are not durable.") from e
+            self.fsyncs += 1
+            self.bytes_written += len(data)
+            self._durable_size += len(data)
+        self._durable_seq = upto
+
+    def _discard_undurable(self) -> None:
+        # Records that reached the page cache would pass the CRC check on replay
+        # although their commit failed, so cut the segment back to the durable end
+        try:
+            os.ftruncate(self._file.fileno(), self._durable_size)
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.error(
+                f"Could not truncate {self._file.name} to {self._durable_size} bytes: {e}; "
+                "records whose commit failed may be replayed on restart."
+            )
+
+    def _open_segment(self) -> None:
+        # Unbuffered, so a failed write leaves nothing behind to be flushed on close
+        self._file = open(self._segment_path(self._segment), "ab", buffering=0)
+        self._durable_size = os.fstat(self._file.fileno()).st_size
+
+    def _check_usable(self) -> None:
+        # Caller holds self._lock
+        if self._closed:
+            raise JournalError("Journal is closed.")
+        if self._failure is not None:
+            raise JournalError("Journal failed earlier; records after the last commit are not durable.") from self._failure
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:06d}{_SEGMENT_SUFFIX}")
+
+    def _truncate_torn_tail(self, path: str) -> None:
+        # A crash mid-write leaves a partial record; drop it so new records stay readable
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "r+b") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = 0
+                for _, end in decode_events(mapped):
+                    pass
+                size = len(mapped)
+            if end < size:
+                logger.warning(f"Dropping {size - end} bytes of torn journal tail in {path}.")
+                file.truncate(end)
+
+    def _sync_directory(self) -> None:
+        if hasattr(os, "O_DIRECTORY"):
+            descriptor = os.open(self.directory, os.O_DIRECTORY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
@@ -1,23 +1,250 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from app.infra.json_extractor import JsonExtractor
 
-OLLAMA_URL = 'http://localhost:11434/api/generate'
+OLLAMA_URL = os.environ.get("OLLAMA_URL", 'http://localhost:11434/api/generate')
 MODEL = 'llama3.2'
 
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_POOL_SIZE = 10
+
+
+class LLMClient(Protocol):
+    """Anything that turns a prompt into the raw LLM text: a client, a pool, a batcher."""
+
+    def generate(self, prompt: str) -> str:
+        ...
+
+
+@dataclass
+class LLMCompletion:
+    """Raw LLM text plus what Ollama returns alongside it."""
+    text: str
+    context: Optional[List[int]] = None
+    ok: bool = True
+
+
+def build_payload(
+    prompt: str,
+    model: str = MODEL,
+    stream: bool = False,
+    context: Optional[List[int]] = None,
+    format: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Build the /api/generate request body shared by every client."""
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "options": {
+            "temperature": 0  # 🧊 garante consistência
+        }
+    }
+    if context:
+        # Ollama resumes from these tokens and only evaluates the new prompt text
+        payload["context"] = context
+    if format:
+        # JSON schema for Ollama's structured outputs: decoding is constrained to match it
+        payload["format"] = format
+    return payload
+
+
+class StreamCollector:
+    """Accumulates Ollama NDJSON stream lines until the model is done or the JSON object closes."""
+
+    def __init__(self):
+        self.extractor = JsonExtractor()
+        self.parts: List[str] = []
+        self.finished = False
+        self.early_stop = False
+        self.error: Optional[str] = None
+        self.context: Optional[List[int]] = None
+
+    def feed_line(self, line: bytes) -> bool:
+        """Consume one NDJSON line; return True once nothing more needs to be read."""
+        if not line.strip():
+            return self.finished
+        chunk = json.loads(line)
+        if "error" in chunk:
+            self.error = chunk["error"]
+            self.finished = True
+            return True
+
+        fragment = chunk.get("response", "")
+        end = self.extractor.feed(fragment)
+        if end >= 0:
+            self.parts.append(fragment[:end])
+            self.early_stop = not chunk.get("done", False)
+            self.finished = True
+        else:
+            self.parts.append(fragment)
+            self.finished = bool(chunk.get("done", False))
+        if chunk.get("done"):
+            self.context = chunk.get("context")
+        return self.finished
+
+    def completion(self) -> LLMCompletion:
+        return LLMCompletion(text=self.text, context=self.context, ok=self.error is None and self.finished)
+
+    @property
+    def text(self) -> str:
+        if self.error is not None and not self.parts:
+            return f"Erro ao conectar com Ollama: {self.error}"
+        return "".join(self.parts) if self.parts or self.finished else "Resposta inesperada."
+
+
+class OllamaClient:
+    """Long-lived Ollama client that keeps TCP connections alive between turns."""
+
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = MODEL,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_block: bool = True,
+        stream: bool = False
+    ):
+        self.url = url
+        self.model = model
+        self.stream = stream
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+
+        # Bounded pool: at most `pool_size` sockets per host, callers wait when exhausted
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=pool_block)
+        self._session = requests.Session()
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._early_stops = 0
+
+    def generate(self, prompt: str, stream: Optional[bool] = None) -> str:
+        """Send a prompt to Ollama and return the raw text response.
+
+        In streaming mode the generation is cancelled as soon as the first
+        top-level JSON object closes, so trailing chatter is never produced.
+        """
+        return self.complete(prompt, stream=stream).text
+
+    def complete(
+        self,
+        prompt: str,
+        stream: Optional[bool] = None,
+        context: Optional[List[int]] = None,
+        format: Optional[Dict[str, Any]] = None
+    ) -> LLMCompletion:
+        """Like `generate`, but also returns Ollama's `context` tokens and whether the call succeeded.
+
+        A stream cancelled early carries no context. `format` is an optional
+        JSON schema the reply is constrained to.
+        """
+        stream = self.stream if stream is None else stream
+        payload = build_payload(prompt, self.model, stream=stream, context=context, format=format)
+        with self._lock:
+            self._requests += 1
+        try:
+            if stream:
+                return self._complete_streaming(payload)
+            response = self._session.post(self.url, json=payload, timeout=self.timeout)
+            data = response.json()
+            if "response" not in data:
+                return LLMCompletion(text="Resposta inesperada.", ok=False)
+            return LLMCompletion(text=data["response"], context=data.get("context"))
+
+        except requests.exceptions.Timeout:
+            with self._lock:
+                self._timeouts += 1
+            return LLMCompletion(text="Timeout: Ollama demorou demais para responder.", ok=False)
+        except requests.exceptions.RequestException as e:
+            with self._lock:
+                self._errors += 1
+            return LLMCompletion(text=f"Erro ao conectar com Ollama: {e}", ok=False)
+        except ValueError as e:
+            with self._lock:
+                self._errors += 1
+            return LLMCompletion(text=f"Erro ao conectar com Ollama: {e}", ok=False)
+
+    def _complete_streaming(self, payload: Dict[str, Any]) -> LLMCompletion:
+        response = self._session.post(self.url, json=payload, timeout=self.timeout, stream=True)
+        collector = StreamCollector()
+        try:
+            for line in response.iter_lines():
+                if collector.feed_line(line):
+                    break
+        finally:
+            if collector.early_stop or not collector.finished:
+                # Dropping the socket is how Ollama learns to stop generating
+                response.close()
+                if collector.early_stop:
+                    with self._lock:
+                        self._early_stops += 1
+            else:
+                response.raw.drain_conn()
+                response.raw.release_conn()
+        return collector.completion()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and connection pool reuse statistics."""
+        connections_opened = 0
+        pool_requests = 0
+        for pool in self._connection_pools():
+            connections_opened += pool.num_connections
+            pool_requests += pool.num_requests
+
+        with self._lock:
+            requests_sent = self._requests
+            timeouts = self._timeouts
+            errors = self._errors
+            early_stops = self._early_stops
+
+        reused = max(pool_requests - connections_opened, 0)
+        return {
+            "requests": requests_sent,
+            "timeouts": timeouts,
+            "errors": errors,
+            "early_stops": early_stops,
+            "connections_opened": connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": reused / pool_requests if pool_requests else 0.0,
+            "pool_size": self.pool_size
+        }
+
+    def close(self) -> None:
+        """Release every pooled connection."""
+        self._session.close()
+
+    def _connection_pools(self):
+        pools = self._adapter.poolmanager.pools
+        return [pools[key] for key in list(pools.keys())]
+
+
+_default_client: Optional[OllamaClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> OllamaClient:
+    """Return the process-wide client used by `query_llm`, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = OllamaClient()
+    return _default_client
+
+
 def query_llm(prompt):
-    try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0  # 🧊 garante consistência
-            }
-        }, timeout=10)
-
-        data = response.json()
-        return data.get("response", "Resposta inesperada.")
-
-    except requests.exceptions.Timeout:
-        return "Timeout: Ollama demorou demais para responder."
-    except requests.exceptions.RequestException as e:
-        return f"Erro ao conectar com Ollama: {e}"
+    return get_default_client().generate(prompt)
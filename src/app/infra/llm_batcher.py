@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.infra.llm_adapter import LLMClient, OllamaClient
+
+
+@dataclass
+class _PendingRequest:
+    prompt: str
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+_STOP = object()
+
+
+class LLMBatcher:
+    """Collects concurrent LLM requests from many sessions and dispatches them in batches.
+
+    A batch closes when `max_batch_size` requests are waiting or `max_wait_ms`
+    elapsed since the first one arrived. Its requests are sent in parallel over
+    `num_parallel` workers, which should match the Ollama server's
+    `OLLAMA_NUM_PARALLEL` so a whole batch is decoded together. At most
+    `num_parallel` requests are in flight; the dispatcher only waits for a
+    free slot, never for a whole batch, so one slow request does not hold
+    back the batches after it.
+
+    Implements `LLMClient`, so it can be injected into `IntentService` in place
+    of an `OllamaClient`.
+    """
+
+    def __init__(
+        self,
+        client: Optional[LLMClient] = None,
+        max_batch_size: int = 4,
+        max_wait_ms: float = 10.0,
+        num_parallel: int = 4
+    ):
+        self.client = client or OllamaClient(pool_size=num_parallel)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.num_parallel = num_parallel
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=num_parallel, thread_name_prefix="llm-batch")
+        self._slots = threading.Semaphore(num_parallel)
+        self._dispatcher: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+
+        self._batches = 0
+        self._requests = 0
+        self._fill_total = 0.0
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+
+    def submit(self, prompt: str) -> Future:
+        """Queue a prompt and return a future resolving to the raw LLM response.
+
+        Raises RuntimeError once the batcher is closed.
+        """
+        request = _PendingRequest(prompt)
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError("LLMBatcher is closed.")
+            self._ensure_started()
+            self._queue.put(request)
+        return request.future
+
+    def generate(self, prompt: str) -> str:
+        """Queue a prompt and block until its batch has been answered."""
+        return self.submit(prompt).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch-fill ratio and queueing delay added by batching."""
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "mean_fill_ratio": self._fill_total / self._batches if self._batches else 0.0,
+                "mean_queue_delay_ms": 1000 * self._queue_delay_total / self._requests if self._requests else 0.0,
+                "max_queue_delay_ms": 1000 * self._queue_delay_max,
+                "queued": self._queue.qsize()
+            }
+
+    def close(self) -> None:
+        """Answer everything already queued, then stop the dispatcher and workers."""
+        with self._start_lock:
+            self._closed = True
+            dispatcher = self._dispatcher
+            if dispatcher is not None:
+                # Under the lock, so no request can be queued behind the stop marker
+                self._queue.put(_STOP)
+        if dispatcher is not None:
+            dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _ensure_started(self) -> None:
+        # Caller holds the start lock
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+            self._dispatcher.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_PendingRequest]) -> None:
+        dispatched_at = time.perf_counter()
+        delays = [dispatched_at - request.enqueued_at for request in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._fill_total += len(batch) / self.max_batch_size
+            self._queue_delay_total += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+
+        for request in batch:
+            # Wait for a free slot only, so the backend's parallel slots are not oversubscribed
+            self._slots.acquire()
+            self._executor.submit(self._answer, request)
+
+    def _answer(self, request: _PendingRequest) -> None:
+        try:
+            if not request.future.set_running_or_notify_cancel():
+                return
+            try:
+                request.future.set_result(self.client.generate(request.prompt))
+            except Exception as e:
+                request.future.set_exception(e)
+        finally:
+            self._slots.release()
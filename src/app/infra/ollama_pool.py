@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.infra.llm_adapter import OLLAMA_URL, LLMCompletion, OllamaClient
+
+
+def endpoints_from_env() -> List[str]:
+    """Endpoints listed in OLLAMA_URLS (comma separated), or the single OLLAMA_URL."""
+    urls = [url.strip() for url in os.environ.get("OLLAMA_URLS", "").split(",") if url.strip()]
+    return urls or [OLLAMA_URL]
+
+
+@dataclass
+class _Endpoint:
+    url: str
+    client: Any
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    ewma_latency: float = 0.0
+    max_latency: float = 0.0
+    unhealthy_until: float = 0.0
+    probing: bool = False
+
+
+class OllamaPool:
+    """Spreads LLM requests over several Ollama instances.
+
+    Each request goes to the healthy endpoint with the fewest requests in
+    flight, ties broken by the lowest EWMA latency. Health is checked
+    passively: after `failure_threshold` failed calls in a row an endpoint
+    leaves the rotation for `cooldown_seconds`, then gets a single trial
+    request that brings it back if it succeeds. When every endpoint is out,
+    the one that will recover soonest is used rather than failing outright.
+
+    Implements `LLMClient` and `complete()`, so it can be injected into
+    `IntentService` in place of an `OllamaClient`.
+    """
+
+    def __init__(
+        self,
+        endpoints: Optional[List[str]] = None,
+        client_factory: Callable[[str], Any] = OllamaClient,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 10.0,
+        ewma_alpha: float = 0.3,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        urls = endpoints or endpoints_from_env()
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.ewma_alpha = ewma_alpha
+        self._clock = clock
+        self._endpoints = [_Endpoint(url, client_factory(url)) for url in urls]
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        """Send a prompt to the least busy endpoint and return the raw text response."""
+        return self.complete(prompt).text
+
+    def complete(self, prompt: str, **options) -> LLMCompletion:
+        """Like `generate`, returning the endpoint's `LLMCompletion`; options go to its `complete()`."""
+        endpoint, probe = self._acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            completion = endpoint.client.complete(prompt, **options)
+            ok = completion.ok
+            return completion
+        finally:
+            self._release(endpoint, time.perf_counter() - started, ok, probe)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint health, load, latency and error counts."""
+        with self._lock:
+            return {
+                endpoint.url: {
+                    "healthy": endpoint.consecutive_failures < self.failure_threshold,
+                    "in_flight": endpoint.in_flight,
+                    "requests": endpoint.requests,
+                    "errors": endpoint.errors,
+                    "error_rate": endpoint.errors / endpoint.requests if endpoint.requests else 0.0,
+                    "ewma_latency_ms": 1000 * endpoint.ewma_latency,
+                    "max_latency_ms": 1000 * endpoint.max_latency
+                }
+                for endpoint in self._endpoints
+            }
+
+    def close(self) -> None:
+        for endpoint in self._endpoints:
+            if hasattr(endpoint.client, "close"):
+                endpoint.client.close()
+
+    def _acquire(self) -> Tuple[_Endpoint, bool]:
+        """Pick an endpoint; the flag is True when this request is its trial request."""
+        now = self._clock()
+        with self._lock:
+            candidates = [endpoint for endpoint in self._endpoints if self._available(endpoint, now)]
+            if candidates:
+                endpoint = min(candidates, key=lambda e: (e.in_flight, e.ewma_latency))
+            else:
+                endpoint = min(self._endpoints, key=lambda e: (e.unhealthy_until, e.in_flight))
+            # The fallback may pick an endpoint whose trial is still running; only the first request owns it
+            probe = endpoint.consecutive_failures >= self.failure_threshold and not endpoint.probing
+            if probe:
+                endpoint.probing = True
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint, probe
+
+    def _available(self, endpoint: _Endpoint, now: float) -> bool:
+        if endpoint.consecutive_failures < self.failure_threshold:
+            return True
+        # Out of rotation: one trial request once the cooldown is over
+        return endpoint.unhealthy_until <= now and not endpoint.probing
+
+    def _release(self, endpoint: _Endpoint, latency: float, ok: bool, probe: bool = False) -> None:
+        with self._lock:
+            endpoint.in_flight -= 1
+            if probe:
+                endpoint.probing = False
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = 0.0
+                if endpoint.ewma_latency:
+                    endpoint.ewma_latency += self.ewma_alpha * (latency - endpoint.ewma_latency)
+                else:
+                    endpoint.ewma_latency = latency
+                endpoint.max_latency = max(endpoint.max_latency, latency)
+                return
+            endpoint.errors += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                endpoint.unhealthy_until = self._clock() + self.cooldown_seconds
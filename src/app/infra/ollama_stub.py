@@ -0,0 +1,423 @@
+"""Local stand-in for Ollama's /api/generate, for load and chaos tests.
+
+Speaks the same protocol as `OllamaClient`/`AsyncOllamaClient`: JSON
+replies, or NDJSON chunks over chunked encoding when `"stream": true`.
+Replies come from a script of regex rules or from the keyword rules of
+`fake_reply`, after a configurable latency, with optional faults.
+
+Run from the `src/` folder:
+
+    python -m app.infra.ollama_stub --port 11434
+    python -m app.infra.ollama_stub --latency lognormal:300,0.5 --timeout-rate 0.02 --malformed-rate 0.05
+
+and point the app at it with OLLAMA_URL=http://127.0.0.1:<port>/api/generate.
+
+Latency specs (milliseconds): fixed:MS, uniform:LOW,HIGH, normal:MEAN,STDDEV,
+lognormal:MEDIAN,SIGMA, exponential:MEAN.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.domain.rule_intent_classifier import RuleIntentClassifier
+from app.infra.fake_llm import current_message, fake_reply
+from app.infra.logger_adapter import logger
+
+_MAX_BODY = 1024 * 1024
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+_TOKEN = re.compile(r"\s*\S{1,4}|\s+")
+
+
+class LatencyModel:
+    """Random delay drawn from a named distribution, in milliseconds."""
+
+    _DISTRIBUTIONS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, kind: str = "fixed", *params: float):
+        if self._DISTRIBUTIONS.get(kind) != len(params):
+            raise ValueError(f"Unknown latency distribution {kind!r} with {len(params)} parameters.")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Build from "kind:p1,p2", e.g. "uniform:20,80"; a bare number means fixed."""
+        kind, _, params = spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        try:
+            values = [float(value) for value in params.split(",")]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec {spec!r}.") from None
+        return cls(kind, *values)
+
+    def sample(self, rng: random.Random) -> float:
+        """Delay in seconds, never negative."""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            ms = median * rng.lognormvariate(0.0, sigma)
+        else:
+            ms = rng.expovariate(1.0 / self.params[0]) if self.params[0] else 0.0
+        return max(0.0, ms) / 1000
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+@dataclass
+class FaultConfig:
+    """Probability of each fault per request; at most one fault hits a request.
+
+    - error: HTTP 500 (an error line when streaming), as when the model runner dies
+    - timeout: no answer for `hang_seconds`, so the client's read timeout fires
+    - malformed: the reply text is truncated, wrapped in chatter or not JSON at all
+    - disconnect: the connection drops mid-reply
+    """
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    malformed_rate: float = 0.0
+    disconnect_rate: float = 0.0
+    hang_seconds: float = 30.0
+
+    def draw(self, rng: random.Random) -> Optional[str]:
+        roll = rng.random()
+        for fault, rate in (
+            ("error", self.error_rate),
+            ("timeout", self.timeout_rate),
+            ("malformed", self.malformed_rate),
+            ("disconnect", self.disconnect_rate)
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+class ScriptedResponder:
+    """Replies from (regex, reply) rules matched against the current user message.
+
+    The first matching rule wins; without a match the keyword rules of
+    `fake_reply` answer. Load rules from a JSON list of
+    `{"match": "...", "response": "..." or {...}}` with `from_file`.
+    """
+
+    def __init__(self, rules: Optional[List[Tuple[str, str]]] = None):
+        self.rules = [(re.compile(pattern, re.I), response) for pattern, response in rules or []]
+        self._classifier = RuleIntentClassifier(blockers=[])
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScriptedResponder":
+        with open(path, encoding="utf-8") as file:
+            entries = json.load(file)
+        return cls([
+            (entry["match"], entry["response"] if isinstance(entry["response"], str) else json.dumps(entry["response"], ensure_ascii=False))
+            for entry in entries
+        ])
+
+    def __call__(self, prompt: str) -> str:
+        message = current_message(prompt)
+        for pattern, response in self.rules:
+            if pattern.search(message):
+                return response
+        return fake_reply(prompt, self._classifier)
+
+
+def malform(text: str, rng: random.Random) -> str:
+    """Damage a reply the ways real models do."""
+    kind = rng.choice(["truncated", "chatter", "single_quotes", "prose"])
+    if kind == "truncated":
+        return text[:max(1, len(text) // 2)]
+    if kind == "chatter":
+        return f"Claro! Aqui está o resultado:\n{text[:-1]}, }}\nEspero ter ajudado."
+    if kind == "single_quotes":
+        return text.replace('"', "'")
+    return "Desculpe, não consegui entender a solicitação."
+
+
+class OllamaStub:
+    """Asyncio HTTP/1.1 server answering /api/generate like Ollama, with injected latency and faults.
+
+    `latency` delays the whole reply (the first chunk when streaming);
+    `token_latency` is added between streamed chunks. Pass `seed` for a
+    reproducible sequence of delays and faults.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[str], str]] = None,
+        latency: Optional[LatencyModel] = None,
+        token_latency: Optional[LatencyModel] = None,
+        faults: Optional[FaultConfig] = None,
+        seed: Optional[int] = None,
+        model: str = "llama3.2"
+    ):
+        self.responder = responder or ScriptedResponder()
+        self.latency = latency or LatencyModel("fixed", 0)
+        self.token_latency = token_latency or LatencyModel("fixed", 0)
+        self.faults = faults or FaultConfig()
+        self.model = model
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.streamed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fault_counts: Dict[str, int] = {"error": 0, "timeout": 0, "malformed": 0, "disconnect": 0}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 11434) -> Tuple[str, int]:
+        """Start listening; returns the bound address (useful with port 0)."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Connections stuck in an injected hang would otherwise outlive the server
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    def start_background(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a daemon thread with its own event loop; returns the /api/generate URL."""
+        ready = threading.Event()
+        address: List[Any] = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            address.extend(self._loop.run_until_complete(self.start(host, port)))
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="ollama-stub", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return f"http://{address[0]}:{address[1]}/api/generate"
+
+    def stop_background(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "faults": dict(self.fault_counts)
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if not await self._respond(writer, method, path.split("?", 1)[0], body):
+                    break
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.debug(f"Stub connection error: {e}")
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = min(int(headers.get("content-length", 0)), _MAX_BODY)
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def _respond(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes) -> bool:
+        """Write one response; returns False when the connection must not be reused."""
+        if method == "GET" and path == "/":
+            self._write(writer, 200, b"Ollama is running", content_type="text/plain; charset=utf-8")
+        elif method == "GET" and path == "/api/tags":
+            self._write_json(writer, 200, {"models": [{"name": self.model, "model": self.model}]})
+        elif method == "GET" and path == "/stub/stats":
+            self._write_json(writer, 200, self.stats())
+        elif path != "/api/generate":
+            self._write_json(writer, 404, {"error": "not found"})
+        elif method != "POST":
+            self._write_json(writer, 404, {"error": "use POST"})
+        else:
+            try:
+                payload = json.loads(body or b"{}")
+                prompt = str(payload.get("prompt", ""))
+            except (ValueError, AttributeError):
+                self._write_json(writer, 400, {"error": "invalid JSON body"})
+                await writer.drain()
+                return True
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                return await self._generate(writer, payload, prompt)
+            finally:
+                self.in_flight -= 1
+        await writer.drain()
+        return True
+
+    async def _generate(self, writer: asyncio.StreamWriter, payload: Dict[str, Any], prompt: str) -> bool:
+        fault = self.faults.draw(self._rng)
+        if fault:
+            self.fault_counts[fault] += 1
+        stream = payload.get("stream", True)
+        started = time.perf_counter()
+
+        if fault == "timeout":
+            await asyncio.sleep(self.faults.hang_seconds)
+            return False
+        await asyncio.sleep(self.latency.sample(self._rng))
+
+        if fault == "error":
+            if not stream:
+                self._write_json(writer, 500, {"error": "llama runner process has terminated"})
+                await writer.drain()
+                return True
+        text = self.responder(prompt)
+        if fault == "malformed":
+            text = malform(text, self._rng)
+        context = list(payload.get("context") or []) + [len(prompt), len(text)]
+        final = {
+            "model": self.model,
+            "created_at": _now(),
+            "response": "" if stream else text,
+            "done": True,
+            "done_reason": "stop",
+            "context": context
+        }
+
+        if not stream:
+            if fault == "disconnect":
+                return False
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            self._write_json(writer, 200, final)
+            await writer.drain()
+            return True
+
+        self.streamed += 1
+        writer.write(
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: application/x-ndjson\r\n"
+            f"Transfer-Encoding: chunked\r\n\r\n".encode("latin-1")
+        )
+        if fault == "error":
+            writer.write(_chunk({"error": "llama runner process has terminated"}) + b"0\r\n\r\n")
+            await writer.drain()
+            return True
+        tokens = _TOKEN.findall(text)
+        for index, token in enumerate(tokens):
+            if fault == "disconnect" and index >= len(tokens) // 2:
+                await writer.drain()
+                return False
+            writer.write(_chunk({"model": self.model, "created_at": _now(), "response": token, "done": False}))
+            await writer.drain()
+            delay = self.token_latency.sample(self._rng)
+            if delay:
+                await asyncio.sleep(delay)
+        final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+        writer.write(_chunk(final) + b"0\r\n\r\n")
+        await writer.drain()
+        return True
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str) -> None:
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+
+    def _write_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        self._write(writer, status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+
+def _chunk(payload: Dict[str, Any]) -> bytes:
+    line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+    return f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a local Ollama-compatible /api/generate with latency and fault injection.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--script", help="JSON list of {\"match\": regex, \"response\": ...} rules")
+    parser.add_argument("--latency", default="fixed:0", help="delay before the reply, e.g. lognormal:300,0.5")
+    parser.add_argument("--token-latency", default="fixed:0", help="delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    stub = OllamaStub(
+        responder=ScriptedResponder.from_file(args.script) if args.script else None,
+        latency=LatencyModel.parse(args.latency),
+        token_latency=LatencyModel.parse(args.token_latency),
+        faults=FaultConfig(args.error_rate, args.timeout_rate, args.malformed_rate, args.disconnect_rate, args.hang_seconds),
+        seed=args.seed,
+        model=args.model
+    )
+
+    async def serve():
+        address = await stub.start(args.host, args.port)
+        print(f"Ollama stub listening on http://{address[0]}:{address[1]}/api/generate")
+        await stub.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
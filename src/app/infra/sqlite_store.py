@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from app.domain.state_repository import new_state
+from app.domain.user_session import UserSession
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_state (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_session (
+    user_id TEXT PRIMARY KEY,
+    user_name TEXT NOT NULL,
+    account_number TEXT NOT NULL,
+    previous_result TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_history (
+    user_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    PRIMARY KEY (user_id, seq)
+) WITHOUT ROWID;
+"""
+
+# Fixed SQL strings: sqlite3 keeps them compiled in its statement cache
+_SELECT_STATE = "SELECT data FROM user_state WHERE user_id = ?"
+_UPSERT_STATE = (
+    "INSERT INTO user_state (user_id, data, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at"
+)
+_DELETE_STATE = "DELETE FROM user_state WHERE user_id = ?"
+_SELECT_SESSION = "SELECT user_name, account_number, previous_result FROM user_session WHERE user_id = ?"
+_UPSERT_SESSION = (
+    "INSERT INTO user_session (user_id, user_name, account_number, previous_result, updated_at) "
+    "VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET user_name = excluded.user_name, account_number = excluded.account_number, "
+    "previous_result = excluded.previous_result, updated_at = excluded.updated_at"
+)
+_SELECT_HISTORY = "SELECT line FROM session_history WHERE user_id = ? ORDER BY seq"
+_LAST_HISTORY_LINE = "SELECT seq, line FROM session_history WHERE user_id = ? ORDER BY seq DESC LIMIT 1"
+_INSERT_HISTORY = "INSERT INTO session_history (user_id, seq, line) VALUES (?, ?, ?)"
+_DELETE_HISTORY = "DELETE FROM session_history WHERE user_id = ?"
+
+
+class SQLiteStore:
+    """Persistent user state and sessions on SQLite in WAL mode.
+
+    Implements the `state_repository` backend API (`get`/`update`/`clear`),
+    so it can be installed with `set_state_store`, plus `save_session` and
+    `load_session` for `UserSession`. Reads go through an in-memory LRU
+    cache of `cache_size` users. Writes only mark users dirty; `flush`
+    writes everything dirty in one transaction, so a turn costs a single
+    commit. A state returned by `get` and changed in place is written back
+    too. History lines are stored one row each and only new lines are
+    inserted. The cache assumes each user is served by one process at a time.
+    """
+
+    def __init__(self, path: str = "assistant.db", cache_size: int = 10000):
+        self.path = path
+        self.cache_size = cache_size
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Under WAL, NORMAL only syncs at checkpoints and stays safe against corruption
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA busy_timeout=5000")
+        self._connection.executescript(_SCHEMA)
+        self._migrate()
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # JSON last read or written for each cached user, to spot changes made in place
+        self._persisted: Dict[str, str] = {}
+        # Users handed out by `get` since the last flush
+        self._lent: Set[str] = set()
+        self._dirty_states: Set[str] = set()
+        self._deleted_states: Set[str] = set()
+        self._dirty_sessions: Dict[str, UserSession] = {}
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        """Return the user's state, loading it from disk on a cache miss."""
+        with self._lock:
+            user_state = self._cache.get(user_id)
+            if user_state is not None:
+                self.cache_hits += 1
+                self._cache.move_to_end(user_id)
+                self._lent.add(user_id)
+                return user_state
+
+            self.cache_misses += 1
+            row = None
+            if user_id not in self._deleted_states:
+                row = self._connection.execute(_SELECT_STATE, (user_id,)).fetchone()
+            user_state = json.loads(row[0]) if row else new_state()
+            self._cache[user_id] = user_state
+            self._persisted[user_id] = row[0] if row else json.dumps(user_state)
+            self._lent.add(user_id)
+            self._evict()
+            return user_state
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> None:
+        """Update the user's state; written on the next `flush`."""
+        with self._lock:
+            self.get(user_id).update(updates)
+            self._dirty_states.add(user_id)
+            self._deleted_states.discard(user_id)
+
+    def clear(self, user_id: str) -> None:
+        with self._lock:
+            self._cache.pop(user_id, None)
+            self._persisted.pop(user_id, None)
+            self._lent.discard(user_id)
+            self._dirty_states.discard(user_id)
+            self._deleted_states.add(user_id)
+
+    def save_session(self, session: UserSession) -> None:
+        """Queue the session for the next `flush`."""
+        with self._lock:
+            self._dirty_sessions[session.user_id] = session
+
+    def load_session(self, user_id: str) -> Optional[UserSession]:
+        """Restore a saved session, or None if the user has none."""
+        with self._lock:
+            pending = self._dirty_sessions.get(user_id)
+            if pending is not None:
+                return pending
+            row = self._connection.execute(_SELECT_SESSION, (user_id,)).fetchone()
+            if row is None:
+                return None
+            history = [line for (line,) in self._connection.execute(_SELECT_HISTORY, (user_id,))]
+        user_name, account_number, previous_result = row
+        return UserSession(
+            user_id=user_id,
+            user_name=user_name,
+            account_number=account_number,
+            history=history,
+            previous_result=json.loads(previous_result)
+        )
+
+    def flush(self) -> int:
+        """Write every pending change in one transaction; returns the number of rows written."""
+        with self._lock:
+            if not (self._dirty_states or self._lent or self._deleted_states or self._dirty_sessions):
+                return 0
+            now = time.time()
+            # Dirty and lent users are always cached: eviction flushes them first
+            states = []
+            for user_id in self._dirty_states | self._lent:
+                data = json.dumps(self._cache[user_id])
+                if user_id in self._dirty_states or data != self._persisted[user_id]:
+                    states.append((user_id, data, now))
+            deleted = [(user_id,) for user_id in self._deleted_states]
+            sessions = [
+                (
+                    session.user_id,
+                    session.user_name,
+                    str(session.account_number),
+                    json.dumps(session.previous_result or {}),
+                    now
+                )
+                for session in self._dirty_sessions.values()
+            ]
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.executemany(_UPSERT_STATE, states)
+                self._connection.executemany(_DELETE_STATE, deleted)
+                self._connection.executemany(_UPSERT_SESSION, sessions)
+                lines = sum(self._write_history(session) for session in self._dirty_sessions.values())
+            for user_id, data, _ in states:
+                self._persisted[user_id] = data
+            self._dirty_states.clear()
+            self._lent.clear()
+            self._deleted_states.clear()
+            self._dirty_sessions.clear()
+            written = len(states) + len(deleted) + len(sessions) + lines
+            self.flushes += 1
+            self.rows_written += written
+            return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "pending": len(self._dirty_states) + len(self._deleted_states) + len(self._dirty_sessions),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written
+            }
+
+    def close(self) -> None:
+        """Flush pending writes and close the database."""
+        self.flush()
+        self._connection.close()
+
+    def _write_history(self, session: UserSession) -> int:
+        """Insert the history lines not stored yet; returns how many rows were written."""
+        history = session.history
+        last = self._connection.execute(_LAST_HISTORY_LINE, (session.user_id,)).fetchone()
+        stored = last[0] + 1 if last else 0
+        if stored > len(history) or (last and history[stored - 1] != last[1]):
+            # History was reset or replaced rather than appended to
+            self._connection.execute(_DELETE_HISTORY, (session.user_id,))
+            stored = 0
+        self._connection.executemany(
+            _INSERT_HISTORY,
+            ((session.user_id, seq, history[seq]) for seq in range(stored, len(history)))
+        )
+        return len(history) - stored
+
+    def _migrate(self) -> None:
+        # Databases written before history moved to its own table keep it as JSON in user_session
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(user_session)")}
+        if "history" not in columns:
+            return
+        with self._connection:
+            self._connection.execute("BEGIN")
+            for user_id, history in self._connection.execute("SELECT user_id, history FROM user_session").fetchall():
+                self._connection.executemany(
+                    _INSERT_HISTORY,
+                    ((user_id, seq, line) for seq, line in enumerate(json.loads(history)))
+                )
+            self._connection.execute("ALTER TABLE user_session DROP COLUMN history")
+
+    def _evict(self) -> None:
+        while len(self._cache) > self.cache_size:
+            user_id = next(iter(self._cache))
+            if user_id in self._dirty_states or user_id in self._lent:
+                self.flush()
+            self._cache.popitem(last=False)
+            self._persisted.pop(user_id, None)
@@ -4,8 +4,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.domain.user_session import UserSession
 from app.domain.default_entity_manager import DefaultEntityManager
+from app.domain.intent_service import IntentService
+from app.application.bank_application_service import BankApplicationService
 from app.application.intent_handler import IntentHandler
 from app.application.conversation_manager import ConversationManager
+from app.infra.ledger_journal import LedgerJournal
 from app.ui.console import ConsoleUI
 
 def main():
@@ -14,6 +17,8 @@ def main():
     user_id = "rodrigo.barreiros"
     user_name = "Rodrigo"
     user_account_number = "000123"  # Default known account
+    # With LEDGER_DIR set, transfers are journaled there and survive restarts
+    ledger_dir = os.environ.get("LEDGER_DIR")
 
     # Initialize components
     user_session = UserSession(
@@ -23,17 +28,26 @@ def main():
         history=[]
     )
     default_entity_manager = DefaultEntityManager(user_account_number)
-    transaction_handler = IntentHandler(user_id, user_name, assistant_name)
+    intent_service = IntentService()
+    if ledger_dir:
+        bank_service = BankApplicationService(journal=LedgerJournal(ledger_dir), snapshot_every=1000)
+    else:
+        bank_service = BankApplicationService()
+    intent_handler = IntentHandler(intent_service, user_id, bank_service)
     conversation_manager = ConversationManager(
         user_session=user_session,
         default_entity_manager=default_entity_manager,
-        transaction_handler=transaction_handler,
-        assistant_name=assistant_name
+        intent_handler=intent_handler,
+        assistant_name=assistant_name,
+        intent_service=intent_service
     )
 
     # Initialize UI and start conversation
     console_ui = ConsoleUI(assistant_name, user_name)
-    console_ui.start_conversation(conversation_manager.process_message)
+    try:
+        console_ui.start_conversation(conversation_manager.process_message)
+    finally:
+        bank_service.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,418 @@
+"""HTTP and WebSocket entry point serving many users concurrently.
+
+Run from the `src/` folder:
+
+    python -m app.ui.server --port 8080               # talks to Ollama
+    python -m app.ui.server --llm fake --port 8080    # local stand-in LLM
+
+The ledger lives in memory unless `--ledger-dir` (default: $LEDGER_DIR)
+is given; then transfers are journaled there and survive restarts.
+
+Endpoints:
+
+    POST   /sessions/<user_id>/messages   {"message": "...", "user_name": "..."}
+    GET    /sessions/<user_id>/ws         WebSocket, one text frame per message
+    DELETE /sessions/<user_id>            drop the session and its conversation state
+    GET  /health
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import unquote
+
+from app.application.bank_application_service import BankApplicationService
+from app.application.conversation_manager import ConversationManager
+from app.application.intent_handler import IntentHandler
+from app.domain.default_entity_manager import DefaultEntityManager
+from app.domain.intent_service import IntentService
+from app.domain.user_session import UserSession
+from app.infra.async_llm_adapter import AsyncOllamaClient, ConcurrencyLimitedLLM
+from app.infra.fake_llm import AsyncFakeLLM
+from app.infra.ledger_journal import LedgerJournal
+from app.infra.logger_adapter import logger
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_MAX_BODY = 64 * 1024
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+@dataclass
+class _Session:
+    manager: ConversationManager
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    # Set once the session is forgotten; turns still waiting for the lock start a new one
+    closed: bool = False
+
+
+class SessionRegistry:
+    """Builds one `ConversationManager` object graph per user and keeps it for later messages.
+
+    Messages of the same user run one at a time under the session's lock;
+    different users run concurrently. All sessions share one `IntentService`,
+    so its LLM client and concurrency limit are shared too, and one
+    `BankApplicationService`, so transfers of every user go through the
+    same ledger.
+
+    At most `max_sessions` are kept: the least recently used one is
+    forgotten beyond that, as is any left idle for `idle_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        intent_service: IntentService,
+        assistant_name: str = "Magie",
+        account_number_for: Callable[[str], str] = lambda user_id: "000123",
+        bank_service: Optional[BankApplicationService] = None,
+        max_sessions: int = 10_000,
+        idle_ttl: float = 1800.0
+    ):
+        self.intent_service = intent_service
+        self.bank_service = bank_service or BankApplicationService()
+        self.assistant_name = assistant_name
+        self.account_number_for = account_number_for
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # Least recently used first
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, user_id: str, user_name: Optional[str] = None) -> _Session:
+        session = self._sessions.get(user_id)
+        if session is None:
+            account_number = self.account_number_for(user_id)
+            user_session = UserSession(
+                user_id=user_id,
+                user_name=user_name or user_id,
+                account_number=account_number,
+                history=[]
+            )
+            manager = ConversationManager(
+                user_session=user_session,
+                default_entity_manager=DefaultEntityManager(account_number),
+                intent_handler=IntentHandler(self.intent_service, user_id, self.bank_service),
+                assistant_name=self.assistant_name,
+                intent_service=self.intent_service
+            )
+            session = self._sessions[user_id] = _Session(manager)
+        else:
+            self._sessions.move_to_end(user_id)
+        session.last_used = time.monotonic()
+        return session
+
+    async def handle_message(self, user_id: str, message: str, user_name: Optional[str] = None) -> Dict[str, Any]:
+        """Run one turn for the user, after any turn of theirs still in progress."""
+        session = self.get(user_id, user_name)
+        await self.evict_idle()
+        while True:
+            async with session.lock:
+                if not session.closed:
+                    should_continue, message_type, response = await session.manager.aprocess_message(message)
+                    break
+            # Forgotten while this turn waited; run it on a fresh session
+            session = self.get(user_id, user_name)
+        session.last_used = time.monotonic()
+        return {"continue": should_continue, "type": message_type, "message": response}
+
+    async def forget(self, user_id: str) -> bool:
+        """Drop the user's session and everything the intent service keeps for them; returns whether a session existed.
+
+        Waits for a turn still in progress, so its writes cannot bring the state back.
+        """
+        session = self._sessions.pop(user_id, None)
+        if session is None:
+            self.intent_service.forget(user_id)
+            return False
+        async with session.lock:
+            session.closed = True
+            self.intent_service.forget(user_id)
+        return True
+
+    async def evict_idle(self) -> int:
+        """Forget sessions beyond `max_sessions` or idle for `idle_ttl`, oldest first; returns how many."""
+        evicted = 0
+        now = time.monotonic()
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_used < self.idle_ttl:
+                break
+            if session.lock.locked():
+                # A turn is still running; it is touched again when it ends
+                break
+            await self.forget(user_id)
+            evicted += 1
+        return evicted
+
+
+class ConversationServer:
+    """Minimal asyncio HTTP/1.1 server with WebSocket upgrade in front of a `SessionRegistry`."""
+
+    def __init__(self, registry: SessionRegistry, llm_client: Any = None):
+        self.registry = registry
+        self.llm_client = llm_client
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> Tuple[str, int]:
+        """Start listening; returns the bound address (useful with port 0)."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._handle_websocket(reader, writer, path, headers)
+                    break
+                status, payload = await self._route(method, path, body)
+                # An oversized body was not read to the end, so the connection cannot be reused
+                keep_alive = headers.get("connection", "").lower() != "close" and status != 413
+                self._write_response(writer, status, payload, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.debug(f"Connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(min(length, _MAX_BODY + 1)) if length else b""
+        return method, path, headers, body
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        parts = [unquote(part) for part in path.split("?", 1)[0].strip("/").split("/")]
+        if parts == ["health"]:
+            return 200, self._health()
+        if len(parts) == 2 and parts[0] == "sessions":
+            if method != "DELETE":
+                return 405, {"error": "Use DELETE."}
+            return 200, {"forgotten": await self.registry.forget(parts[1])}
+        if len(parts) != 3 or parts[0] != "sessions" or parts[2] != "messages":
+            return 404, {"error": "Not found."}
+        if method != "POST":
+            return 405, {"error": "Use POST."}
+        if len(body) > _MAX_BODY:
+            return 413, {"error": "Message too large."}
+        try:
+            data = json.loads(body or b"{}")
+            message = str(data["message"])
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "Expected a JSON body with a 'message' field."}
+        return 200, await self.registry.handle_message(parts[1], message, data.get("user_name"))
+
+    def _health(self) -> Dict[str, Any]:
+        health: Dict[str, Any] = {"status": "ok", "sessions": len(self.registry)}
+        if self.llm_client is not None and hasattr(self.llm_client, "stats"):
+            health["llm"] = self.llm_client.stats()
+        return health
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool = True) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+
+    async def _handle_websocket(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        path: str,
+        headers: Dict[str, str]
+    ) -> None:
+        parts = [unquote(part) for part in path.split("?", 1)[0].strip("/").split("/")]
+        key = headers.get("sec-websocket-key")
+        if len(parts) != 3 or parts[0] != "sessions" or parts[2] != "ws" or not key:
+            self._write_response(writer, 404, {"error": "Not found."}, keep_alive=False)
+            await writer.drain()
+            return
+
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        user_id = parts[1]
+        while True:
+            frame = await read_ws_message(reader, writer)
+            if frame is None:
+                break
+            try:
+                data = json.loads(frame)
+                message, user_name = str(data["message"]), data.get("user_name")
+            except (ValueError, KeyError, TypeError):
+                message, user_name = frame, None
+            reply = await self.registry.handle_message(user_id, message, user_name)
+            writer.write(encode_ws_frame(json.dumps(reply, ensure_ascii=False).encode("utf-8")))
+            await writer.drain()
+            if not reply["continue"]:
+                writer.write(encode_ws_frame(b"", opcode=0x8))
+                await writer.drain()
+                break
+
+
+async def read_ws_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[str]:
+    """Read the next complete text message, answering pings; None once the peer closes."""
+    fragments = []
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > _MAX_BODY:
+            writer.write(encode_ws_frame(struct.pack("!H", 1009), opcode=0x8))
+            return None
+        mask = await reader.readexactly(4) if second & 0x80 else b""
+        payload = await reader.readexactly(length)
+        if mask:
+            payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+        if opcode == 0x8:
+            writer.write(encode_ws_frame(payload[:2], opcode=0x8))
+            return None
+        if opcode == 0x9:
+            writer.write(encode_ws_frame(payload, opcode=0xA))
+            continue
+        if opcode == 0xA:
+            continue
+        fragments.append(payload)
+        if first & 0x80:
+            return b"".join(fragments).decode("utf-8")
+
+
+def encode_ws_frame(payload: bytes, opcode: int = 0x1, mask: bytes = b"") -> bytes:
+    """Encode a single final frame; clients must pass a 4-byte `mask`, servers send unmasked."""
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if len(payload) < 126:
+        header += bytes([mask_bit | len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", len(payload))
+    if mask:
+        payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+    return header + mask + payload
+
+
+def build_server(
+    llm: str = "ollama",
+    max_llm_concurrency: int = 4,
+    fake_latency_ms: float = 50.0,
+    ollama_url: Optional[str] = None,
+    ledger_dir: Optional[str] = None,
+    snapshot_every: int = 10_000,
+    max_sessions: int = 10_000,
+    idle_ttl: float = 1800.0
+) -> ConversationServer:
+    """Wire the shared LLM client, intent service, bank service and session registry.
+
+    With `ledger_dir` the ledger is journaled there and recovered on start;
+    without it, it lives in memory only.
+    """
+    if llm == "fake":
+        client = AsyncFakeLLM(latency_ms=fake_latency_ms)
+    elif ollama_url:
+        client = AsyncOllamaClient(url=ollama_url, pool_size=max_llm_concurrency)
+    else:
+        client = AsyncOllamaClient(pool_size=max_llm_concurrency)
+    limited = ConcurrencyLimitedLLM(client, max_concurrency=max_llm_concurrency)
+    if ledger_dir:
+        bank_service = BankApplicationService(journal=LedgerJournal(ledger_dir), snapshot_every=snapshot_every)
+    else:
+        bank_service = BankApplicationService()
+    registry = SessionRegistry(
+        IntentService(async_llm_client=limited),
+        bank_service=bank_service,
+        max_sessions=max_sessions,
+        idle_ttl=idle_ttl
+    )
+    return ConversationServer(registry, llm_client=limited)
+
+
+async def serve(host: str, port: int, **options) -> None:
+    server = build_server(**options)
+    try:
+        address = await server.start(host, port)
+        print(f"Listening on http://{address[0]}:{address[1]}")
+        await server.serve_forever()
+    finally:
+        server.registry.bank_service.close()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the assistant over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--llm", choices=["ollama", "fake"], default="ollama")
+    parser.add_argument("--max-llm-concurrency", type=int, default=4)
+    parser.add_argument("--fake-latency-ms", type=float, default=50.0)
+    parser.add_argument("--max-sessions", type=int, default=10_000, help="sessions kept in memory")
+    parser.add_argument("--idle-ttl", type=float, default=1800.0, help="seconds before an idle session is dropped")
+    parser.add_argument("--ledger-dir", default=os.environ.get("LEDGER_DIR"), help="journal the ledger here (default: in memory only)")
+    parser.add_argument("--snapshot-every", type=int, default=10_000, help="transfers between ledger snapshots (0: never)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(
+            args.host,
+            args.port,
+            llm=args.llm,
+            max_llm_concurrency=args.max_llm_concurrency,
+            fake_latency_ms=args.fake_latency_ms,
+            max_sessions=args.max_sessions,
+            idle_ttl=args.idle_ttl,
+            ledger_dir=args.ledger_dir or None,
+            snapshot_every=args.snapshot_every
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Turn latency of `ConversationManager.process_message`, overall and per stage.
+
+Replays the conversations in tests/resources/multi_turn_scenarios.json,
+answering every confirmation question with "sim", against `FakeLLM`,
+which replies deterministically after `--llm-latency-ms`. Each replay
+uses a fresh session and user, with an account in one shared
+`BankApplicationService`, so confirmed transfers really debit it. Reports p50/p95/p99 in milliseconds for the whole
+turn and for each stage inside it:
+
+    turn     ConversationManager.process_message
+    intent   IntentService.process_message
+    prompt   prompt construction
+    llm      the LLM call
+    parse    JSON extraction and the user-state update
+    handler  bank operations (IntentHandler)
+
+Run from the `src/` folder:
+
+    python -m benchmarks.bench_conversation_latency                  # report only
+    python -m benchmarks.bench_conversation_latency --save-baseline  # store as the baseline
+    python -m benchmarks.bench_conversation_latency --check          # exit 1 on regression
+
+`--check` fails when a percentile is slower than the baseline by more
+than `--threshold` (a fraction) and by more than `--min-delta-ms`. The
+absolute floor keeps sub-millisecond jitter from counting as a
+regression. Baselines depend on the machine, so record them where the
+check runs.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from functools import wraps
+from typing import Any, Dict, List
+
+from app.application.bank_application_service import BankApplicationService
+from app.application.conversation_manager import ConversationManager
+from app.application.intent_handler import IntentHandler
+from app.domain.default_entity_manager import DefaultEntityManager
+from app.domain.intent_service import IntentService
+from app.domain.state_repository import clear_user_state
+from app.domain.user_session import UserSession
+from app.infra.fake_llm import FakeLLM
+
+SCENARIOS_PATH = os.path.join("tests", "resources", "multi_turn_scenarios.json")
+BASELINE_PATH = os.path.join("benchmarks", "baselines", "conversation_latency.json")
+STAGES = ["turn", "intent", "prompt", "llm", "parse", "handler"]
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+    """Collects wall-clock samples per stage by wrapping methods on live objects."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.enabled = True
+
+    def wrap(self, obj: Any, attribute: str, stage: str) -> None:
+        method = getattr(obj, attribute)
+        samples = self.samples[stage]
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if self.enabled:
+                    samples.append(time.perf_counter() - started)
+
+        setattr(obj, attribute, timed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: summarize(samples) for stage, samples in self.samples.items() if samples}
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    summary = {f"p{p}": percentile(ordered, p) * 1000 for p in PERCENTILES}
+    summary["count"] = len(ordered)
+    return summary
+
+
+def load_scripts(path: str = SCENARIOS_PATH) -> List[List[str]]:
+    """One list of user messages per scenario; transfers get a "sim" to confirm them."""
+    with open(path, encoding="utf-8") as file:
+        scenarios = json.load(file)
+    return [[step["input"] for step in scenario["steps"]] + ["sim"] for scenario in scenarios]
+
+
+def run(rounds: int, warmup: int, llm_latency_ms: float) -> Dict[str, Dict[str, float]]:
+    timer = StageTimer()
+    llm = FakeLLM(latency_ms=llm_latency_ms)
+    intent_service = IntentService(llm_client=llm)
+    timer.wrap(llm, "generate", "llm")
+    timer.wrap(intent_service, "process_message", "intent")
+    timer.wrap(intent_service, "_build_prompt", "prompt")
+    timer.wrap(intent_service, "_handle_response", "parse")
+    bank_service = BankApplicationService()
+
+    scripts = load_scripts()
+    for round_number in range(warmup + rounds):
+        timer.enabled = round_number >= warmup
+        for index, script in enumerate(scripts):
+            user_id = f"bench-{round_number}-{index}"
+            bank_service.open_account(user_id, "corrente", 1_000_000.0)
+            bank_service.open_account(user_id, "savings", 1_000_000.0)
+            handler = IntentHandler(intent_service, user_id, bank_service)
+            timer.wrap(handler, "handle_transaction", "handler")
+            timer.wrap(handler, "handle_transfer_confirmation", "handler")
+            manager = ConversationManager(
+                user_session=UserSession(user_id, "Rodrigo", "000123", []),
+                default_entity_manager=DefaultEntityManager("000123"),
+                intent_handler=handler,
+                assistant_name="Magie",
+                intent_service=intent_service
+            )
+            timer.wrap(manager, "process_message", "turn")
+            for message in script:
+                manager.process_message(message)
+            clear_user_state(user_id)
+    return timer.summary()
+
+
+def find_regressions(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    min_delta_ms: float
+) -> List[str]:
+    """Describe every stage percentile that got slower than both limits allow."""
+    regressions = []
+    for stage, reference in baseline.items():
+        if stage not in current:
+            continue
+        for key in (f"p{p}" for p in PERCENTILES):
+            before, after = reference[key], current[stage][key]
+            if after - before > min_delta_ms and after > before * (1 + threshold):
+                regressions.append(f"{stage} {key}: {before:.3f} ms -> {after:.3f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'stage':>8} {'count':>7} " + " ".join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + ("   vs baseline p95" if baseline else ""))
+    for stage in STAGES:
+        if stage not in summary:
+            continue
+        row = summary[stage]
+        line = f"{stage:>8} {row['count']:>7} " + " ".join(f"{row[f'p{p}']:>10.3f}" for p in PERCENTILES)
+        if stage in baseline:
+            line += f"   {(row['p95'] / baseline[stage]['p95'] - 1) * 100:+.0f}%"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=0.05)
+    args = parser.parse_args()
+
+    config = {"llm_latency_ms": args.llm_latency_ms}
+    summary = run(args.rounds, args.warmup, args.llm_latency_ms)
+
+    baseline: Dict[str, Dict[str, float]] = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved.get("config") == config:
+            baseline = saved["stages"]
+        else:
+            print(f"Baseline {args.baseline} was recorded with {saved.get('config')}, not {config}; not comparing.")
+    print_summary(summary, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"config": config, "stages": summary}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.check:
+        if not baseline:
+            print("No comparable baseline; run with --save-baseline first.")
+            sys.exit(2)
+        regressions = find_regressions(summary, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
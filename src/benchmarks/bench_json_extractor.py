@@ -0,0 +1,85 @@
+"""Parsing cost of noisy LLM responses: regex repair vs the tolerant extractor.
+
+Run from the `src/` folder:
+
+    python -m benchmarks.bench_json_extractor
+"""
+import argparse
+import json
+import re
+import timeit
+from typing import Any, Dict, Optional
+
+from app.infra.json_extractor import JsonExtractor, JsonNotFoundError, extract_json
+
+# Shapes seen from llama3.2 on this prompt: clean, chatty, unquoted keys, trailing commas
+RESPONSES = {
+    "clean": '{"intent": "get_balance", "entities": {}, "missing_entities": [], "next_question": ""}',
+    "chatty": (
+        'Claro! Aqui está o JSON solicitado:\n\n```json\n{\n  "intent": "transfer",\n  "entities": {\n'
+        '    "amount": 150,\n    "recipient": "Maria"\n  },\n  "missing_entities": [],\n'
+        '  "next_question": ""\n}\n```\n\nSe precisar de algo mais {é só pedir}!'
+    ),
+    "colon_in_value": (
+        '{"intent": "transfer", "entities": {"recipient": "Maria"}, "missing_entities": ["amount"], '
+        '"next_question": "Qual o valor? Exemplo: 100 reais"}'
+    ),
+    "unquoted_keys": (
+        '{intent: "transfer", entities: {amount: 100, recipient: "Ana"}, missing_entities: [], next_question: ""}'
+    ),
+    "trailing_commas": (
+        '{"intent": "get_transactions", "entities": {"account_type": "corrente",}, "missing_entities": [],}'
+    ),
+}
+
+
+def regex_repair(response: str) -> Optional[Dict[str, Any]]:
+    """The original approach: widest brace slice, then quote every `word:`."""
+    start = response.find("{")
+    end = response.rfind("}") + 1
+    if start == -1 or end == -1:
+        return None
+    try:
+        return json.loads(re.sub(r'(\s*)(\w+):', r'\1"\2":', response[start:end]))
+    except json.JSONDecodeError:
+        return None
+
+
+def extractor(response: str) -> Optional[Dict[str, Any]]:
+    try:
+        return extract_json(response)
+    except (JsonNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def streamed(response: str, chunk_size: int = 4) -> Optional[Dict[str, Any]]:
+    """Feed the response in token-sized chunks, as the streaming client does."""
+    parser = JsonExtractor()
+    for i in range(0, len(response), chunk_size):
+        if parser.feed(response[i:i + chunk_size]) >= 0:
+            break
+    try:
+        return parser.result()
+    except (JsonNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'response':>16} {'regex (us)':>11} {'ok':>3} {'extractor (us)':>15} {'ok':>3} {'streamed (us)':>14}")
+    for name, response in RESPONSES.items():
+        row = []
+        for parse in (regex_repair, extractor, streamed):
+            seconds = min(timeit.repeat(lambda: parse(response), number=args.number, repeat=3)) / args.number
+            row.append((seconds * 1e6, parse(response) is not None))
+        print(
+            f"{name:>16} {row[0][0]:>11.1f} {'y' if row[0][1] else 'n':>3} "
+            f"{row[1][0]:>15.1f} {'y' if row[1][1] else 'n':>3} {row[2][0]:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
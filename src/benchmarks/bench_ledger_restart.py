@@ -0,0 +1,78 @@
+"""Restart time of a journaled ledger: full journal replay vs snapshot plus journal tail.
+
+Writes `--transfers` transfer events spread over `--accounts` accounts,
+then times a cold start that replays the whole journal, takes a snapshot,
+appends `--tail` more transfers and times a start from the snapshot.
+
+Run from the `src/` folder (the default of 10M transfers needs a few GB of
+disk and RAM and several minutes for the full replay):
+
+    python -m benchmarks.bench_ledger_restart
+    python -m benchmarks.bench_ledger_restart --transfers 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.application.bank_application_service import BankApplicationService
+from app.infra.ledger_journal import LedgerJournal, OpenAccountEvent, TransferEvent, encode_event
+
+_BATCH = 100_000
+
+
+def write_journal(directory: str, accounts: int, transfers: int, start: int = 0) -> None:
+    """Append events straight to the journal, bypassing the service, to build large logs quickly."""
+    journal = LedgerJournal(directory)
+    if start == 0:
+        for account in range(accounts):
+            journal.append(OpenAccountEvent(f"user-{account}", "corrente", 10 ** 12))
+    now = time.time()
+    for first in range(start, start + transfers, _BATCH):
+        for index in range(first, min(first + _BATCH, start + transfers)):
+            journal.append(TransferEvent(
+                f"user-{index % accounts}", "corrente", f"recipient-{index % 97}", 1 + index % 10_000, now + index / 1000
+            ))
+        journal.commit()
+    journal.close()
+
+
+def timed_start(directory: str) -> "tuple[BankApplicationService, float]":
+    started = time.perf_counter()
+    service = BankApplicationService(journal=LedgerJournal(directory))
+    return service, time.perf_counter() - started
+
+
+def directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=10_000_000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--tail", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        write_journal(directory, args.accounts, args.transfers)
+        print(f"{'write journal':>28}: {time.perf_counter() - started:>8.2f} s ({directory_size(directory) / 1e6:.0f} MB)")
+
+        service, elapsed = timed_start(directory)
+        print(f"{'restart, full replay':>28}: {elapsed:>8.2f} s")
+
+        started = time.perf_counter()
+        service.snapshot()
+        service.close()
+        print(f"{'snapshot':>28}: {time.perf_counter() - started:>8.2f} s ({directory_size(directory) / 1e6:.0f} MB)")
+        del service
+
+        write_journal(directory, args.accounts, args.tail, start=args.transfers)
+        service, elapsed = timed_start(directory)
+        print(f"{'restart, snapshot + tail':>28}: {elapsed:>8.2f} s (tail of {args.tail} transfers)")
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
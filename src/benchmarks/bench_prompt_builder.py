@@ -0,0 +1,54 @@
+"""Per-turn prompt assembly cost as the history grows.
+
+Run from the `src/` folder:
+
+    python -m benchmarks.bench_prompt_builder
+"""
+import argparse
+import timeit
+from typing import List
+
+from app.domain.intent_service import SYSTEM_PROMPT, IntentService
+from app.domain.prompt_builder import RenderedHistory
+
+LINE = "Rodrigo: quero transferir 150 reais para a Maria da conta corrente"
+
+
+def join_and_format(history: List[str], user_input: str) -> str:
+    """The original approach: re-join and re-format everything on every turn."""
+    return SYSTEM_PROMPT.format(history="\n".join(history), user_input=user_input, user_account_number=987654321)
+
+
+def measure(history_size: int, turns: int) -> dict:
+    service = IntentService()
+    plain: List[str] = [LINE] * history_size
+    rendered = RenderedHistory(plain)
+    service._build_prompt("bench", rendered, "oi")  # warm the cached rendering
+
+    def baseline_turn():
+        plain.append(LINE)
+        join_and_format(plain, "oi")
+
+    def builder_turn():
+        rendered.append(LINE)
+        service._build_prompt("bench", rendered, "oi")
+
+    baseline = min(timeit.repeat(baseline_turn, number=turns, repeat=3)) / turns
+    builder = min(timeit.repeat(builder_turn, number=turns, repeat=3)) / turns
+    return {"history": history_size, "baseline_us": baseline * 1e6, "builder_us": builder * 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 5000, 20000])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'history lines':>14} {'join+format (us)':>18} {'builder (us)':>14} {'speedup':>8}")
+    for size in args.sizes:
+        row = measure(size, args.turns)
+        print(f"{row['history']:>14} {row['baseline_us']:>18.1f} {row['builder_us']:>14.1f} {row['baseline_us'] / row['builder_us']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Memory held by 100k sessions: `UserSession` vs `CompactUserSession`.
+
+Each session gets `--lines` history lines alternating between the user and
+the assistant, as `ConversationManager` writes them.
+
+Run from the `src/` folder:
+
+    python -m benchmarks.bench_session_memory
+"""
+import argparse
+import gc
+import tracemalloc
+from typing import Callable, List
+
+from app.domain.compact_session import CompactUserSession
+from app.domain.user_session import UserSession
+
+
+def measure(factory: Callable[[int], object], sessions: int, lines: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    kept: List[object] = []
+    for i in range(sessions):
+        session = factory(i)
+        for n in range(lines):
+            if n % 2:
+                session.add_to_history(f"Magie: Para quem você quer transferir {n} reais?")
+            else:
+                session.add_to_history(f"Rodrigo: quero transferir {n} reais")
+        kept.append(session)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 40, 200])
+    parser.add_argument("--capacity", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'lines':>6} {'UserSession (MB)':>17} {'Compact (MB)':>13} {'bytes/session':>22}")
+    for lines in args.lines:
+        plain = measure(lambda i: UserSession(f"user-{i}", "Rodrigo", "000123", []), args.sessions, lines)
+        compact = measure(
+            lambda i: CompactUserSession(f"user-{i}", "Rodrigo", "000123", history_capacity=args.capacity),
+            args.sessions,
+            lines
+        )
+        print(
+            f"{lines:>6} {plain / 2**20:>17.1f} {compact / 2**20:>13.1f} "
+            f"{plain // args.sessions:>10} -> {compact // args.sessions:<9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
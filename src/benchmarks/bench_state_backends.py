@@ -0,0 +1,60 @@
+"""Turns per second with the in-memory state store vs the SQLite (WAL) backend.
+
+Each simulated turn reads the user's state, updates it, appends two history
+lines and, for SQLite, saves the session and flushes the turn in one commit.
+
+Run from the `src/` folder:
+
+    python -m benchmarks.bench_state_backends
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from app.domain.state_repository import StateStore
+from app.domain.user_session import UserSession
+from app.infra.sqlite_store import SQLiteStore
+
+
+def run_turns(store, sessions: List[UserSession], turns: int, persist: bool) -> float:
+    started = time.perf_counter()
+    for turn in range(turns):
+        session = sessions[turn % len(sessions)]
+        store.get(session.user_id).get("missing_entities")
+        store.update(session.user_id, {
+            "intent": "transfer",
+            "entities": {"recipient": "Maria", "amount": turn},
+            "missing_entities": [],
+            "next_question": ""
+        })
+        session.add_to_history(f"{session.user_name}: transferir {turn} reais para Maria")
+        session.add_to_history("Magie: Confirma a transferência?")
+        if persist:
+            store.save_session(session)
+            store.flush()
+    return turns / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=5000)
+    args = parser.parse_args()
+
+    def new_sessions() -> List[UserSession]:
+        return [UserSession(f"user-{i}", "Rodrigo", "000123", []) for i in range(args.users)]
+
+    results: Dict[str, float] = {"memory": run_turns(StateStore(), new_sessions(), args.turns, persist=False)}
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteStore(os.path.join(directory, "bench.db"))
+        results["sqlite (flush per turn)"] = run_turns(store, new_sessions(), args.turns, persist=True)
+        store.close()
+
+    for name, turns_per_second in results.items():
+        print(f"{name:>24}: {turns_per_second:>10.0f} turns/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""Replay the multi-turn scenarios as many concurrent virtual users, for capacity sizing.
+
+Every virtual user starts after its share of `--ramp-up`, then keeps
+picking a scenario from tests/resources/multi_turn_scenarios.json and
+playing its messages in order, each scenario under a fresh user id (its
+own session and state), until `--duration` runs out. When a scenario
+ends its session and state are dropped, so long runs do not grow memory.
+
+Reports throughput (turns/s), a latency histogram with percentiles,
+error rates and LLM calls per turn. An "error" is either a failed
+request or a turn whose reply has type "error".
+
+Run from the `src/` folder:
+
+    python -m benchmarks.load_generator --users 50 --ramp-up 5 --duration 30                # in process, fake LLM
+    python -m benchmarks.load_generator --llm stub --stub-latency lognormal:300,0.5 --stub-timeout-rate 0.01
+    python -m benchmarks.load_generator --target http://127.0.0.1:8080 --users 200           # a running app.ui.server
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from app.infra.ollama_stub import FaultConfig, LatencyModel, OllamaStub
+from app.ui.server import build_server
+from benchmarks.bench_conversation_latency import SCENARIOS_PATH, percentile
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+class InProcessTarget:
+    """Sends turns straight to a `SessionRegistry`, as the server would."""
+
+    def __init__(self, server):
+        self.registry = server.registry
+        self.llm_client = server.llm_client
+
+    async def send(self, user_id: str, message: str) -> Dict[str, Any]:
+        return await self.registry.handle_message(user_id, message)
+
+    async def end_scenario(self, user_id: str) -> None:
+        await self.registry.forget(user_id)
+
+    async def llm_calls(self) -> Optional[int]:
+        return self.llm_client.stats()["calls"]
+
+    async def close(self) -> None:
+        client = getattr(self.llm_client, "client", None)
+        if hasattr(client, "close"):
+            await client.close()
+
+
+class HttpTarget:
+    """Posts turns to a running `app.ui.server` over pooled keep-alive connections."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def send(self, user_id: str, message: str) -> Dict[str, Any]:
+        body = json.dumps({"message": message}, ensure_ascii=False).encode("utf-8")
+        status, reply = await self._request("POST", f"/sessions/{quote(user_id, safe='')}/messages", body)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {reply.get('error')}")
+        return reply
+
+    async def end_scenario(self, user_id: str) -> None:
+        await self._request("DELETE", f"/sessions/{quote(user_id, safe='')}")
+
+    async def llm_calls(self) -> Optional[int]:
+        _, health = await self._request("GET", "/health")
+        return health.get("llm", {}).get("calls")
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    async def _request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, Dict[str, Any]]:
+        reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout)
+            lines = head.decode("latin-1").split("\r\n")
+            status = int(lines[0].split(" ", 2)[1])
+            headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines[1:] if line)}
+            payload = await asyncio.wait_for(reader.readexactly(int(headers.get("content-length", 0))), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, json.loads(payload or b"{}")
+
+
+class LoadMetrics:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.scenarios = 0
+
+    def record(self, seconds: float, error: Optional[str] = None) -> None:
+        self.latencies.append(seconds)
+        if error:
+            self.errors[error] += 1
+
+    def report(self, elapsed: float, llm_calls: Optional[int]) -> Dict[str, Any]:
+        turns = len(self.latencies)
+        ordered = sorted(self.latencies)
+        latency = {}
+        if ordered:
+            latency = {f"p{p}": percentile(ordered, p) * 1000 for p in (50, 90, 95, 99)}
+            latency["mean"] = sum(ordered) / turns * 1000
+            latency["max"] = ordered[-1] * 1000
+        histogram = Counter()
+        for seconds in ordered:
+            ms = seconds * 1000
+            histogram[next((bound for bound in HISTOGRAM_BOUNDS_MS if ms <= bound), None)] += 1
+        errors = sum(self.errors.values())
+        return {
+            "turns": turns,
+            "scenarios": self.scenarios,
+            "elapsed_s": elapsed,
+            "turns_per_second": turns / elapsed if elapsed else 0.0,
+            "latency_ms": latency,
+            "histogram_ms": [[bound, histogram[bound]] for bound in HISTOGRAM_BOUNDS_MS + [None] if histogram[bound]],
+            "errors": dict(self.errors),
+            "error_rate": errors / turns if turns else 0.0,
+            "llm_calls": llm_calls,
+            "llm_calls_per_turn": llm_calls / turns if llm_calls is not None and turns else None
+        }
+
+
+async def virtual_user(
+    index: int,
+    target,
+    scenarios: List[Dict[str, Any]],
+    metrics: LoadMetrics,
+    start_delay: float,
+    deadline: float,
+    think_seconds: float,
+    seed: int
+) -> None:
+    await asyncio.sleep(start_delay)
+    rng = random.Random(seed * 100_003 + index)
+    iteration = 0
+    while time.monotonic() < deadline:
+        scenario = rng.choice(scenarios)
+        user_id = f"vu{index}-{iteration}"
+        iteration += 1
+        try:
+            for step in scenario["steps"]:
+                if time.monotonic() >= deadline:
+                    return
+                started = time.perf_counter()
+                try:
+                    reply = await target.send(user_id, step["input"])
+                except Exception as e:
+                    metrics.record(time.perf_counter() - started, type(e).__name__)
+                    break
+                metrics.record(time.perf_counter() - started, "error_reply" if reply.get("type") == "error" else None)
+                if think_seconds:
+                    await asyncio.sleep(think_seconds)
+            else:
+                metrics.scenarios += 1
+        finally:
+            # Each user id is used for one scenario only, so its session is never needed again
+            try:
+                await target.end_scenario(user_id)
+            except Exception as e:
+                metrics.errors[f"end_scenario:{type(e).__name__}"] += 1
+
+
+async def run_load(
+    target,
+    scenarios: List[Dict[str, Any]],
+    users: int,
+    ramp_up: float,
+    duration: float,
+    think_ms: float = 0.0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Drive `users` virtual users against `target` for `duration` seconds; returns the report."""
+    metrics = LoadMetrics()
+    calls_before = await target.llm_calls()
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(
+        virtual_user(index, target, scenarios, metrics, ramp_up * index / users, deadline, think_ms / 1000, seed)
+        for index in range(users)
+    ))
+    elapsed = time.monotonic() - started
+    calls_after = await target.llm_calls()
+    llm_calls = calls_after - calls_before if calls_before is not None and calls_after is not None else None
+    return metrics.report(elapsed, llm_calls)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency_ms"]
+    print(f"turns: {report['turns']}  scenarios completed: {report['scenarios']}  elapsed: {report['elapsed_s']:.1f} s")
+    print(f"throughput: {report['turns_per_second']:.1f} turns/s")
+    if latency:
+        print("latency ms: " + "  ".join(f"{name} {value:.1f}" for name, value in latency.items()))
+    print(f"errors: {report['error_rate'] * 100:.2f}% {report['errors'] or ''}")
+    if report["llm_calls_per_turn"] is not None:
+        print(f"LLM calls: {report['llm_calls']} ({report['llm_calls_per_turn']:.2f} per turn)")
+    peak = max((count for _, count in report["histogram_ms"]), default=0)
+    for bound, count in report["histogram_ms"]:
+        label = f"<= {bound} ms" if bound is not None else f"> {HISTOGRAM_BOUNDS_MS[-1]} ms"
+        print(f"{label:>12} {count:>8} {'#' * max(1, round(40 * count / peak))}")
+
+
+def build_target(args, stub: Optional[OllamaStub]):
+    if args.target != "inprocess":
+        return HttpTarget(args.target)
+    ollama_url = stub.start_background() if stub else None
+    server = build_server(
+        llm="fake" if args.llm == "fake" else "ollama",
+        max_llm_concurrency=args.max_llm_concurrency,
+        fake_latency_ms=args.fake_latency_ms,
+        ollama_url=ollama_url
+    )
+    return InProcessTarget(server)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="inprocess", help='"inprocess" or the base URL of a running server')
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds until every user has started")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds, ramp-up included")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between a user's turns")
+    parser.add_argument("--scenarios", default=SCENARIOS_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    group = parser.add_argument_group("in-process target")
+    group.add_argument("--llm", choices=["fake", "stub", "ollama"], default="fake")
+    group.add_argument("--max-llm-concurrency", type=int, default=4)
+    group.add_argument("--fake-latency-ms", type=float, default=50.0)
+    group.add_argument("--stub-latency", default="fixed:50")
+    group.add_argument("--stub-error-rate", type=float, default=0.0)
+    group.add_argument("--stub-timeout-rate", type=float, default=0.0)
+    group.add_argument("--stub-malformed-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    with open(args.scenarios, encoding="utf-8") as file:
+        scenarios = json.load(file)
+
+    stub = None
+    if args.target == "inprocess" and args.llm == "stub":
+        stub = OllamaStub(
+            latency=LatencyModel.parse(args.stub_latency),
+            faults=FaultConfig(
+                error_rate=args.stub_error_rate,
+                timeout_rate=args.stub_timeout_rate,
+                malformed_rate=args.stub_malformed_rate
+            ),
+            seed=args.seed
+        )
+
+    async def run() -> Dict[str, Any]:
+        target = build_target(args, stub)
+        try:
+            return await run_load(target, scenarios, args.users, args.ramp_up, args.duration, args.think_ms, args.seed)
+        finally:
+            await target.close()
+
+    try:
+        report = asyncio.run(run())
+    finally:
+        if stub is not None:
+            stub.stop_background()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
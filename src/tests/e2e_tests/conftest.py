@@ -0,0 +1,20 @@
+import os
+import pytest
+from app.infra import llm_adapter
+from app.infra.llm_adapter import OllamaClient
+from app.infra.ollama_stub import OllamaStub
+
+
+@pytest.fixture(scope="session", autouse=True)
+def ollama_stub():
+    """With OLLAMA_STUB=1 the e2e tests talk to a local stand-in instead of a real Ollama."""
+    if os.environ.get("OLLAMA_STUB") != "1":
+        yield None
+        return
+    stub = OllamaStub(seed=0)
+    url = stub.start_background()
+    previous = llm_adapter._default_client
+    llm_adapter._default_client = OllamaClient(url=url)
+    yield stub
+    llm_adapter._default_client = previous
+    stub.stop_background()
@@ -0,0 +1,46 @@
+from datetime import datetime
+from types import SimpleNamespace
+from app.domain.account_aggregates import AccountAggregates, day_key, month_key
+
+def _ts(day, month=3):
+    return datetime(2025, month, day, 12).timestamp()
+
+def test_record_updates_every_total():
+    aggregates = AccountAggregates(opening_cents=100_00)
+    aggregates.record(10_00, "Maria", _ts(1))
+    aggregates.record(5_50, "João", _ts(1))
+    aggregates.record(20_00, "Maria", _ts(2, month=4))
+
+    assert aggregates.balance == 64.5
+    assert aggregates.count == 3
+    assert aggregates.day_total("2025-03-01") == 15.5
+    assert aggregates.month_total("2025-03") == 15.5
+    assert aggregates.month_total("2025-04") == 20.0
+    assert aggregates.month_total("2025-05") == 0.0
+    assert aggregates.top_recipients(1) == [("Maria", 30.0)]
+
+def test_keys_use_local_calendar():
+    assert day_key(_ts(9)) == "2025-03-09"
+    assert month_key(_ts(9)) == "2025-03"
+
+def test_rebuild_matches_incremental_totals():
+    incremental = AccountAggregates(opening_cents=50_00)
+    transactions = [SimpleNamespace(amount=12.5, to="Ana", timestamp=_ts(3)), SimpleNamespace(amount=7.5, to="Bia", timestamp=_ts(4))]
+    for transaction in transactions:
+        incremental.record(round(transaction.amount * 100), transaction.to, transaction.timestamp)
+
+    rebuilt = AccountAggregates.rebuild(incremental.balance, transactions)
+    assert rebuilt.snapshot() == incremental.snapshot()
+
+def test_summary_includes_month_when_given():
+    aggregates = AccountAggregates(opening_cents=10_00)
+    aggregates.record(1_00, "Ana", _ts(1))
+    summary = aggregates.summary(month="2025-03", top=5)
+    assert summary == {
+        "balance": 9.0,
+        "outflow": 1.0,
+        "count": 1,
+        "top_recipients": [("Ana", 1.0)],
+        "month": "2025-03",
+        "month_outflow": 1.0
+    }
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.infra.async_llm_adapter import AsyncOllamaClient
+
+STREAM_FRAGMENTS = ['{"intent": ', '"get_balance"', ', "entities": {}', '}', ' Mais alguma coisa?']
+PLAIN_FRAGMENTS = ["Não ", "sei."]
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        if body["stream"]:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            fragments = PLAIN_FRAGMENTS if self.path.endswith("/plain") else STREAM_FRAGMENTS
+            for i, fragment in enumerate(fragments):
+                line = json.dumps({"response": fragment, "done": i == len(fragments) - 1}).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        payload = json.dumps({"response": f"eco: {body['prompt']}", "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if self.path.endswith("/chunked"):
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            half = len(payload) // 2
+            for part in (payload[:half], payload[half:]):
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def ollama_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_generate_returns_response_text(ollama_server):
+    async def scenario():
+        client = AsyncOllamaClient(url=f"{ollama_server}/api/generate")
+        response = await client.generate("saldo")
+        await client.close()
+        return response
+
+    assert asyncio.run(scenario()) == "eco: saldo"
+
+def test_generate_reads_chunked_body(ollama_server):
+    async def scenario():
+        client = AsyncOllamaClient(url=f"{ollama_server}/api/generate/chunked")
+        response = await client.generate("extrato")
+        await client.close()
+        return response
+
+    assert asyncio.run(scenario()) == "eco: extrato"
+
+def test_sequential_requests_reuse_connection(ollama_server):
+    async def scenario():
+        client = AsyncOllamaClient(url=f"{ollama_server}/api/generate")
+        for i in range(4):
+            await client.generate(f"mensagem {i}")
+        await client.close()
+        return client.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["requests"] == 4
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 3
+
+def test_concurrent_requests_are_bounded_by_pool(ollama_server):
+    async def scenario():
+        client = AsyncOllamaClient(url=f"{ollama_server}/api/generate", pool_size=3)
+        responses = await asyncio.gather(*(client.generate(f"m{i}") for i in range(12)))
+        await client.close()
+        return responses, client.stats()
+
+    responses, stats = asyncio.run(scenario())
+    assert responses == [f"eco: m{i}" for i in range(12)]
+    assert stats["connections_opened"] <= 3
+
+def test_connection_error_returns_message():
+    async def scenario():
+        client = AsyncOllamaClient(url="http://127.0.0.1:1/api/generate")
+        return await client.generate("oi"), client.stats()
+
+    response, stats = asyncio.run(scenario())
+    assert response.startswith("Erro ao conectar com Ollama")
+    assert stats["errors"] == 1
+
+def test_streaming_generate_cancels_after_json_object(ollama_server):
+    async def scenario():
+        client = AsyncOllamaClient(url=f"{ollama_server}/api/generate", stream=True)
+        response = await client.generate("saldo")
+        await client.close()
+        return response, client.stats()
+
+    response, stats = asyncio.run(scenario())
+    assert response == '{"intent": "get_balance", "entities": {}}'
+    assert stats["early_stops"] == 1
+    assert stats["idle_connections"] == 0
+
+def test_streaming_without_json_reads_until_done(ollama_server):
+    async def scenario():
+        client = AsyncOllamaClient(url=f"{ollama_server}/api/generate/plain", stream=True)
+        response = await client.generate("oi")
+        await client.close()
+        return response, client.stats()
+
+    response, stats = asyncio.run(scenario())
+    assert response == "Não sei."
+    assert stats["early_stops"] == 0
+    assert stats["connections_opened"] == 1
@@ -1,5 +1,10 @@
+import os
+import threading
+import time
 import pytest
+from unittest.mock import patch
 from app.application.bank_application_service import BankApplicationService, Transaction, Account
+from app.infra.ledger_journal import LedgerJournal
 
 @pytest.fixture
 def bank_service():
@@ -88,6 +93,55 @@ def test_get_transactions_with_history(bank_service):
     assert "Maria" in message
     assert "João" in message
 
+def test_get_transactions_limit_returns_latest(bank_service):
+    """Test that a limit keeps only the most recent transactions, oldest first."""
+    for recipient in ["Ana", "Bia", "Caio", "Duda"]:
+        bank_service.transfer("rodrigo.barreiros", "corrente", recipient, 10.0)
+
+    transactions, message = bank_service.get_transactions("rodrigo.barreiros", "corrente", limit=2)
+    assert [t.to for t in transactions] == ["Caio", "Duda"]
+    assert "Ana" not in message
+
+def test_get_transactions_date_range(bank_service):
+    """Test filtering transactions by timestamp."""
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 10.0)
+    cutoff = bank_service.get_transactions("rodrigo.barreiros", "corrente")[0][0].timestamp + 1
+    bank_service.ledger.transfer(
+        ("rodrigo.barreiros", "corrente"), 5.0,
+        entry=Transaction(type="transfer", to="João", amount=5.0, from_account="corrente", timestamp=cutoff)
+    )
+
+    transactions, _ = bank_service.get_transactions("rodrigo.barreiros", "corrente", start=cutoff)
+    assert [t.to for t in transactions] == ["João"]
+    transactions, _ = bank_service.get_transactions("rodrigo.barreiros", "corrente", end=cutoff)
+    assert [t.to for t in transactions] == ["Maria"]
+
+def test_get_transactions_page_walks_every_page(bank_service):
+    """Test following next_cursor from the latest page back to the oldest."""
+    recipients = ["Ana", "Bia", "Caio", "Duda", "Edu"]
+    for recipient in recipients:
+        bank_service.transfer("rodrigo.barreiros", "corrente", recipient, 10.0)
+
+    pages, cursor = [], None
+    while True:
+        page, _ = bank_service.get_transactions_page("rodrigo.barreiros", "corrente", limit=2, cursor=cursor)
+        pages.append([t.to for t in page.transactions])
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert pages == [["Duda", "Edu"], ["Bia", "Caio"], ["Ana"]]
+
+def test_sub_cent_amounts_match_ledger_and_aggregates(bank_service):
+    """Test that history, balance and aggregates round a sub-cent amount the same way."""
+    success, _ = bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 1.005)
+    assert success is True
+    balance, _ = bank_service.get_balance("rodrigo.barreiros", "corrente")
+    transactions, message = bank_service.get_transactions("rodrigo.barreiros", "corrente")
+    assert balance == 1498.99
+    assert transactions[0].amount == 1.01
+    assert "R$ 1.01" in message
+    assert bank_service.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+
 def test_get_transactions_invalid_user(bank_service):
     """Test getting transactions for invalid user."""
     transactions, message = bank_service.get_transactions("nonexistent_user", "corrente")
@@ -106,4 +160,188 @@ def test_get_help(bank_service):
     message = bank_service.get_help()
     assert "saldos" in message
     assert "transferir" in message
-    assert "transações" in message 
\ No newline at end of file
+    assert "transações" in message 
+
+def test_transfer_rejects_non_positive_amount(bank_service):
+    """Test transfer with a zero or negative amount."""
+    success, message = bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", -100.0)
+    assert success is False
+    assert "positivo" in message
+
+    balance, _ = bank_service.get_balance("rodrigo.barreiros", "corrente")
+    assert balance == 1500.0
+
+def test_transfer_rejects_sub_cent_amount(bank_service):
+    """Test that an amount that rounds to zero cents is rejected instead of raising."""
+    success, message = bank_service.transfer("rodrigo.barreiros", "corrente", "maria", 0.004)
+    assert success is False
+    assert "positivo" in message
+    assert bank_service.get_balance("rodrigo.barreiros", "corrente")[0] == 1500.0
+
+def test_transfer_accepts_numeric_text_and_rejects_other_text(bank_service):
+    """Test amounts given as text, as the LLM sometimes returns them."""
+    success, message = bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", "150")
+    assert success is True
+    assert "R$ 150.00" in message
+    assert bank_service.get_balance("rodrigo.barreiros", "corrente")[0] == 1350.0
+
+    success, message = bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", "cento e cinquenta")
+    assert success is False
+    assert "inválido" in message
+    assert bank_service.get_balance("rodrigo.barreiros", "corrente")[0] == 1350.0
+
+def test_get_summary_uses_running_aggregates(bank_service):
+    """Test that the summary reflects every transfer without scanning history."""
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+    bank_service.transfer("rodrigo.barreiros", "corrente", "João", 50.0)
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 25.0)
+
+    summary, message = bank_service.get_summary("rodrigo.barreiros", "corrente")
+    assert summary["balance"] == 1325.0
+    assert summary["month_outflow"] == 175.0
+    assert summary["top_recipients"][0] == ("Maria", 125.0)
+    assert "R$ 175.00" in message
+    assert "Maria (R$ 125.00)" in message
+
+def test_get_summary_other_month_is_empty(bank_service):
+    """Test the summary of a month without transfers."""
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+    summary, message = bank_service.get_summary("rodrigo.barreiros", "corrente", month="1999-01")
+    assert summary["month_outflow"] == 0.0
+    assert "R$ 0.00" in message
+
+def test_get_summary_invalid_account(bank_service):
+    """Test summary for an unknown account."""
+    summary, message = bank_service.get_summary("rodrigo.barreiros", "invalid_account")
+    assert summary is None
+    assert "não encontrado" in message
+
+def test_check_aggregates_consistent(bank_service):
+    """Test that running aggregates match a rebuild from the ledger."""
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Pedro", 5000.0)
+    consistent, _ = bank_service.check_aggregates("rodrigo.barreiros", "corrente")
+    assert consistent is True
+
+def test_check_aggregates_rebuilds_on_divergence(bank_service):
+    """Test that a divergence is detected and repaired from the ledger."""
+    bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+    bank_service._aggregates[("rodrigo.barreiros", "corrente")].recipients["Maria"] += 1
+
+    consistent, message = bank_service.check_aggregates("rodrigo.barreiros", "corrente")
+    assert consistent is False
+    assert "reconstruídos" in message
+    assert bank_service.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+
+def _restart(service, path):
+    service.close()
+    return BankApplicationService(journal=LedgerJournal(str(path)))
+
+def test_journal_restores_state_after_restart(tmp_path):
+    """Test that balances, history and aggregates survive a restart by replaying the journal."""
+    service = BankApplicationService(journal=LedgerJournal(str(tmp_path)))
+    service.open_account("ana", "corrente", 200.0)
+    service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+    service.transfer("ana", "corrente", "João", 12.34)
+
+    restarted = _restart(service, tmp_path)
+    assert restarted.get_balance("rodrigo.barreiros", "corrente")[0] == 1400.0
+    assert restarted.get_balance("ana", "corrente")[0] == 187.66
+    assert [t.to for t in restarted.get_transactions("ana", "corrente")[0]] == ["João"]
+    assert restarted.get_summary("rodrigo.barreiros", "corrente")[0]["top_recipients"] == [("Maria", 100.0)]
+    assert restarted.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+    restarted.close()
+
+def test_snapshot_then_tail_replay(tmp_path):
+    """Test that a restart loads the snapshot and replays only what came after it."""
+    service = BankApplicationService(journal=LedgerJournal(str(tmp_path)))
+    service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+    service.snapshot()
+    service.transfer("rodrigo.barreiros", "corrente", "João", 50.0)
+    before = service.get_transactions("rodrigo.barreiros", "corrente")[0]
+
+    restarted = _restart(service, tmp_path)
+    assert restarted.get_balance("rodrigo.barreiros", "corrente")[0] == 1350.0
+    assert restarted.get_transactions("rodrigo.barreiros", "corrente")[0] == before
+    assert restarted.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+    assert len(list(restarted.journal.replay(restarted.journal.segments()[0]))) == 1
+    restarted.close()
+
+def test_periodic_snapshots(tmp_path):
+    """Test that a snapshot is written every `snapshot_every` transfers."""
+    journal = LedgerJournal(str(tmp_path))
+    service = BankApplicationService(journal=journal, snapshot_every=2)
+    for _ in range(5):
+        service.transfer("rodrigo.barreiros", "corrente", "Maria", 1.0)
+
+    assert journal.load_snapshot()[0] == 3
+    restarted = _restart(service, tmp_path)
+    assert restarted.get_balance("rodrigo.barreiros", "corrente")[0] == 1495.0
+    restarted.close()
+
+def test_failed_journal_write_rejects_the_transfer(tmp_path):
+    """Test that a transfer whose journal write fails is undone and reported."""
+    service = BankApplicationService(journal=LedgerJournal(str(tmp_path)))
+    with patch("app.infra.ledger_journal.os.fsync", side_effect=OSError("disk full")):
+        success, message = service.transfer("rodrigo.barreiros", "corrente", "Maria", 10.0)
+    assert success is False
+    assert "Tente novamente" in message
+    assert service.get_balance("rodrigo.barreiros", "corrente")[0] == 1500.0
+    assert service.get_transactions("rodrigo.barreiros", "corrente")[0] == []
+    assert service.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+    assert service.transfer("rodrigo.barreiros", "corrente", "Maria", 10.0)[0] is False
+
+    restarted = _restart(service, tmp_path)
+    assert restarted.get_balance("rodrigo.barreiros", "corrente")[0] == 1500.0
+    assert restarted.get_transactions("rodrigo.barreiros", "corrente")[0] == []
+    restarted.close()
+
+def test_transfer_after_close_is_rejected(tmp_path):
+    """Test that a closed journal rejects transfers instead of losing them."""
+    service = BankApplicationService(journal=LedgerJournal(str(tmp_path)))
+    service.close()
+    assert service.transfer("rodrigo.barreiros", "corrente", "Maria", 10.0)[0] is False
+    assert service.get_balance("rodrigo.barreiros", "corrente")[0] == 1500.0
+
+def _slow_fsync(fail=False):
+    real_fsync = os.fsync
+
+    def fsync(descriptor):
+        time.sleep(0.005)
+        if fail:
+            raise OSError("disk full")
+        real_fsync(descriptor)
+    return fsync
+
+def _transfer_concurrently(service, threads, transfers):
+    def worker():
+        for _ in range(transfers):
+            service.transfer("rodrigo.barreiros", "corrente", "Maria", 1.0)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+def test_transfers_of_one_account_share_fsyncs(tmp_path):
+    """Test that the commit waits outside the account lock, so concurrent transfers are grouped."""
+    journal = LedgerJournal(str(tmp_path))
+    service = BankApplicationService(journal=journal)
+    fsyncs_before = journal.stats()["fsyncs"]
+    with patch("app.infra.ledger_journal.os.fsync", side_effect=_slow_fsync()):
+        _transfer_concurrently(service, threads=8, transfers=10)
+    assert service.get_balance("rodrigo.barreiros", "corrente")[0] == 1420.0
+    assert journal.stats()["fsyncs"] - fsyncs_before < 80
+    assert service.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+    service.close()
+
+def test_concurrent_transfers_are_all_undone_when_the_commit_fails(tmp_path):
+    """Test that every transfer waiting on a failed fsync is undone, whatever order they revert in."""
+    service = BankApplicationService(journal=LedgerJournal(str(tmp_path)))
+    with patch("app.infra.ledger_journal.os.fsync", side_effect=_slow_fsync(fail=True)):
+        _transfer_concurrently(service, threads=4, transfers=3)
+    assert service.get_balance("rodrigo.barreiros", "corrente")[0] == 1500.0
+    assert service.get_transactions("rodrigo.barreiros", "corrente")[0] == []
+    assert service.get_summary("rodrigo.barreiros", "corrente")[0]["top_recipients"] == []
+    assert service.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
@@ -0,0 +1,75 @@
+import pytest
+from app.infra.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+
+def _fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow_request()
+        breaker.record(False)
+
+def test_opens_after_consecutive_failures(breaker):
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is False
+    assert breaker.stats()["rejected"] == 1
+
+def test_success_resets_failure_count(breaker):
+    _fail(breaker, 2)
+    breaker.allow_request()
+    breaker.record(True)
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+def test_half_open_allows_limited_probes(breaker, clock):
+    _fail(breaker, 3)
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["probes"] == 1
+
+def test_failed_probe_reopens(breaker, clock):
+    _fail(breaker, 3)
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    clock.now = 15
+    assert breaker.allow_request() is False
+
+def test_transitions_are_counted(breaker, clock):
+    _fail(breaker, 3)
+    clock.now = 10
+    breaker.allow_request()
+    breaker.record(True)
+    stats = breaker.stats()
+    assert stats["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+    assert [(old, new) for _, old, new in stats["recent_transitions"]] == [
+        ("closed", "open"), ("open", "half_open"), ("half_open", "closed")
+    ]
+
+def test_release_frees_probe_slot_without_outcome(breaker, clock):
+    _fail(breaker, 3)
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is True
@@ -0,0 +1,51 @@
+import pytest
+from app.domain.compact_session import CompactHistory, CompactUserSession, speaker_code
+from app.domain.history_policy import HistoryPolicy
+from app.domain.intent_service import IntentService
+from app.domain.prompt_builder import render_history
+
+def test_lines_round_trip():
+    lines = ["Rodrigo: saldo", "Magie: Seu saldo é R$ 10: ok", "sem prefixo", ": vazio", "a\nb: c"]
+    history = CompactHistory(8, lines)
+    assert list(history) == lines
+    assert history == lines
+
+def test_speakers_are_interned_as_codes():
+    assert speaker_code("Rodrigo") == speaker_code("Rodrigo")
+    assert speaker_code("Rodrigo") != speaker_code("Magie")
+    assert speaker_code("") == 0
+
+def test_ring_buffer_keeps_last_lines_with_absolute_indices():
+    history = CompactHistory(3, [f"Rodrigo: {i}" for i in range(5)])
+    assert len(history) == 5
+    assert list(history) == ["Rodrigo: 2", "Rodrigo: 3", "Rodrigo: 4"]
+    assert history[-1] == "Rodrigo: 4"
+    assert history[3:] == ["Rodrigo: 3", "Rodrigo: 4"]
+    assert history[0:3] == ["Rodrigo: 2"]
+    assert history[-2:] == ["Rodrigo: 3", "Rodrigo: 4"]
+    with pytest.raises(IndexError):
+        history[1]
+
+def test_session_api_matches_user_session():
+    session = CompactUserSession("u1", "Rodrigo", "000123", ["Rodrigo: oi"], history_capacity=4)
+    session.add_to_history("Magie: Olá!")
+    session.previous_result = {"intent": "transfer"}
+    session.clear_previous_result()
+    assert session.previous_result == {}
+    assert list(session.history) == ["Rodrigo: oi", "Magie: Olá!"]
+    with pytest.raises(AttributeError):
+        session.extra = 1
+
+def test_renders_prompt_like_a_list():
+    lines = [f"Rodrigo: mensagem {i}" for i in range(10)]
+    compact = CompactHistory(16, lines)
+    service = IntentService()
+    assert render_history(compact) == render_history(lines)
+    assert service._build_prompt("u1", compact, "oi") == service._build_prompt("u1", lines, "oi")
+
+def test_history_policy_accepts_compact_history():
+    policy = HistoryPolicy(token_budget=1000, keep_last_turns=2)
+    compact = CompactHistory(4, [f"Rodrigo: mensagem {i}" for i in range(6)])
+    window = policy.render("u1", compact)
+    assert window.text.endswith("Rodrigo: mensagem 4\nRodrigo: mensagem 5")
+    assert window.folded_turns == 4
@@ -1,5 +1,7 @@
+import asyncio
+import threading
 import pytest
-from unittest.mock import Mock, MagicMock
+from unittest.mock import Mock, MagicMock, AsyncMock
 from typing import Dict, Any
 
 from app.application.conversation_manager import ConversationManager
@@ -150,4 +152,53 @@ def test_transfer_confirmation_flow(conversation_manager, mock_user_session, moc
     result = conversation_manager.process_message("sim")
     assert result[0] is True
     assert result[1] == "success"
-    assert "sucesso" in result[2].lower() 
\ No newline at end of file
+    assert "sucesso" in result[2].lower() 
+
+def test_declined_transfer_is_not_executed(conversation_manager, mock_user_session, mock_intent_handler):
+    mock_user_session.previous_result = {
+        "intent": "transfer",
+        "entities": {"amount": 100, "recipient": "Maria", "account_type": "corrente"},
+        "missing_entities": []
+    }
+    result = conversation_manager.process_message("Não, obrigado")
+    assert result == (True, "info", "Transferência cancelada.")
+    assert mock_user_session.previous_result == {}
+    mock_intent_handler.handle_transfer_confirmation.assert_not_called()
+
+def test_aprocess_message_matches_sync_flow(conversation_manager, mock_user_session, mock_intent_service, mock_intent_handler):
+    mock_user_session.previous_result = {}
+    mock_intent_service.aprocess_message = AsyncMock(return_value={
+        "intent": "get_balance",
+        "entities": {"account_type": "corrente"},
+        "missing_entities": [],
+        "next_question": ""
+    })
+    mock_intent_handler.handle_transaction.return_value = ("get_balance", "Seu saldo é R$ 1000,00")
+    result = asyncio.run(conversation_manager.aprocess_message("Qual é o meu saldo?"))
+    assert result == (True, None, "Seu saldo é R$ 1000,00")
+    mock_intent_service.aprocess_message.assert_awaited_once_with("test_user", [], "Qual é o meu saldo?")
+    mock_intent_service.process_message.assert_not_called()
+
+def test_aprocess_message_exit_skips_intent_service(conversation_manager, mock_intent_service):
+    mock_intent_service.aprocess_message = AsyncMock()
+    result = asyncio.run(conversation_manager.aprocess_message("sair"))
+    assert result == (False, None, "Até logo, Test User!")
+    mock_intent_service.aprocess_message.assert_not_awaited()
+
+def test_aprocess_message_runs_bank_calls_off_the_event_loop(conversation_manager, mock_user_session, mock_intent_service, mock_intent_handler):
+    mock_user_session.previous_result = {}
+    mock_intent_service.aprocess_message = AsyncMock(return_value={
+        "intent": "get_balance",
+        "entities": {"account_type": "corrente"},
+        "missing_entities": [],
+        "next_question": ""
+    })
+    threads = []
+    mock_intent_handler.handle_transaction.side_effect = lambda intent, entities: (threads.append(threading.get_ident()), (intent, "ok"))[1]
+
+    async def scenario():
+        await conversation_manager.aprocess_message("Qual é o meu saldo?")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads and threads[0] != loop_thread
@@ -0,0 +1,79 @@
+import pytest
+from app.domain.history_policy import SUMMARY_HEADER, HistoryPolicy, compact_summarizer, estimate_tokens
+
+def make_history(turns):
+    return [f"Rodrigo: mensagem número {i}" for i in range(turns)]
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+def test_compact_summarizer_truncates_long_lines():
+    summary = compact_summarizer("- antiga", ["Rodrigo: " + "x" * 200], max_chars=20)
+    lines = summary.split("\n")
+    assert lines[0] == "- antiga"
+    assert lines[1].endswith("…")
+    assert len(lines[1]) == 22
+
+def test_short_history_is_sent_verbatim():
+    policy = HistoryPolicy(keep_last_turns=4)
+    window = policy.render("u1", make_history(3))
+    assert window.text == "\n".join(make_history(3))
+    assert window.verbatim_turns == 3
+    assert window.folded_turns == 0
+
+def test_older_turns_are_folded_into_summary():
+    policy = HistoryPolicy(keep_last_turns=2, token_budget=1000)
+    window = policy.render("u1", make_history(5))
+    assert window.text.startswith(SUMMARY_HEADER)
+    assert "- Rodrigo: mensagem número 0" in window.text
+    assert window.text.endswith("Rodrigo: mensagem número 3\nRodrigo: mensagem número 4")
+    assert window.folded_turns == 3
+
+def test_summary_is_refreshed_incrementally():
+    calls = []
+
+    def summarizer(previous, new_lines):
+        calls.append(list(new_lines))
+        return compact_summarizer(previous, new_lines)
+
+    policy = HistoryPolicy(keep_last_turns=2, token_budget=1000, summarizer=summarizer)
+    history = make_history(4)
+    policy.render("u1", history)
+    history.append("Magie: resposta")
+    policy.render("u1", history)
+    policy.render("u1", history)
+    assert calls == [make_history(2), ["Rodrigo: mensagem número 2"]]
+
+def test_prompt_size_stays_within_budget_as_history_grows():
+    policy = HistoryPolicy(keep_last_turns=4, token_budget=60)
+    history = []
+    for i in range(200):
+        history.append(f"Rodrigo: quero ver a mensagem {i} do extrato")
+        window = policy.render("u1", history)
+        assert window.tokens <= 60
+    assert window.verbatim_turns == 4
+    assert "mensagem 199" in window.text
+
+def test_reset_history_starts_new_summary():
+    policy = HistoryPolicy(keep_last_turns=1, token_budget=1000)
+    policy.render("u1", make_history(5))
+    window = policy.render("u1", ["Rodrigo: oi"])
+    assert window.text == "Rodrigo: oi"
+
+def test_least_recently_used_summaries_are_evicted():
+    policy = HistoryPolicy(keep_last_turns=1, token_budget=1000, max_sessions=2)
+    first = policy.render("u1", make_history(5))
+    policy.render("u2", make_history(3))
+    policy.render("u1", make_history(5))
+    policy.render("u3", make_history(3))
+    assert list(policy._sessions) == ["u1", "u3"]
+    # An evicted user gets the same window, rebuilt from the history
+    policy.render("u2", make_history(3))
+    assert policy.render("u1", make_history(5)).text == first.text
+
+def test_pluggable_tokenizer():
+    policy = HistoryPolicy(keep_last_turns=10, token_budget=3, tokenizer=lambda text: len(text.split("\n")))
+    window = policy.render("u1", make_history(6))
+    assert window.verbatim_turns == 3
@@ -0,0 +1,69 @@
+import pytest
+from app.domain.intent_cache import IntentCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(clock):
+    return IntentCache(max_size=2, ttl_seconds=60, history_window=1, clock=clock)
+
+def test_normalize_ignores_case_accents_and_punctuation():
+    assert IntentCache.normalize("Rodrigo:  Qual   meu SALDO da Poupança?!", strip_speaker=True) == "qual meu saldo da poupanca"
+
+def test_normalize_keeps_speaker_prefix_by_default():
+    assert IntentCache.normalize("Obs: Maria") == "obs: maria"
+
+def test_fingerprint_matches_near_identical_messages(cache):
+    key_a = cache.fingerprint(["Rodrigo: qual meu saldo?"], "qual meu saldo?")
+    key_b = cache.fingerprint(["Ana: Qual meu saldo"], "Qual meu saldo")
+    assert key_a == key_b
+
+def test_fingerprint_keeps_prefix_of_user_input(cache):
+    key_a = cache.fingerprint([], "pix: Maria")
+    key_b = cache.fingerprint([], "saldo: Maria")
+    assert key_a != key_b
+
+def test_fingerprint_depends_on_history_window(cache):
+    key_a = cache.fingerprint(["Magie: Quanto você quer transferir?"], "100")
+    key_b = cache.fingerprint(["Magie: Para quem?"], "100")
+    assert key_a != key_b
+
+def test_hit_and_miss_counters(cache):
+    key = cache.fingerprint([], "ajuda")
+    assert cache.get(key) is None
+    cache.put(key, {"intent": "get_help", "entities": {}})
+    assert cache.get(key) == {"intent": "get_help", "entities": {}}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_cached_results_are_copies(cache):
+    cache.put("k", {"intent": "get_balance", "entities": {}})
+    cache.get("k")["entities"]["account_type"] = "corrente"
+    assert cache.get("k")["entities"] == {}
+
+def test_lru_eviction(cache):
+    cache.put("a", {"intent": "get_help"})
+    cache.put("b", {"intent": "get_balance"})
+    cache.get("a")
+    cache.put("c", {"intent": "get_transactions"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiration(cache, clock):
+    cache.put("a", {"intent": "get_help"})
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
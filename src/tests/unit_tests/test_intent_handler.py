@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import Mock, patch
-from app.application.intent_handler import IntentHandler
+from app.application.bank_application_service import BankApplicationService
+from app.application.intent_handler import DEFAULT_TRANSACTIONS_LIMIT, IntentHandler
 from app.domain.intent_service import IntentService
+from app.domain.rule_intent_classifier import RuleIntentClassifier
 
 @pytest.fixture
 def mock_intent_service():
@@ -62,7 +64,7 @@ def test_handle_transaction_unknown(intent_handler):
 
 def test_handle_transfer_confirmation_success(intent_handler):
     """Test successful transfer confirmation."""
-    with patch.object(intent_handler.bank_service, 'transfer', return_value=True):
+    with patch.object(intent_handler.bank_service, 'transfer', return_value=(True, "Transferido")) as mock:
         success, status, message = intent_handler.handle_transfer_confirmation({
             "amount": 100,
             "recipient": "Maria",
@@ -71,10 +73,11 @@ def test_handle_transfer_confirmation_success(intent_handler):
         assert success is True
         assert status == "success"
         assert "sucesso" in message
+        mock.assert_called_once_with("test_user", "corrente", "Maria", 100)
 
 def test_handle_transfer_confirmation_failure(intent_handler):
     """Test failed transfer confirmation."""
-    with patch.object(intent_handler.bank_service, 'transfer', return_value=False):
+    with patch.object(intent_handler.bank_service, 'transfer', return_value=(False, "Saldo insuficiente para realizar a transferência.")):
         success, status, message = intent_handler.handle_transfer_confirmation({
             "amount": 100,
             "recipient": "Maria",
@@ -83,6 +86,41 @@ def test_handle_transfer_confirmation_failure(intent_handler):
         assert success is False
         assert status == "error"
         assert "Não foi possível" in message
+        assert "Saldo insuficiente" in message
+
+def test_handle_transfer_confirmation_debits_the_account(mock_intent_service):
+    """Test that a confirmed transfer actually moves money in the shared bank service."""
+    bank_service = BankApplicationService()
+    handler = IntentHandler(mock_intent_service, "rodrigo.barreiros", bank_service)
+    success, status, _ = handler.handle_transfer_confirmation({
+        "amount": 50,
+        "recipient": "Maria",
+        "account_type": "corrente"
+    })
+    assert (success, status) == (True, "success")
+    assert bank_service.get_balance("rodrigo.barreiros", "corrente")[0] == 1450.0
+    assert IntentHandler(mock_intent_service, "rodrigo.barreiros", bank_service).bank_service is bank_service
+
+def test_handle_transfer_confirmation_with_text_amount(mock_intent_service):
+    """Test that an amount given as text is transferred and reported."""
+    bank_service = BankApplicationService()
+    handler = IntentHandler(mock_intent_service, "rodrigo.barreiros", bank_service)
+    success, status, message = handler.handle_transfer_confirmation({
+        "amount": "150",
+        "recipient": "Maria",
+        "account_type": "corrente"
+    })
+    assert (success, status) == (True, "success")
+    assert "R$150.00" in message
+    assert bank_service.get_balance("rodrigo.barreiros", "corrente")[0] == 1350.0
+
+def test_savings_from_the_rule_tier_reaches_the_savings_account(mock_intent_service):
+    """Test that "poupança" detected by a local tier is answered from the seeded savings account."""
+    handler = IntentHandler(mock_intent_service, "rodrigo.barreiros", BankApplicationService())
+    result = RuleIntentClassifier().classify("Qual o saldo da poupança?")
+    intent, message = handler.handle_transaction(result["intent"], result["entities"])
+    assert intent == "get_balance"
+    assert "R$ 3000.00" in message
 
 def test_handle_transfer_confirmation_missing_info(intent_handler):
     """Test transfer confirmation with missing information."""
@@ -105,4 +143,17 @@ def test_handle_get_transactions_default_account(intent_handler):
     with patch.object(intent_handler.bank_service, 'get_transactions', return_value=(True, "Últimas transações...")):
         intent, message = intent_handler.handle_transaction("get_transactions", {})
         assert intent == "get_transactions"
-        assert "transações" in message 
\ No newline at end of file
+        assert "transações" in message 
+
+def test_handle_get_transactions_passes_limit(intent_handler):
+    """Test that the requested number of transactions reaches the bank service."""
+    with patch.object(intent_handler.bank_service, 'get_transactions', return_value=([], "Suas transações...")) as mock:
+        intent_handler.handle_transaction("get_transactions", {"limit": "5"})
+        mock.assert_called_once_with("test_user", "corrente", limit=5)
+
+def test_handle_get_transactions_default_limit(intent_handler):
+    """Test that a missing or invalid limit falls back to the default."""
+    with patch.object(intent_handler.bank_service, 'get_transactions', return_value=([], "Suas transações...")) as mock:
+        intent_handler.handle_transaction("get_transactions", {"limit": "cinco"})
+        intent_handler.handle_transaction("get_transactions", {})
+        assert [c.kwargs["limit"] for c in mock.call_args_list] == [DEFAULT_TRANSACTIONS_LIMIT] * 2
@@ -1,6 +1,13 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
-from app.domain.intent_service import IntentService
+from unittest.mock import patch, Mock, MagicMock, AsyncMock
+from app.domain.intent_service import INTENT_SCHEMA, IntentService
+from app.domain.intent_cache import IntentCache
+from app.domain.rule_intent_classifier import RuleIntentClassifier
+from app.domain.history_policy import HistoryPolicy
+from app.domain.llm_context_cache import LLMContextCache
+from app.infra.llm_adapter import LLMCompletion
+from app.infra.circuit_breaker import CircuitBreaker
 
 @pytest.fixture
 def intent_service():
@@ -219,4 +226,356 @@ def test_process_message_invalid_intent(intent_service, mock_query_llm, mock_upd
     assert result["entities"] == {}
     assert result["missing_entities"] == []
     assert result["next_question"] == ""
-    mock_update_user_state.assert_called_once() 
\ No newline at end of file
+    mock_update_user_state.assert_called_once() 
+
+def test_process_message_uses_injected_llm_client(mock_query_llm, mock_update_user_state):
+    # Arrange
+    llm_client = MagicMock()
+    llm_client.generate.return_value = '{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}'
+    intent_service = IntentService(llm_client=llm_client)
+
+    # Act
+    result = intent_service.process_message("123", [], "ajuda")
+
+    # Assert
+    assert result["intent"] == "get_help"
+    llm_client.generate.assert_called_once()
+    mock_query_llm.assert_not_called()
+
+def test_aprocess_message_shares_parsing_with_sync_path(mock_update_user_state):
+    # Arrange
+    async_llm_client = MagicMock()
+    async_llm_client.generate = AsyncMock(return_value="""
+    {
+        intent: "transfer",
+        entities: {
+            amount: 100,
+            recipient: "Maria"
+        },
+        missing_entities: [],
+        next_question: ""
+    }
+    """)
+    intent_service = IntentService(async_llm_client=async_llm_client)
+
+    # Act
+    result = asyncio.run(intent_service.aprocess_message("123", [], "Quero transferir 100 reais para Maria"))
+
+    # Assert
+    assert result["intent"] == "transfer"
+    assert result["entities"]["amount"] == 100
+    mock_update_user_state.assert_called_once()
+
+def test_aprocess_message_defaults_to_aquery_llm(mock_update_user_state):
+    with patch('app.domain.intent_service.aquery_llm', new_callable=AsyncMock) as mock_aquery_llm:
+        mock_aquery_llm.return_value = "Invalid JSON response"
+        result = asyncio.run(IntentService().aprocess_message("123", [], "oi"))
+
+    assert result["error"] == "No JSON block found in response."
+    mock_aquery_llm.assert_awaited_once()
+
+def test_process_message_serves_repeated_message_from_cache(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {"missing_entities": []}
+    mock_query_llm.return_value = '{"intent": "get_balance", "entities": {}, "missing_entities": [], "next_question": ""}'
+    cache = IntentCache()
+    intent_service = IntentService(cache=cache)
+
+    # Act
+    first = intent_service.process_message("123", ["Rodrigo: qual meu saldo?"], "qual meu saldo?")
+    second = intent_service.process_message("456", ["Ana: Qual meu saldo"], "Qual meu saldo")
+
+    # Assert
+    assert first == second
+    mock_query_llm.assert_called_once()
+    assert mock_update_user_state.call_count == 2
+    assert cache.stats()["hits"] == 1
+
+def test_process_message_cache_bypass(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {}
+    mock_query_llm.return_value = '{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}'
+    intent_service = IntentService(cache=IntentCache())
+
+    # Act
+    intent_service.process_message("123", [], "ajuda")
+    intent_service.process_message("123", [], "ajuda", use_cache=False)
+
+    # Assert
+    assert mock_query_llm.call_count == 2
+
+def test_process_message_skips_cache_during_follow_up(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {"missing_entities": ["amount"]}
+    mock_query_llm.return_value = '{"intent": "transfer", "entities": {"amount": 100}, "missing_entities": [], "next_question": ""}'
+    cache = IntentCache()
+    intent_service = IntentService(cache=cache)
+
+    # Act
+    intent_service.process_message("123", [], "100 reais")
+    intent_service.process_message("123", [], "100 reais")
+
+    # Assert
+    assert mock_query_llm.call_count == 2
+    assert cache.stats()["size"] == 0
+
+def test_process_message_does_not_cache_errors(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {}
+    mock_query_llm.return_value = "Timeout: Ollama demorou demais para responder."
+    cache = IntentCache()
+    intent_service = IntentService(cache=cache)
+
+    # Act
+    result = intent_service.process_message("123", [], "saldo")
+
+    # Assert
+    assert "error" in result
+    assert cache.stats()["size"] == 0
+
+def test_process_message_fast_path_skips_llm(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {}
+    intent_service = IntentService(classifiers=[RuleIntentClassifier()])
+
+    # Act
+    result = intent_service.process_message("123", [], "Quero ver meu extrato")
+
+    # Assert
+    assert result == {"intent": "get_transactions", "entities": {}, "missing_entities": [], "next_question": ""}
+    mock_query_llm.assert_not_called()
+    mock_update_user_state.assert_called_once()
+
+def test_process_message_fast_path_falls_through_to_llm(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {}
+    mock_query_llm.return_value = '{"intent": "transfer", "entities": {"recipient": "Maria"}, "missing_entities": ["amount"], "next_question": "Quanto?"}'
+    intent_service = IntentService(classifiers=[RuleIntentClassifier()])
+
+    # Act
+    result = intent_service.process_message("123", [], "Quero transferir para Maria")
+
+    # Assert
+    assert result["intent"] == "transfer"
+    mock_query_llm.assert_called_once()
+
+def test_process_message_fast_path_disabled_during_follow_up(mock_query_llm, mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {"missing_entities": ["amount"]}
+    mock_query_llm.return_value = '{"intent": "transfer", "entities": {}, "missing_entities": ["amount"], "next_question": "Quanto?"}'
+    intent_service = IntentService(classifiers=[RuleIntentClassifier()])
+
+    # Act
+    intent_service.process_message("123", [], "ajuda")
+
+    # Assert
+    mock_query_llm.assert_called_once()
+
+def test_process_message_applies_history_policy(mock_query_llm, mock_update_user_state):
+    # Arrange
+    mock_query_llm.return_value = '{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}'
+    history = [f"Rodrigo: mensagem {i}" for i in range(50)]
+    unbounded = IntentService()
+    bounded = IntentService(history_policy=HistoryPolicy(keep_last_turns=4, token_budget=80))
+
+    # Act
+    unbounded.process_message("123", history, "ajuda")
+    bounded.process_message("123", history, "ajuda")
+
+    # Assert
+    prompt = mock_query_llm.call_args.args[0]
+    assert "Rodrigo: mensagem 49" in prompt
+    assert "\nRodrigo: mensagem 45\n" not in prompt
+    assert bounded.get_prompt_stats("123")["history_tokens"] <= 80
+    assert bounded.get_prompt_stats("123")["prompt_tokens"] < unbounded.get_prompt_stats("123")["prompt_tokens"]
+
+def test_process_message_reuses_ollama_context(mock_update_user_state):
+    # Arrange
+    llm_client = MagicMock()
+    llm_client.complete.side_effect = [
+        LLMCompletion(text='{"intent": "transfer", "entities": {"recipient": "Maria"}, "missing_entities": ["amount"], "next_question": "Quanto?"}', context=[1, 2, 3]),
+        LLMCompletion(text='{"intent": "transfer", "entities": {"recipient": "Maria", "amount": 100}, "missing_entities": [], "next_question": ""}', context=[1, 2, 3, 4]),
+    ]
+    context_cache = LLMContextCache()
+    intent_service = IntentService(llm_client=llm_client, context_cache=context_cache)
+    history = ["Rodrigo: Quero transferir para Maria"]
+
+    # Act
+    intent_service.process_message("123", history, "Quero transferir para Maria")
+    full_prompt_chars = intent_service.get_prompt_stats("123")["prompt_chars"]
+    history += ["Magie: Quanto?", "Rodrigo: 100 reais"]
+    result = intent_service.process_message("123", history, "100 reais")
+
+    # Assert
+    first_call, second_call = llm_client.complete.call_args_list
+    assert first_call.kwargs["context"] is None
+    assert "Você é um assistente financeiro" in first_call.args[0]
+    assert second_call.kwargs["context"] == [1, 2, 3]
+    assert "Você é um assistente financeiro" not in second_call.args[0]
+    assert "Quero transferir para Maria" not in second_call.args[0]
+    assert "Magie: Quanto?" in second_call.args[0]
+    assert intent_service.get_prompt_stats("123")["prompt_chars"] < full_prompt_chars
+    assert result["entities"]["amount"] == 100
+
+def test_process_message_falls_back_to_full_prompt_after_failure(mock_update_user_state):
+    # Arrange
+    llm_client = MagicMock()
+    llm_client.complete.side_effect = [
+        LLMCompletion(text='{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}', context=[1, 2]),
+        LLMCompletion(text="Timeout: Ollama demorou demais para responder.", ok=False),
+        LLMCompletion(text='{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}', context=[5]),
+    ]
+    intent_service = IntentService(llm_client=llm_client, context_cache=LLMContextCache())
+
+    # Act
+    intent_service.process_message("123", ["Rodrigo: ajuda"], "ajuda")
+    intent_service.process_message("123", ["Rodrigo: ajuda", "Rodrigo: oi"], "oi")
+    intent_service.process_message("123", ["Rodrigo: ajuda", "Rodrigo: oi", "Rodrigo: oi"], "oi")
+
+    # Assert
+    contexts = [call.kwargs["context"] for call in llm_client.complete.call_args_list]
+    assert contexts == [None, [1, 2], None]
+
+def test_context_reuse_requires_complete():
+    with pytest.raises(ValueError):
+        IntentService(llm_client=Mock(spec=["generate"]), context_cache=LLMContextCache())
+
+def test_structured_output_sends_schema_and_parses_strictly(mock_update_user_state):
+    # Arrange
+    llm_client = MagicMock()
+    llm_client.complete.return_value = LLMCompletion(
+        text='{"intent": "transfer", "entities": {"recipient": "Maria"}, "missing_entities": ["amount"], "next_question": "Exemplo: 100 reais?"}'
+    )
+    intent_service = IntentService(llm_client=llm_client, structured_output=True)
+
+    # Act
+    result = intent_service.process_message("123", [], "Transferir para Maria")
+
+    # Assert
+    assert llm_client.complete.call_args.kwargs["format"] == INTENT_SCHEMA
+    assert llm_client.complete.call_args.kwargs["context"] is None
+    assert result["next_question"] == "Exemplo: 100 reais?"
+    assert intent_service.get_parse_stats() == {"strict": 1, "fallback": 0, "tolerant": 0, "failed": 0}
+
+def test_structured_output_falls_back_when_backend_ignores_schema(mock_update_user_state):
+    # Arrange
+    llm_client = MagicMock()
+    llm_client.complete.side_effect = [
+        LLMCompletion(text='Claro! {intent: "get_balance", entities: {},}'),
+        LLMCompletion(text="Não sei."),
+    ]
+    intent_service = IntentService(llm_client=llm_client, structured_output=True)
+
+    # Act
+    first = intent_service.process_message("123", [], "saldo")
+    second = intent_service.process_message("123", [], "saldo")
+
+    # Assert
+    assert first["intent"] == "get_balance"
+    assert second == {"error": "No JSON block found in response."}
+    assert intent_service.get_parse_stats() == {"strict": 0, "fallback": 1, "tolerant": 0, "failed": 1}
+
+def test_aprocess_message_with_structured_output(mock_update_user_state):
+    async_client = MagicMock()
+    async_client.complete = AsyncMock(return_value=LLMCompletion(
+        text='{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}'
+    ))
+    intent_service = IntentService(async_llm_client=async_client, structured_output=True)
+
+    result = asyncio.run(intent_service.aprocess_message("123", [], "ajuda"))
+
+    assert result["intent"] == "get_help"
+    assert async_client.complete.call_args.kwargs["format"] == INTENT_SCHEMA
+    assert intent_service.get_parse_stats()["strict"] == 1
+
+def test_unstructured_replies_count_as_tolerant(intent_service, mock_query_llm, mock_update_user_state):
+    mock_query_llm.return_value = '{"intent": "get_help"}'
+    intent_service.process_message("123", [], "ajuda")
+    assert intent_service.get_parse_stats()["tolerant"] == 1
+
+def test_structured_output_requires_complete():
+    with pytest.raises(ValueError):
+        IntentService(llm_client=Mock(spec=["generate"]), structured_output=True)
+
+def test_open_circuit_answers_from_fallback_classifier(mock_update_user_state, mock_get_user_state):
+    # Arrange
+    mock_get_user_state.return_value = {}
+    llm_client = MagicMock()
+    llm_client.complete.return_value = LLMCompletion(text="Timeout: Ollama demorou demais para responder.", ok=False)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    intent_service = IntentService(
+        llm_client=llm_client,
+        circuit_breaker=breaker,
+        fallback_classifier=RuleIntentClassifier(threshold=0.5)
+    )
+
+    # Act
+    for _ in range(2):
+        assert "error" in intent_service.process_message("123", [], "qual é o meu saldo?")
+    result = intent_service.process_message("123", [], "qual é o meu saldo?")
+    undecided = intent_service.process_message("123", [], "transferir 50 para Ana")
+
+    # Assert
+    assert llm_client.complete.call_count == 2
+    assert breaker.state == "open"
+    assert result["intent"] == "get_balance"
+    assert undecided == {"error": "LLM unavailable, please try again shortly."}
+
+def test_open_circuit_keeps_pending_flow_untouched(mock_update_user_state, mock_get_user_state):
+    mock_get_user_state.return_value = {"missing_entities": ["amount"]}
+    breaker = MagicMock()
+    breaker.allow_request.return_value = False
+    classifier = MagicMock()
+    intent_service = IntentService(llm_client=MagicMock(), circuit_breaker=breaker, fallback_classifier=classifier)
+
+    result = intent_service.process_message("123", [], "saldo")
+
+    assert "error" in result
+    classifier.classify.assert_not_called()
+    mock_update_user_state.assert_not_called()
+
+def test_aprocess_message_records_outcome_on_breaker(mock_update_user_state):
+    async_client = MagicMock()
+    async_client.complete = AsyncMock(return_value=LLMCompletion(
+        text='{"intent": "get_help", "entities": {}, "missing_entities": [], "next_question": ""}'
+    ))
+    breaker = MagicMock()
+    breaker.allow_request.return_value = True
+    intent_service = IntentService(async_llm_client=async_client, circuit_breaker=breaker)
+
+    result = asyncio.run(intent_service.aprocess_message("123", [], "ajuda"))
+
+    assert result["intent"] == "get_help"
+    breaker.record.assert_called_once_with(True)
+
+def test_cancelled_probe_gives_back_its_slot(mock_update_user_state):
+    clock = Mock(return_value=0.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.allow_request()
+    breaker.record(False)
+    clock.return_value = 10.0
+
+    async def hang(prompt, **options):
+        await asyncio.sleep(10)
+
+    async_client = MagicMock()
+    async_client.complete = hang
+    intent_service = IntentService(async_llm_client=async_client, circuit_breaker=breaker)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(intent_service.aprocess_message("123", [], "ajuda"), 0.05))
+
+    assert breaker.state == "half_open"
+    assert breaker.allow_request() is True
+
+def test_forget_drops_everything_kept_for_the_user():
+    context_cache = LLMContextCache()
+    history_policy = HistoryPolicy()
+    intent_service = IntentService(context_cache=context_cache, history_policy=history_policy)
+    context_cache.store("123", "prefix", 2, [1, 2, 3])
+    with patch('app.domain.intent_service.clear_user_state') as clear, \
+         patch.object(history_policy, 'forget') as forget:
+        intent_service.forget("123")
+    clear.assert_called_once_with("123")
+    forget.assert_called_once_with("123")
+    assert context_cache.stats()["sessions"] == 0
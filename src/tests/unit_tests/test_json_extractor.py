@@ -0,0 +1,63 @@
+import json
+import pytest
+from app.infra.json_extractor import JsonExtractor, JsonNotFoundError, extract_json, repair_json
+
+
+def test_extracts_object_surrounded_by_text():
+    response = 'Claro! Aqui está:\n{"intent": "get_balance", "entities": {}} Espero ter ajudado {:}'
+    assert extract_json(response) == {"intent": "get_balance", "entities": {}}
+
+def test_keeps_colons_inside_values():
+    response = '{"intent": "transfer", "next_question": "Qual valor? Ex: 100 reais"}'
+    assert extract_json(response)["next_question"] == "Qual valor? Ex: 100 reais"
+
+def test_repairs_unquoted_keys_and_trailing_commas():
+    response = '{intent: "transfer", entities: {amount: 100, recipient: "Ana: filha",}, missing_entities: [],}'
+    assert extract_json(response) == {
+        "intent": "transfer",
+        "entities": {"amount": 100, "recipient": "Ana: filha"},
+        "missing_entities": []
+    }
+
+def test_repair_leaves_valid_json_untouched():
+    text = '{"a": [1, 2], "b": "x, }"}'
+    assert repair_json(text) == text
+
+def test_repair_quotes_single_quoted_keys():
+    assert json.loads(repair_json("{'intent': \"get_help\"}")) == {"intent": "get_help"}
+
+def test_no_object_raises_not_found():
+    with pytest.raises(JsonNotFoundError):
+        extract_json("Não entendi.")
+
+def test_truncated_object_raises_decode_error():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json('{"intent": "transfer", "entities": {')
+
+def test_non_object_raises_decode_error():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json('{[1, 2]}')
+
+def test_feed_ignores_braces_inside_strings():
+    extractor = JsonExtractor()
+    assert extractor.feed('ok {"a": "}{", ') == -1
+    assert extractor.feed('"b": {"c": 1}') == -1
+    assert extractor.feed('} depois') == 1
+    assert extractor.result() == {"a": "}{", "b": {"c": 1}}
+
+def test_feed_handles_escapes_split_across_chunks():
+    extractor = JsonExtractor()
+    for chunk in ['{"a": "aspas \\', '" e }', '", "b": 1}']:
+        end = extractor.feed(chunk)
+    assert end == len('", "b": 1}')
+    assert extractor.result() == {"a": 'aspas " e }', "b": 1}
+
+def test_feed_matches_whole_text_for_any_chunking():
+    response = 'Resposta: {intent: "transfer", entities: {"recipient": "Jo\\"ão {x}"},} fim'
+    expected = extract_json(response)
+    for size in range(1, 8):
+        extractor = JsonExtractor()
+        for i in range(0, len(response), size):
+            if extractor.feed(response[i:i + size]) >= 0:
+                break
+        assert extractor.result() == expected
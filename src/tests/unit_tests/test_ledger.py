@@ -0,0 +1,163 @@
+import random
+import threading
+import pytest
+from app.application.bank_application_service import BankApplicationService, transaction_journal
+from app.domain.ledger import Ledger, to_cents
+
+def _run(workers):
+    threads = [threading.Thread(target=worker) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_to_cents_rounds_half_up():
+    assert to_cents(10) == 1000
+    assert to_cents(0.1) == 10
+    assert to_cents("2.005") == 201
+
+def test_transfer_moves_money_between_accounts():
+    ledger = Ledger()
+    ledger.open_account("a", 100)
+    ledger.open_account("b", 0)
+    assert ledger.transfer("a", 30.5, destination="b", entry="pix") is True
+    assert ledger.balance("a") == 69.5
+    assert ledger.balance("b") == 30.5
+    assert ledger.entries("a") == ["pix"]
+
+def test_insufficient_funds_changes_nothing():
+    ledger = Ledger()
+    ledger.open_account("a", 10)
+    ledger.open_account("b", 0)
+    assert ledger.transfer("a", 10.01, destination="b", entry="x") is False
+    assert ledger.balance("a") == 10
+    assert ledger.entries("a") == []
+
+@pytest.mark.parametrize("source, amount, destination, error", [
+    ("a", 0, None, ValueError),
+    ("a", -5, None, ValueError),
+    ("a", 5, "a", ValueError),
+    ("a", 5, "nobody", KeyError),
+    ("nobody", 5, None, KeyError),
+])
+def test_invalid_transfers_raise(source, amount, destination, error):
+    ledger = Ledger()
+    ledger.open_account("a", 10)
+    with pytest.raises(error):
+        ledger.transfer(source, amount, destination=destination)
+
+def test_concurrent_transfers_conserve_money_and_never_overdraw():
+    ledger = Ledger()
+    accounts = [f"acc-{i}" for i in range(20)]
+    for account in accounts:
+        ledger.open_account(account, 100)
+    initial_total = ledger.total()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(500):
+            source, destination = rng.sample(accounts, 2)
+            ledger.transfer(source, rng.choice([0.01, 1.5, 10, 33.33, 75]), destination=destination)
+
+    _run([lambda seed=seed: worker(seed) for seed in range(16)])
+
+    assert ledger.total() == initial_total
+    assert all(ledger.balance(account) >= 0 for account in accounts)
+
+def test_opposite_transfers_do_not_deadlock():
+    ledger = Ledger()
+    ledger.open_account("a", 1000)
+    ledger.open_account("b", 1000)
+
+    def forth():
+        for _ in range(2000):
+            ledger.transfer("a", 1, destination="b")
+
+    def back():
+        for _ in range(2000):
+            ledger.transfer("b", 1, destination="a")
+
+    _run([forth, back, forth, back])
+    assert ledger.total() == 2000
+
+def test_concurrent_payments_cannot_overdraw_one_account():
+    service = BankApplicationService()
+    successes = []
+
+    def pay():
+        success, _ = service.transfer("rodrigo.barreiros", "corrente", "Maria", 100.0)
+        successes.append(success)
+
+    _run([pay for _ in range(50)])
+
+    assert successes.count(True) == 15
+    assert service.get_balance("rodrigo.barreiros", "corrente")[0] == 0.0
+    transactions, _ = service.get_transactions("rodrigo.barreiros", "corrente")
+    assert len(transactions) == 15
+
+def test_on_commit_runs_only_for_applied_transfers():
+    ledger = Ledger()
+    ledger.open_account("a", 10)
+    committed = []
+    assert ledger.transfer("a", 4, on_commit=lambda: committed.append("applied"))
+    assert not ledger.transfer("a", 40, on_commit=lambda: committed.append("rejected"))
+    assert committed == ["applied"]
+
+def test_failed_on_commit_undoes_the_transfer():
+    ledger = Ledger()
+    ledger.open_account("a", 10)
+    ledger.open_account("b", 0)
+
+    def fail():
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        ledger.transfer("a", 4, "b", entry="tx", on_commit=fail)
+    assert ledger.balance("a") == 10
+    assert ledger.balance("b") == 0
+    assert ledger.entries("a") == []
+
+def test_revert_undoes_an_applied_transfer():
+    ledger = Ledger()
+    ledger.open_account("a", 10)
+    ledger.open_account("b", 0)
+    reverted = []
+    assert ledger.transfer("a", 4, "b", entry="tx")
+    ledger.revert("a", 4, "b", pop_entry=True, on_revert=lambda: reverted.append("tx"))
+    assert (ledger.balance("a"), ledger.balance("b")) == (10, 0)
+    assert ledger.entries("a") == []
+    assert reverted == ["tx"]
+
+def test_inspect_reads_balance_and_journal_together():
+    ledger = Ledger()
+    ledger.open_account("a", 10)
+    ledger.transfer("a", 4, entry="x")
+    assert ledger.inspect("a", lambda balance, journal: (balance, list(journal))) == (6.0, ["x"])
+
+def test_aggregates_stay_consistent_under_concurrent_transfers():
+    service = BankApplicationService()
+
+    def pay():
+        for _ in range(20):
+            service.transfer("rodrigo.barreiros", "corrente", random.choice(["Ana", "Bia"]), 1.0)
+
+    _run([pay for _ in range(8)])
+    assert service.check_aggregates("rodrigo.barreiros", "corrente")[0] is True
+    summary, _ = service.get_summary("rodrigo.barreiros", "corrente")
+    assert summary["count"] == 160
+    assert summary["balance"] == service.get_balance("rodrigo.barreiros", "corrente")[0]
+
+def test_services_can_share_a_ledger():
+    ledger = Ledger(journal_factory=transaction_journal)
+    first, second = BankApplicationService(ledger), BankApplicationService(ledger)
+    first.transfer("rodrigo.barreiros", "corrente", "Maria", 500.0)
+    assert second.get_balance("rodrigo.barreiros", "corrente")[0] == 1000.0
+    assert [t.to for t in second.get_transactions("rodrigo.barreiros", "corrente")[0]] == ["Maria"]
+
+def test_journal_factory_builds_one_journal_per_account():
+    ledger = Ledger(journal_factory=list)
+    ledger.open_account("a", 10)
+    ledger.open_account("b", 10)
+    ledger.transfer("a", 1, entry="x")
+    assert ledger.journal("a") == ["x"]
+    assert ledger.journal("b") == []
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+import pytest
+from app.infra.ledger_journal import JournalError, LedgerJournal, OpenAccountEvent, TransferEvent, decode_events, encode_event
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = LedgerJournal(str(tmp_path))
+    yield journal
+    journal.close()
+
+def test_encode_decode_round_trip():
+    events = [
+        OpenAccountEvent("rodrigo", "corrente", 150000),
+        TransferEvent("rodrigo", "corrente", "João", 1050, 1700000000.25)
+    ]
+    buffer = b"".join(encode_event(event) for event in events)
+    decoded = [event for event, _ in decode_events(buffer)]
+    assert decoded == events
+
+def test_decode_stops_at_corrupt_record():
+    good = encode_event(OpenAccountEvent("a", "b", 1))
+    bad = bytearray(encode_event(OpenAccountEvent("c", "d", 2)))
+    bad[-1] ^= 0xFF
+    assert [event.user_id for event, _ in decode_events(good + bytes(bad) + good)] == ["a"]
+
+def test_replay_returns_committed_events_in_order(journal):
+    events = [TransferEvent("u", "corrente", f"r{index}", index, float(index)) for index in range(5)]
+    for event in events:
+        journal.append(event)
+    journal.commit()
+    assert list(journal.replay()) == events
+
+def test_uncommitted_events_are_not_on_disk(journal):
+    journal.append(OpenAccountEvent("u", "corrente", 1))
+    assert list(journal.replay()) == []
+
+def test_torn_tail_is_dropped_on_open(tmp_path):
+    journal = LedgerJournal(str(tmp_path))
+    journal.append(OpenAccountEvent("u", "corrente", 1))
+    journal.close()
+    path = os.path.join(str(tmp_path), "000001.journal")
+    with open(path, "ab") as file:
+        file.write(encode_event(OpenAccountEvent("v", "corrente", 2))[:-3])
+
+    reopened = LedgerJournal(str(tmp_path))
+    reopened.append(OpenAccountEvent("w", "corrente", 3))
+    reopened.close()
+    assert [event.user_id for event in reopened.replay()] == ["u", "w"]
+
+def test_concurrent_commits_share_fsyncs(journal):
+    real_fsync = os.fsync
+
+    def slow_fsync(descriptor):
+        time.sleep(0.005)
+        real_fsync(descriptor)
+
+    def writer(name):
+        for index in range(20):
+            journal.commit(journal.append(TransferEvent(name, "corrente", "x", 1, float(index))))
+
+    with patch("app.infra.ledger_journal.os.fsync", side_effect=slow_fsync):
+        threads = [threading.Thread(target=writer, args=(f"w{n}",)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(list(journal.replay())) == 160
+    assert journal.stats()["fsyncs"] < 160
+
+def test_snapshot_replaces_older_segments(journal):
+    journal.commit(journal.append(OpenAccountEvent("u", "corrente", 1)))
+    segment = journal.rotate()
+    journal.commit(journal.append(OpenAccountEvent("v", "corrente", 2)))
+    journal.write_snapshot(segment, [{"user_id": "u", "columns": [b"\x01\x02", b""]}])
+
+    assert journal.segments() == [segment]
+    loaded_segment, accounts = journal.load_snapshot()
+    assert loaded_segment == segment
+    assert accounts == [{"user_id": "u", "columns": [b"\x01\x02", b""]}]
+    assert [event.user_id for event in journal.replay(loaded_segment)] == ["v"]
+
+def test_load_snapshot_without_one(journal):
+    assert journal.load_snapshot() is None
+
+def test_failed_fsync_stops_the_journal(journal):
+    journal.append(OpenAccountEvent("u", "corrente", 1))
+    with patch("app.infra.ledger_journal.os.fsync", side_effect=OSError("disk full")):
+        with pytest.raises(JournalError):
+            journal.commit()
+    with pytest.raises(JournalError):
+        journal.commit()
+    with pytest.raises(JournalError):
+        journal.append(OpenAccountEvent("v", "corrente", 2))
+
+def test_records_of_a_failed_commit_are_not_replayed(tmp_path):
+    journal = LedgerJournal(str(tmp_path))
+    journal.commit(journal.append(OpenAccountEvent("u", "corrente", 1)))
+    journal.append(OpenAccountEvent("v", "corrente", 2))
+    with patch("app.infra.ledger_journal.os.fsync", side_effect=[OSError("disk full"), None]):
+        with pytest.raises(JournalError):
+            journal.commit()
+    journal.close()
+
+    reopened = LedgerJournal(str(tmp_path))
+    assert [event.user_id for event in reopened.replay()] == ["u"]
+    reopened.close()
+
+def test_append_after_close_raises(journal):
+    journal.close()
+    with pytest.raises(JournalError):
+        journal.append(OpenAccountEvent("u", "corrente", 1))
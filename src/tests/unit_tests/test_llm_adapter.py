@@ -0,0 +1,131 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from app.infra.llm_adapter import OllamaClient, StreamCollector, build_payload
+
+STREAM_FRAGMENTS = ['Claro! ', '{"intent": ', '"get_help", "next_question": "{ok}"', ', "entities": {}', '}', ' Espero ter ajudado', '!']
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        if body["stream"]:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, fragment in enumerate(STREAM_FRAGMENTS):
+                line = json.dumps({"response": fragment, "done": i == len(STREAM_FRAGMENTS) - 1}).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        payload = json.dumps({"response": f"eco: {body['prompt']}", "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def ollama_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    server.shutdown()
+    server.server_close()
+
+def test_build_payload():
+    payload = build_payload("olá", model="llama3.2")
+    assert payload["prompt"] == "olá"
+    assert payload["stream"] is False
+    assert payload["options"]["temperature"] == 0
+    assert "format" not in payload
+
+def test_build_payload_with_schema():
+    schema = {"type": "object"}
+    assert build_payload("olá", format=schema)["format"] == schema
+
+def test_generate_returns_response_text(ollama_server):
+    client = OllamaClient(url=ollama_server)
+    assert client.generate("saldo") == "eco: saldo"
+    client.close()
+
+def test_connections_are_reused(ollama_server):
+    client = OllamaClient(url=ollama_server, pool_size=2)
+    for i in range(5):
+        client.generate(f"mensagem {i}")
+
+    stats = client.stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+    assert stats["reuse_ratio"] == pytest.approx(0.8)
+    client.close()
+
+def test_separate_connect_and_read_timeouts():
+    client = OllamaClient(url="http://ollama:11434/api/generate", connect_timeout=1.5, read_timeout=30)
+    with patch.object(client._session, "post") as mock_post:
+        mock_post.return_value.json.return_value = {"response": "{}"}
+        client.generate("oi")
+    assert mock_post.call_args.kwargs["timeout"] == (1.5, 30)
+
+def test_timeout_returns_message():
+    client = OllamaClient()
+    with patch.object(client._session, "post", side_effect=requests.exceptions.ReadTimeout()):
+        assert client.generate("oi").startswith("Timeout")
+    assert client.stats()["timeouts"] == 1
+
+def test_connection_error_returns_message():
+    client = OllamaClient()
+    with patch.object(client._session, "post", side_effect=requests.exceptions.ConnectionError("recusada")):
+        assert client.generate("oi").startswith("Erro ao conectar com Ollama")
+    assert client.stats()["errors"] == 1
+
+def test_stream_collector_stops_when_object_closes():
+    collector = StreamCollector()
+    assert collector.feed_line(b'{"response": "{\\"intent\\": 1", "done": false}') is False
+    assert collector.feed_line(b'{"response": "} e mais", "done": false}') is True
+    assert collector.early_stop is True
+    assert collector.text == '{"intent": 1}'
+
+def test_stream_collector_reports_stream_error():
+    collector = StreamCollector()
+    assert collector.feed_line(b'{"error": "model not found"}') is True
+    assert "model not found" in collector.text
+
+def test_streaming_generate_cancels_after_json_object(ollama_server):
+    client = OllamaClient(url=ollama_server, stream=True)
+    response = client.generate("ajuda")
+
+    assert response == 'Claro! {"intent": "get_help", "next_question": "{ok}", "entities": {}}'
+    assert json.loads(response[response.find("{"):])["intent"] == "get_help"
+    assert client.stats()["early_stops"] == 1
+    client.close()
+
+def test_complete_sends_and_returns_context():
+    client = OllamaClient()
+    with patch.object(client._session, "post") as mock_post:
+        mock_post.return_value.json.return_value = {"response": "{}", "context": [7, 8, 9]}
+        completion = client.complete("oi", context=[1, 2])
+    assert mock_post.call_args.kwargs["json"]["context"] == [1, 2]
+    assert completion.context == [7, 8, 9]
+    assert completion.ok is True
+
+def test_complete_marks_failures():
+    client = OllamaClient()
+    with patch.object(client._session, "post", side_effect=requests.exceptions.ReadTimeout()):
+        completion = client.complete("oi")
+    assert completion.ok is False
+    assert completion.context is None
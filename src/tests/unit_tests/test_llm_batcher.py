@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.infra.llm_batcher import LLMBatcher
+
+class FakeClient:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if prompt == "boom":
+            raise RuntimeError("falhou")
+        return f"eco: {prompt}"
+
+def test_concurrent_requests_are_batched_and_fanned_out():
+    client = FakeClient()
+    batcher = LLMBatcher(client, max_batch_size=4, max_wait_ms=200, num_parallel=4)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(batcher.generate, [f"m{i}" for i in range(8)]))
+    batcher.close()
+
+    assert responses == [f"eco: m{i}" for i in range(8)]
+    stats = batcher.stats()
+    assert stats["requests"] == 8
+    assert stats["batches"] == 2
+    assert stats["mean_fill_ratio"] == pytest.approx(1.0)
+    assert client.max_active <= 4
+
+def test_slow_request_does_not_hold_back_later_batches():
+    class SlowFirstClient(FakeClient):
+        def generate(self, prompt):
+            if prompt == "lento":
+                time.sleep(0.5)
+            return f"eco: {prompt}"
+
+    batcher = LLMBatcher(SlowFirstClient(), max_batch_size=2, max_wait_ms=5, num_parallel=2)
+    slow = batcher.submit("lento")
+    time.sleep(0.05)
+    started = time.perf_counter()
+    assert batcher.generate("rápido") == "eco: rápido"
+    assert time.perf_counter() - started < 0.25
+    assert not slow.done()
+    batcher.close()
+    assert slow.result() == "eco: lento"
+    assert batcher.stats()["batches"] == 2
+
+def test_lonely_request_waits_for_window_only():
+    batcher = LLMBatcher(FakeClient(delay=0), max_batch_size=8, max_wait_ms=20, num_parallel=2)
+    assert batcher.generate("saldo") == "eco: saldo"
+    batcher.close()
+
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["mean_fill_ratio"] == pytest.approx(1 / 8)
+    assert 15 <= stats["max_queue_delay_ms"] < 1000
+
+def test_client_errors_reach_the_caller():
+    batcher = LLMBatcher(FakeClient(delay=0), max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.generate("boom")
+    assert batcher.generate("ok") == "eco: ok"
+    batcher.close()
+
+def test_close_answers_queued_requests():
+    batcher = LLMBatcher(FakeClient(), max_batch_size=2, max_wait_ms=50, num_parallel=1)
+    futures = [batcher.submit(f"m{i}") for i in range(5)]
+    batcher.close()
+    assert [future.result(timeout=1) for future in futures] == [f"eco: m{i}" for i in range(5)]
+
+def test_submit_after_close_raises():
+    batcher = LLMBatcher(FakeClient(delay=0), max_wait_ms=1)
+    assert batcher.generate("ok") == "eco: ok"
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.generate("depois")
@@ -0,0 +1,41 @@
+import pytest
+from app.domain.llm_context_cache import LLMContextCache
+
+@pytest.fixture
+def cache():
+    return LLMContextCache(max_sessions=2, max_context_tokens=5)
+
+def test_lookup_returns_stored_context(cache):
+    cache.store("u1", "prefix", 2, [1, 2, 3])
+    entry = cache.lookup("u1", "prefix", 4)
+    assert entry.tokens == [1, 2, 3]
+    assert entry.history_length == 2
+    assert cache.stats()["hits"] == 1
+
+def test_missing_context_is_a_miss(cache):
+    assert cache.lookup("u1", "prefix", 1) is None
+    assert cache.stats()["misses"] == 1
+
+@pytest.mark.parametrize("prefix_key, history_length", [("other", 4), ("prefix", 1)])
+def test_stale_context_is_invalidated(cache, prefix_key, history_length):
+    cache.store("u1", "prefix", 2, [1, 2, 3])
+    assert cache.lookup("u1", prefix_key, history_length) is None
+    assert cache.lookup("u1", "prefix", 4) is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_oversized_context_is_invalidated(cache):
+    cache.store("u1", "prefix", 2, list(range(10)))
+    assert cache.lookup("u1", "prefix", 3) is None
+
+def test_storing_no_tokens_invalidates(cache):
+    cache.store("u1", "prefix", 2, [1])
+    cache.store("u1", "prefix", 3, None)
+    assert cache.lookup("u1", "prefix", 3) is None
+
+def test_least_recent_session_is_evicted(cache):
+    cache.store("u1", "prefix", 1, [1])
+    cache.store("u2", "prefix", 1, [2])
+    cache.lookup("u1", "prefix", 1)
+    cache.store("u3", "prefix", 1, [3])
+    assert cache.stats()["sessions"] == 2
+    assert cache.lookup("u2", "prefix", 1) is None
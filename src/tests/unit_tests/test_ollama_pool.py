@@ -0,0 +1,141 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from app.infra.llm_adapter import LLMCompletion
+from app.infra.ollama_pool import OllamaPool, endpoints_from_env
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _client(text="ok", ok=True):
+    client = MagicMock()
+    client.complete.return_value = LLMCompletion(text=text, ok=ok)
+    return client
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def _pool(clients, **kwargs):
+    return OllamaPool(list(clients), client_factory=clients.__getitem__, **kwargs)
+
+def test_endpoints_from_env(monkeypatch):
+    monkeypatch.setenv("OLLAMA_URLS", "http://a:11434/api/generate, http://b:11434/api/generate")
+    assert endpoints_from_env() == ["http://a:11434/api/generate", "http://b:11434/api/generate"]
+    monkeypatch.delenv("OLLAMA_URLS")
+    assert len(endpoints_from_env()) == 1
+
+def test_routes_to_endpoint_with_fewest_in_flight():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_complete(prompt, **options):
+        started.set()
+        release.wait(5)
+        return LLMCompletion(text="busy")
+
+    busy, idle = MagicMock(), _client("idle")
+    busy.complete.side_effect = slow_complete
+    pool = _pool({"a": busy, "b": idle})
+
+    worker = threading.Thread(target=pool.generate, args=("primeiro",))
+    worker.start()
+    started.wait(5)
+    try:
+        assert pool.stats()["a"]["in_flight"] == 1
+        assert pool.generate("segundo") == "idle"
+    finally:
+        release.set()
+        worker.join()
+
+def test_breaks_ties_by_ewma_latency():
+    fast, slow = _client("fast"), _client("slow")
+    pool = _pool({"slow": slow, "fast": fast})
+    pool._endpoints[0].ewma_latency = 0.5
+    pool._endpoints[1].ewma_latency = 0.1
+    assert pool.generate("oi") == "fast"
+
+def test_passes_options_to_complete():
+    client = _client()
+    pool = _pool({"a": client})
+    pool.complete("oi", context=[1], format={"type": "object"})
+    client.complete.assert_called_once_with("oi", context=[1], format={"type": "object"})
+
+def test_unhealthy_endpoint_leaves_rotation_until_cooldown(clock):
+    broken, healthy = _client("Timeout", ok=False), _client("ok")
+    pool = _pool({"broken": broken, "healthy": healthy}, failure_threshold=2, cooldown_seconds=5, clock=clock)
+    pool._endpoints[1].ewma_latency = 1.0  # keep the broken one first in line
+
+    pool.generate("1")
+    pool.generate("2")
+    assert pool.stats()["broken"]["healthy"] is False
+    healthy.complete.reset_mock()
+    for _ in range(3):
+        pool.generate("x")
+    assert broken.complete.call_count == 2
+    assert healthy.complete.call_count == 3
+
+    # After the cooldown a single successful trial brings it back
+    clock.now = 6
+    broken.complete.return_value = LLMCompletion(text="ok")
+    pool.generate("trial")
+    assert broken.complete.call_count == 3
+    assert pool.stats()["broken"]["healthy"] is True
+
+def test_uses_soonest_recovering_endpoint_when_all_are_down(clock):
+    a, b = _client("a", ok=False), _client("b", ok=False)
+    pool = _pool({"a": a, "b": b}, failure_threshold=1, cooldown_seconds=5, clock=clock)
+    pool.generate("1")
+    clock.now = 1
+    pool.generate("2")
+    assert pool.generate("3") == "a"
+
+def test_exceptions_count_as_errors():
+    client = MagicMock()
+    client.complete.side_effect = RuntimeError("boom")
+    pool = _pool({"a": client})
+    with pytest.raises(RuntimeError):
+        pool.generate("oi")
+    stats = pool.stats()["a"]
+    assert stats["errors"] == 1 and stats["in_flight"] == 0
+
+def test_stats_track_latency_and_errors():
+    pool = _pool({"a": _client()})
+    pool.generate("oi")
+    stats = pool.stats()["a"]
+    assert stats["requests"] == 1
+    assert stats["error_rate"] == 0.0
+    assert stats["ewma_latency_ms"] > 0
+
+def test_fallback_request_does_not_end_running_trial(clock):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def complete(prompt, **options):
+        calls.append(prompt)
+        if prompt == "trial":
+            started.set()
+            release.wait(5)
+        return LLMCompletion(text="Timeout", ok=False)
+
+    client = MagicMock()
+    client.complete.side_effect = complete
+    pool = _pool({"a": client}, failure_threshold=1, cooldown_seconds=5, clock=clock)
+    pool.generate("1")
+    clock.now = 6
+
+    worker = threading.Thread(target=pool.generate, args=("trial",))
+    worker.start()
+    started.wait(5)
+    try:
+        assert pool._endpoints[0].probing
+        pool.generate("fallback")
+        assert pool._endpoints[0].probing
+    finally:
+        release.set()
+        worker.join()
+    assert not pool._endpoints[0].probing
+    assert calls == ["1", "trial", "fallback"]
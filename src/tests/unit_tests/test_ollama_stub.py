@@ -0,0 +1,128 @@
+import asyncio
+import random
+import time
+import pytest
+import requests
+from app.domain.intent_service import IntentService
+from app.infra.async_llm_adapter import AsyncOllamaClient
+from app.infra.llm_adapter import OllamaClient
+from app.infra.ollama_stub import FaultConfig, LatencyModel, OllamaStub, ScriptedResponder, malform
+
+PROMPT = "Mensagem atual do usuário:\n{}\n\n"
+
+@pytest.fixture
+def serve():
+    stubs = []
+
+    def start(**options):
+        stub = OllamaStub(seed=7, **options)
+        stubs.append(stub)
+        return stub, stub.start_background()
+
+    yield start
+    for stub in stubs:
+        stub.stop_background()
+
+def test_latency_spec_parsing():
+    assert repr(LatencyModel.parse("uniform:20,80")) == "uniform:20,80"
+    assert LatencyModel.parse("50").sample(random.Random(0)) == 0.05
+    with pytest.raises(ValueError):
+        LatencyModel.parse("uniform:20")
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gamma:1,2")
+
+@pytest.mark.parametrize("spec", ["uniform:20,80", "normal:50,100", "lognormal:50,1", "exponential:50"])
+def test_latency_samples_are_non_negative(spec):
+    rng = random.Random(0)
+    model = LatencyModel.parse(spec)
+    assert all(model.sample(rng) >= 0 for _ in range(200))
+
+def test_fault_rates():
+    rng = random.Random(0)
+    assert {FaultConfig().draw(rng) for _ in range(100)} == {None}
+    assert {FaultConfig(malformed_rate=1.0).draw(rng) for _ in range(100)} == {"malformed"}
+    drawn = [FaultConfig(error_rate=0.5, timeout_rate=0.5).draw(rng) for _ in range(200)]
+    assert set(drawn) == {"error", "timeout"}
+
+def test_scripted_rules_win_over_keyword_rules():
+    responder = ScriptedResponder([("saldo", '{"intent": "scripted"}')])
+    assert responder(PROMPT.format("qual meu saldo?")) == '{"intent": "scripted"}'
+    assert '"get_transactions"' in responder(PROMPT.format("meu extrato"))
+
+def test_malformed_replies_are_not_the_original():
+    rng = random.Random(0)
+    text = '{"intent": "get_balance", "entities": {}}'
+    assert all(malform(text, rng) != text for _ in range(20))
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_sync_client_round_trip(serve, stream):
+    stub, url = serve()
+    client = OllamaClient(url=url)
+    completion = client.complete(PROMPT.format("quero transferir 50 para Maria"), stream=stream)
+    assert completion.ok
+    assert '"recipient": "Maria"' in completion.text
+    assert stub.stats()["requests"] == 1
+    client.close()
+
+def test_async_client_round_trip(serve):
+    _, url = serve()
+
+    async def run():
+        client = AsyncOllamaClient(url=url)
+        try:
+            return await asyncio.gather(
+                client.complete(PROMPT.format("qual meu saldo"), stream=True),
+                client.complete(PROMPT.format("qual meu saldo"), stream=False)
+            )
+        finally:
+            await client.close()
+
+    streamed, whole = asyncio.run(run())
+    assert streamed.text == whole.text
+    assert '"get_balance"' in whole.text
+
+def test_context_is_extended(serve):
+    _, url = serve()
+    completion = OllamaClient(url=url).complete(PROMPT.format("saldo"), context=[1, 2])
+    assert completion.context[:2] == [1, 2]
+    assert len(completion.context) == 4
+
+def test_latency_is_applied(serve):
+    _, url = serve(latency=LatencyModel("fixed", 100))
+    started = time.perf_counter()
+    OllamaClient(url=url).generate(PROMPT.format("saldo"))
+    assert time.perf_counter() - started >= 0.1
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_error_fault_fails_the_completion(serve, stream):
+    _, url = serve(faults=FaultConfig(error_rate=1.0))
+    completion = OllamaClient(url=url).complete(PROMPT.format("saldo"), stream=stream)
+    assert not completion.ok
+
+def test_timeout_fault_trips_the_client_timeout(serve):
+    stub, url = serve(faults=FaultConfig(timeout_rate=1.0, hang_seconds=5))
+    client = OllamaClient(url=url, read_timeout=0.2)
+    completion = client.complete(PROMPT.format("saldo"))
+    assert completion.text.startswith("Timeout")
+    assert client.stats()["timeouts"] == 1
+    assert stub.stats()["faults"]["timeout"] == 1
+
+def test_disconnect_fault_cuts_the_stream(serve):
+    _, url = serve(faults=FaultConfig(disconnect_rate=1.0))
+    completion = OllamaClient(url=url).complete(PROMPT.format("quero transferir 50 para Maria"), stream=True)
+    assert not completion.ok
+
+def test_intent_service_survives_malformed_replies(serve):
+    stub, url = serve(faults=FaultConfig(malformed_rate=1.0))
+    service = IntentService(llm_client=OllamaClient(url=url))
+    for index in range(10):
+        result = service.process_message(f"stub-user-{index}", [], "qual meu saldo?", use_cache=False)
+        assert "intent" in result or "error" in result
+    assert stub.stats()["faults"]["malformed"] == 10
+
+def test_health_endpoints(serve):
+    _, url = serve()
+    base = url.rsplit("/api/", 1)[0]
+    assert requests.get(base + "/").text == "Ollama is running"
+    assert requests.get(base + "/api/tags").json()["models"][0]["name"] == "llama3.2"
+    assert requests.get(base + "/api/unknown").status_code == 404
@@ -0,0 +1,63 @@
+import pytest
+from app.domain.prompt_builder import PromptBuilder, RenderedHistory, render_history
+from app.domain.intent_service import SYSTEM_PROMPT, SYSTEM_PROMPT_PREFIX, TURN_PROMPT
+from app.domain.user_session import UserSession
+
+
+@pytest.fixture
+def builder():
+    return PromptBuilder(SYSTEM_PROMPT_PREFIX.format(user_account_number=123), TURN_PROMPT)
+
+
+def test_rendered_history_appends_incrementally():
+    history = RenderedHistory(["a", "b"])
+    assert history.text == "a\nb"
+    history.append("c")
+    history.extend(["d", "e"])
+    assert history.text == "a\nb\nc\nd\ne"
+    assert len(history.segments()) == 2
+
+
+def test_rendered_history_merges_segments():
+    history = RenderedHistory()
+    for i in range(RenderedHistory.max_segments + 1):
+        history.append(str(i))
+        history.segments()
+    assert len(history.segments()) == 1
+    assert history.text == "\n".join(str(i) for i in range(RenderedHistory.max_segments + 1))
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda h: h.pop(),
+    lambda h: h.pop(0),
+    lambda h: h.insert(0, "x"),
+    lambda h: h.remove("b"),
+    lambda h: h.__setitem__(0, "x"),
+    lambda h: h.__delitem__(slice(0, 2)),
+    lambda h: h.reverse(),
+    lambda h: h.sort(reverse=True),
+    lambda h: h.clear(),
+])
+def test_rendered_history_rerenders_after_mutation(mutate):
+    history = RenderedHistory(["a", "b", "c"])
+    assert history.text == "a\nb\nc"
+    mutate(history)
+    assert history.text == "\n".join(list(history))
+
+
+def test_render_history_accepts_plain_lists():
+    assert render_history(["a", "b"]) == ["a\nb"]
+
+
+def test_build_matches_template_format(builder):
+    history = RenderedHistory(["Rodrigo: oi", "Assistente: {olá}"])
+    expected = SYSTEM_PROMPT.format(history="\n".join(history), user_input="saldo", user_account_number=123)
+    assert builder.build(history.segments(), "saldo") == expected
+    assert builder.build(history.text, "saldo") == expected
+
+
+def test_user_session_wraps_history():
+    session = UserSession("u1", "Rodrigo", "123", ["oi"])
+    session.add_to_history("tudo bem?")
+    assert isinstance(session.history, RenderedHistory)
+    assert session.history.text == "oi\ntudo bem?"
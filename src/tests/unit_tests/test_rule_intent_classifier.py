@@ -0,0 +1,54 @@
+import pytest
+from app.domain.rule_intent_classifier import IntentRule, RuleIntentClassifier
+
+@pytest.fixture
+def classifier():
+    return RuleIntentClassifier()
+
+@pytest.mark.parametrize("message, intent", [
+    ("Qual é o meu saldo?", "get_balance"),
+    ("quanto tenho na conta", "get_balance"),
+    ("Quero ver meu extrato", "get_transactions"),
+    ("mostra minhas transações", "get_transactions"),
+    ("ajuda", "get_help"),
+    ("O que você pode fazer?", "get_help"),
+])
+def test_obvious_intents_are_answered(classifier, message, intent):
+    result = classifier.classify(message)
+    assert result == {
+        "intent": intent,
+        "entities": {},
+        "missing_entities": [],
+        "next_question": ""
+    }
+
+def test_account_type_is_extracted(classifier):
+    result = classifier.classify("Qual o saldo da poupança?")
+    assert result["intent"] == "get_balance"
+    assert result["entities"] == {"account_type": "poupança"}
+
+@pytest.mark.parametrize("message", [
+    "Quero transferir 100 reais para Maria",
+    "Como faço uma transferência?",
+    "Não quero ver o saldo",
+    "Preciso pagar um boleto",
+    "E da poupança?",
+    "Alguma coisa aleatória",
+    "saldo e extrato",
+])
+def test_ambiguous_or_risky_messages_fall_through(classifier, message):
+    assert classifier.classify(message) is None
+
+def test_threshold_controls_fast_path():
+    classifier = RuleIntentClassifier(threshold=0.4)
+    assert classifier.classify("E da poupança?")["intent"] == "get_balance"
+
+def test_custom_rules():
+    classifier = RuleIntentClassifier(rules=[IntentRule("get_help", r"\bmenu\b", 1.0)], blockers=[])
+    assert classifier.classify("menu")["intent"] == "get_help"
+    assert classifier.classify("saldo") is None
+
+def test_stats(classifier):
+    classifier.classify("saldo")
+    classifier.classify("quero transferir")
+    assert classifier.stats() == {"hits": 1, "fallthroughs": 1, "hit_ratio": 0.5}
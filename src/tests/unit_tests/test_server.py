@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import pytest
+from unittest.mock import patch
+from app.domain.intent_service import IntentService
+from app.infra.async_llm_adapter import ConcurrencyLimitedLLM
+from app.infra.fake_llm import AsyncFakeLLM
+from app.ui.server import ConversationServer, SessionRegistry, build_server, encode_ws_frame
+
+@pytest.fixture(autouse=True)
+def isolated_state():
+    with patch('app.domain.intent_service.update_user_state'), \
+         patch('app.domain.intent_service.get_user_state', return_value={}):
+        yield
+
+def _server(latency_ms=0.0, max_concurrency=4):
+    fake = AsyncFakeLLM(latency_ms=latency_ms)
+    limited = ConcurrencyLimitedLLM(fake, max_concurrency=max_concurrency)
+    registry = SessionRegistry(IntentService(async_llm_client=limited))
+    return ConversationServer(registry, llm_client=limited), registry, fake
+
+async def _post(port, path, payload, method="POST"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+def test_http_message_runs_a_turn():
+    async def scenario():
+        server, _, _ = _server()
+        _, port = await server.start("127.0.0.1", 0)
+        try:
+            return await _post(port, "/sessions/rodrigo.barreiros/messages", {"message": "qual meu saldo?", "user_name": "Rodrigo"})
+        finally:
+            await server.close()
+
+    status, reply = asyncio.run(scenario())
+    assert status == 200
+    assert reply["continue"] is True
+    assert "saldo" in reply["message"]
+
+def test_http_errors():
+    async def scenario():
+        server, _, _ = _server()
+        _, port = await server.start("127.0.0.1", 0)
+        try:
+            return [
+                await _post(port, "/sessions/u1/messages", {"texto": "oi"}),
+                await _post(port, "/nada", {"message": "oi"}),
+            ]
+        finally:
+            await server.close()
+
+    (bad_status, _), (missing_status, _) = asyncio.run(scenario())
+    assert bad_status == 400
+    assert missing_status == 404
+
+def test_sessions_are_cached_and_serialized():
+    async def scenario():
+        server, registry, fake = _server(latency_ms=20)
+        replies = await asyncio.gather(*[
+            registry.handle_message("u1", message) for message in ["ajuda", "saldo", "extrato"]
+        ])
+        return replies, registry, fake
+
+    replies, registry, fake = asyncio.run(scenario())
+    assert len(registry) == 1
+    assert len(registry.get("u1").manager.user_session.history) == 3
+    assert fake.max_in_flight == 1
+    assert all(reply["continue"] for reply in replies)
+
+def test_llm_concurrency_limit_applies_across_sessions():
+    async def scenario():
+        server, registry, fake = _server(latency_ms=20, max_concurrency=2)
+        await asyncio.gather(*[registry.handle_message(f"u{i}", "ajuda") for i in range(8)])
+        return registry, fake, server.llm_client.stats()
+
+    registry, fake, stats = asyncio.run(scenario())
+    assert len(registry) == 8
+    assert fake.calls == 8
+    assert fake.max_in_flight == 2
+    assert stats == {"max_concurrency": 2, "running": 0, "waiting": 0, "calls": 8}
+
+def test_forget_drops_session_and_state():
+    _, registry, _ = _server()
+    registry.get("u1")
+    with patch('app.domain.intent_service.clear_user_state') as clear:
+        assert asyncio.run(registry.forget("u1")) is True
+        assert asyncio.run(registry.forget("u1")) is False
+    assert len(registry) == 0
+    clear.assert_called_with("u1")
+
+def test_forget_waits_for_the_running_turn():
+    events = []
+
+    async def scenario():
+        _, registry, _ = _server(latency_ms=30)
+        turn = asyncio.ensure_future(registry.handle_message("u1", "ajuda"))
+        await asyncio.sleep(0.01)
+        forgotten = asyncio.ensure_future(registry.forget("u1"))
+        await asyncio.sleep(0)
+        # Arrives while the forget waits for the running turn, so it starts a fresh session
+        queued = asyncio.ensure_future(registry.handle_message("u1", "saldo"))
+        await asyncio.gather(turn, forgotten, queued)
+        return registry
+
+    with patch('app.domain.intent_service.update_user_state', side_effect=lambda *args: events.append("update")), \
+         patch('app.domain.intent_service.clear_user_state', side_effect=lambda user_id: events.append("clear")):
+        registry = asyncio.run(scenario())
+    assert events == ["update", "clear", "update"]
+    assert registry.get("u1").manager.user_session.history[0].endswith("saldo")
+    assert len(registry) == 1
+
+def test_registry_evicts_least_recently_used_sessions():
+    async def scenario():
+        registry = SessionRegistry(IntentService(async_llm_client=AsyncFakeLLM(latency_ms=0)), max_sessions=2)
+        for user_id in ["u1", "u2", "u1", "u3"]:
+            await registry.handle_message(user_id, "ajuda")
+        return registry
+
+    registry = asyncio.run(scenario())
+    assert list(registry._sessions) == ["u1", "u3"]
+
+def test_registry_evicts_idle_sessions():
+    _, registry, _ = _server()
+    registry.idle_ttl = 60
+    registry.get("u1").last_used -= 120
+    registry.get("u2")
+    assert asyncio.run(registry.evict_idle()) == 1
+    assert list(registry._sessions) == ["u2"]
+
+def test_http_delete_forgets_session():
+    async def scenario():
+        server, registry, _ = _server()
+        _, port = await server.start("127.0.0.1", 0)
+        try:
+            await registry.handle_message("u1", "ajuda")
+            deleted = await _post(port, "/sessions/u1", {}, method="DELETE")
+            wrong_method = await _post(port, "/sessions/u1", {})
+            return deleted, wrong_method, len(registry)
+        finally:
+            await server.close()
+
+    deleted, wrong_method, sessions = asyncio.run(scenario())
+    assert deleted == (200, {"forgotten": True})
+    assert wrong_method[0] == 405
+    assert sessions == 0
+
+def test_sessions_share_one_bank_service():
+    _, registry, _ = _server()
+    first = registry.get("u1").manager.intent_handler.bank_service
+    second = registry.get("u2").manager.intent_handler.bank_service
+    assert first is second is registry.bank_service
+
+def test_ledger_is_in_memory_by_default():
+    assert build_server(llm="fake").registry.bank_service.journal is None
+
+def test_ledger_dir_keeps_transfers_across_restarts(tmp_path):
+    server = build_server(llm="fake", ledger_dir=str(tmp_path))
+    server.registry.bank_service.transfer("rodrigo.barreiros", "corrente", "Maria", 50.0)
+    server.registry.bank_service.close()
+
+    restarted = build_server(llm="fake", ledger_dir=str(tmp_path))
+    assert restarted.registry.bank_service.get_balance("rodrigo.barreiros", "corrente")[0] == 1450.0
+    restarted.registry.bank_service.close()
+
+def test_websocket_round_trip():
+    async def scenario():
+        server, _, _ = _server()
+        _, port = await server.start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(
+                b"GET /sessions/u1/ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            )
+            handshake = await reader.readuntil(b"\r\n\r\n")
+            mask = os.urandom(4)
+            writer.write(encode_ws_frame(json.dumps({"message": "ajuda"}).encode(), mask=mask))
+            writer.write(encode_ws_frame(b"sair", mask=mask))
+            await writer.drain()
+            replies = []
+            for _ in range(3):
+                first, length = await reader.readexactly(2)
+                if length == 126:
+                    length = int.from_bytes(await reader.readexactly(2), "big")
+                payload = await reader.readexactly(length)
+                replies.append((first & 0x0F, payload))
+            return handshake, replies
+        finally:
+            writer.close()
+            await server.close()
+
+    handshake, replies = asyncio.run(scenario())
+    assert b"101 Switching Protocols" in handshake
+    assert b"Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=" in handshake
+    help_reply, exit_reply, close_frame = replies
+    assert json.loads(help_reply[1])["continue"] is True
+    assert json.loads(exit_reply[1])["continue"] is False
+    assert close_frame[0] == 0x8
@@ -0,0 +1,146 @@
+import json
+import sqlite3
+import pytest
+from unittest.mock import MagicMock
+from app.application.conversation_manager import ConversationManager
+from app.domain import state_repository
+from app.domain.user_session import UserSession
+from app.infra.sqlite_store import SQLiteStore
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "assistant.db")
+
+@pytest.fixture
+def store(db_path):
+    store = SQLiteStore(db_path)
+    yield store
+    store.close()
+
+def test_uses_wal_mode(store):
+    assert store._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_state_survives_restart(db_path):
+    first = SQLiteStore(db_path)
+    first.update("u1", {"intent": "transfer", "missing_entities": ["amount"]})
+    first.close()
+
+    second = SQLiteStore(db_path)
+    assert second.get("u1")["missing_entities"] == ["amount"]
+    assert second.get("u2")["intent"] is None
+    second.close()
+
+def test_writes_are_grouped_until_flush(store, db_path):
+    store.update("u1", {"intent": "get_balance"})
+    store.update("u2", {"intent": "get_help"})
+    store.save_session(UserSession("u1", "Rodrigo", "000123", ["Rodrigo: saldo"]))
+    other = SQLiteStore(db_path)
+    assert other.get("u1")["intent"] is None
+
+    # Two states, one session and its history line
+    assert store.flush() == 4
+    assert store.stats()["flushes"] == 1
+    other._cache.clear()
+    assert other.get("u1")["intent"] == "get_balance"
+    other.close()
+
+def test_reads_go_through_the_cache(store):
+    store.get("u1")
+    store.get("u1")
+    stats = store.stats()
+    assert stats["cache_misses"] == 1
+    assert stats["cache_hits"] == 1
+
+def test_evicting_dirty_entries_flushes_them(db_path):
+    store = SQLiteStore(db_path, cache_size=1)
+    store.update("u1", {"intent": "transfer"})
+    store.get("u2")
+    assert store.stats()["cached"] == 1
+    assert store.get("u1")["intent"] == "transfer"
+    store.close()
+
+def test_clear_removes_persisted_state(store):
+    store.update("u1", {"intent": "transfer"})
+    store.flush()
+    store.clear("u1")
+    assert store.get("u1")["intent"] is None
+    store.flush()
+    store._cache.clear()
+    assert store.get("u1")["intent"] is None
+
+def test_session_round_trip(store, db_path):
+    session = UserSession("u1", "Rodrigo", "000123", ["Rodrigo: oi"], {"intent": "transfer", "missing_entities": ["amount"]})
+    store.save_session(session)
+    store.flush()
+    restored = SQLiteStore(db_path).load_session("u1")
+    assert restored.history == ["Rodrigo: oi"]
+    assert restored.previous_result["missing_entities"] == ["amount"]
+    assert store.load_session("nobody") is None
+
+def test_unknown_session_is_none(db_path):
+    store = SQLiteStore(db_path)
+    assert store.load_session("nobody") is None
+    store.close()
+
+def test_changes_made_in_place_are_written_back(store, db_path):
+    store.get("u1")["missing_entities"] = ["amount"]
+    assert store.flush() == 1
+    assert store.flush() == 0
+    other = SQLiteStore(db_path)
+    assert other.get("u1")["missing_entities"] == ["amount"]
+    other.close()
+
+def test_reads_alone_write_nothing(store):
+    store.get("u1")
+    assert store.flush() == 0
+
+def test_history_lines_are_appended(store, db_path):
+    session = UserSession("u1", "Rodrigo", "000123", ["Rodrigo: oi", "Magie: Olá!"])
+    store.save_session(session)
+    assert store.flush() == 3
+    session.add_to_history("Rodrigo: saldo")
+    store.save_session(session)
+    assert store.flush() == 2
+    assert store.load_session("u1").history == ["Rodrigo: oi", "Magie: Olá!", "Rodrigo: saldo"]
+
+def test_replaced_history_is_rewritten(store):
+    store.save_session(UserSession("u1", "Rodrigo", "000123", ["Rodrigo: oi", "Magie: Olá!"]))
+    store.flush()
+    store.save_session(UserSession("u1", "Rodrigo", "000123", ["Rodrigo: extrato"]))
+    store.flush()
+    assert store.load_session("u1").history == ["Rodrigo: extrato"]
+
+def test_migrates_history_out_of_session_rows(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        "CREATE TABLE user_session (user_id TEXT PRIMARY KEY, user_name TEXT NOT NULL, account_number TEXT NOT NULL, "
+        "history TEXT NOT NULL, previous_result TEXT NOT NULL, updated_at REAL NOT NULL)"
+    )
+    connection.execute(
+        "INSERT INTO user_session VALUES (?, ?, ?, ?, ?, ?)",
+        ("u1", "Rodrigo", "000123", json.dumps(["Rodrigo: oi"]), "{}", 0.0)
+    )
+    connection.commit()
+    connection.close()
+
+    store = SQLiteStore(db_path)
+    assert store.load_session("u1").history == ["Rodrigo: oi"]
+    store.close()
+
+def test_works_as_state_repository_backend(store):
+    previous = state_repository.set_state_store(store)
+    try:
+        state_repository.update_user_state("u1", {"intent": "get_help"})
+        assert state_repository.get_user_state("u1")["intent"] == "get_help"
+    finally:
+        state_repository.set_state_store(previous)
+
+def test_conversation_manager_persists_each_turn():
+    session_store = MagicMock()
+    session = UserSession("u1", "Rodrigo", "000123", [])
+    manager = ConversationManager(session, MagicMock(), MagicMock(), "Magie", MagicMock(), session_store=session_store)
+
+    manager.process_message("sair")
+
+    session_store.save_session.assert_called_once_with(session)
+    session_store.flush.assert_called_once()
@@ -1,6 +1,7 @@
 import unittest
 import pytest
-from app.domain.state_repository import get_user_state, update_user_state, clear_user_state
+import threading
+from app.domain.state_repository import StateStore, get_user_state, update_user_state, clear_user_state
 
 class TestStateStore(unittest.TestCase):
 
@@ -16,3 +17,60 @@ class TestStateStore(unittest.TestCase):
         state = get_user_state(user_id)
         self.assertEqual(state["intent"], "make_transfer")
         clear_user_state(user_id)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_entries_expire():
+    clock = FakeClock()
+    store = StateStore(num_shards=1, ttl_seconds=10, clock=clock)
+    store.update("a", {"intent": "transfer"})
+    clock.now = 5
+    store.get("b")
+    clock.now = 12
+    assert store.get("b")["intent"] is None
+    assert store.get("a")["intent"] is None
+    assert store.stats()["expirations"] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    store = StateStore(num_shards=1, max_entries=2)
+    store.update("a", {"intent": "get_balance"})
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    stats = store.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert store.get("a")["intent"] == "get_balance"
+
+
+def test_shards_share_the_capacity():
+    store = StateStore(num_shards=4, max_entries=100)
+    for i in range(1000):
+        store.get(f"user-{i}")
+    stats = store.stats()
+    assert len(stats["shard_occupancy"]) == 4
+    assert max(stats["shard_occupancy"]) <= 25
+    assert stats["entries"] + stats["evictions"] == 1000
+
+
+def test_concurrent_updates_are_not_lost():
+    store = StateStore(num_shards=2)
+
+    def worker(n):
+        for i in range(200):
+            store.update(f"user-{i % 10}", {f"worker-{n}": i})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(len(store.get(f"user-{i}")) == 4 + 8 for i in range(10))
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+from app.domain.intent_classifier import normalize_text
+from app.domain.tfidf_intent_classifier import (
+    DEFAULT_CORPORA,
+    TfidfIntentClassifier,
+    holdout_path,
+    load_examples,
+    main,
+    split_examples,
+)
+
+@pytest.fixture(scope="module")
+def classifier():
+    return TfidfIntentClassifier(model_path=None).train(load_examples(DEFAULT_CORPORA))
+
+def test_load_examples_reads_every_format():
+    examples = load_examples(DEFAULT_CORPORA)
+    assert ("Preciso transferir dinheiro", "transfer") in examples
+    assert ("Quero enviar 500 para João", "transfer") in examples
+    assert ("extrato", "get_transactions") in examples
+    # Follow-up steps without an explicit intent are not used for training
+    assert all(text != "Para o João" for text, _ in examples)
+
+@pytest.mark.parametrize("message, intent", [
+    ("qual meu saldo?", "get_balance"),
+    ("Me mostra minhas movimentações", "get_transactions"),
+    ("ajuda", "get_help"),
+])
+def test_confident_predictions_are_answered(classifier, message, intent):
+    result = classifier.classify(message)
+    assert result["intent"] == intent
+    assert result["missing_entities"] == []
+    assert classifier.threshold <= result["confidence"] <= 1.0
+
+def test_transfer_is_deferred_to_llm(classifier):
+    intent, probability = classifier.predict("Quero transferir 100 reais para Maria")
+    assert intent == "transfer"
+    assert classifier.classify("Quero transferir 100 reais para Maria") is None
+
+def test_low_confidence_is_deferred(classifier):
+    classifier.threshold = 0.99
+    try:
+        assert classifier.classify("E da poupança?") is None
+    finally:
+        classifier.threshold = 0.7
+
+def test_save_and_load_at_construction(classifier, tmp_path):
+    path = classifier.save(tmp_path / "model.pkl")
+    loaded = TfidfIntentClassifier(model_path=path)
+    assert loaded._pipeline is not None
+    assert loaded.predict("extrato")[0] == "get_transactions"
+
+def test_missing_model_is_trained_at_construction(tmp_path):
+    classifier = TfidfIntentClassifier(model_path=tmp_path / "missing.pkl")
+    assert classifier._pipeline is not None
+    assert not (tmp_path / "missing.pkl").exists()
+
+def test_unloaded_model_must_be_trained(tmp_path):
+    classifier = TfidfIntentClassifier(model_path=tmp_path / "model.pkl", load=False)
+    with pytest.raises(RuntimeError):
+        classifier.predict("extrato")
+
+def test_evaluate_reports_accuracy_and_latency(classifier):
+    report = classifier.evaluate([("saldo", "get_balance"), ("extrato", "get_transactions")])
+    assert report["examples"] == 2
+    assert report["accuracy"] == 1.0
+    assert report["latency_mean_ms"] > 0
+
+def test_split_examples_is_stratified():
+    examples = [(f"saldo {i}", "get_balance") for i in range(10)] + [(f"extrato {i}", "get_transactions") for i in range(10)]
+    train, test = split_examples(examples, 0.2)
+    assert len(train) == 16
+    assert sorted(intent for _, intent in test) == ["get_balance"] * 2 + ["get_transactions"] * 2
+
+def test_split_examples_keeps_copies_together():
+    examples = [("Saldo", "get_balance"), ("SALDO", "get_balance")] + [(f"saldo {i}", "get_balance") for i in range(8)]
+    for seed in range(10):
+        train, test = split_examples(examples, 0.5, seed)
+        sides = {text in dict(test) for text in ("Saldo", "SALDO")}
+        assert len(sides) == 1
+
+def test_cli_train_and_evaluate(tmp_path, capsys):
+    model_path = tmp_path / "model.pkl"
+    main(["train", "--output", str(model_path), "--holdout", "0.2"])
+    assert model_path.exists()
+    main(["evaluate", "--model", str(model_path)])
+    assert '"accuracy"' in capsys.readouterr().out
+
+def test_cli_evaluate_defaults_to_heldout_split(tmp_path, capsys):
+    model_path = tmp_path / "model.pkl"
+    main(["train", "--output", str(model_path), "--holdout", "0.2"])
+    train, test = split_examples(load_examples(DEFAULT_CORPORA), 0.2)
+    assert load_examples([holdout_path(model_path)]) == test
+    assert not {normalize_text(text) for text, _ in train} & {normalize_text(text) for text, _ in test}
+    capsys.readouterr()
+    main(["evaluate", "--model", str(model_path)])
+    assert json.loads(capsys.readouterr().out)["examples"] == len(test)
+
+def test_cli_evaluate_without_heldout_split_fails(tmp_path):
+    model_path = tmp_path / "model.pkl"
+    main(["train", "--output", str(model_path), "--holdout", "0"])
+    with pytest.raises(SystemExit):
+        main(["evaluate", "--model", str(model_path)])
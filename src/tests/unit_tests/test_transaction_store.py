@@ -0,0 +1,133 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from app.domain.transaction_store import TransactionStore
+
+def _tx(to, amount=10.0, timestamp=0.0, type="transfer", from_account="corrente"):
+    return SimpleNamespace(type=type, to=to, amount=amount, from_account=from_account, timestamp=timestamp)
+
+@pytest.fixture
+def store():
+    store = TransactionStore()
+    for index in range(10):
+        store.append(_tx(f"user{index}", amount=index + 0.5, timestamp=100.0 + index))
+    return store
+
+def test_append_and_iterate_round_trips_rows():
+    store = TransactionStore()
+    store.append(_tx("Maria", amount=12.34, timestamp=5.0))
+    assert len(store) == 1
+    assert list(store) == [{"type": "transfer", "to": "Maria", "amount": 12.34, "from_account": "corrente", "timestamp": 5.0}]
+
+def test_amounts_round_like_the_ledger():
+    store = TransactionStore()
+    store.append(_tx("Maria", amount=1.005))
+    assert next(iter(store))["amount"] == 1.01
+
+def test_query_without_arguments_returns_everything(store):
+    page = store.query()
+    assert [row["to"] for row in page.transactions] == [f"user{index}" for index in range(10)]
+    assert page.next_cursor is None
+
+def test_limit_returns_latest_rows_oldest_first(store):
+    page = store.query(limit=3)
+    assert [row["to"] for row in page.transactions] == ["user7", "user8", "user9"]
+    assert page.next_cursor == 7
+
+def test_cursor_pages_back_to_the_start(store):
+    seen, cursor = [], None
+    while True:
+        page = store.query(limit=4, cursor=cursor)
+        seen = page.transactions + seen
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert [row["to"] for row in seen] == [f"user{index}" for index in range(10)]
+
+def test_time_range_is_half_open(store):
+    page = store.query(start=102.0, end=105.0)
+    assert [row["timestamp"] for row in page.transactions] == [102.0, 103.0, 104.0]
+    assert store.count_between(102.0, 105.0) == 3
+    assert store.query(start=200.0).transactions == []
+
+def test_limit_within_range_pages_inside_range(store):
+    page = store.query(limit=2, start=102.0, end=106.0)
+    assert [row["timestamp"] for row in page.transactions] == [104.0, 105.0]
+    page = store.query(limit=2, cursor=page.next_cursor, start=102.0, end=106.0)
+    assert [row["timestamp"] for row in page.transactions] == [102.0, 103.0]
+    assert page.next_cursor is None
+
+def test_backwards_timestamps_are_clamped():
+    store = TransactionStore()
+    store.append(_tx("a", timestamp=10.0))
+    store.append(_tx("b", timestamp=5.0))
+    assert [row["timestamp"] for row in store] == [10.0, 10.0]
+
+def test_repeated_strings_are_interned():
+    store = TransactionStore()
+    for _ in range(100):
+        store.append(_tx("Maria"))
+    assert store._strings.values == ["transfer", "Maria", "corrente"]
+
+def test_only_requested_rows_are_materialized(store):
+    built = []
+
+    def row_factory(**fields):
+        built.append(fields)
+        return fields
+
+    store.row_factory = row_factory
+    store.query(limit=5)
+    assert len(built) == 5
+
+def test_concurrent_appends_keep_every_row():
+    store = TransactionStore()
+
+    def worker(name):
+        for index in range(200):
+            store.append(_tx(name, timestamp=float(index)))
+
+    threads = [threading.Thread(target=worker, args=(f"w{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store) == 800
+    timestamps = [row["timestamp"] for row in store]
+    assert timestamps == sorted(timestamps)
+
+def test_pop_removes_the_newest_row(store):
+    row = store.pop()
+    assert row["to"] == "user9"
+    assert len(store) == 9
+    assert [row["to"] for row in store][-1] == "user8"
+    store.append(_tx("again"))
+    assert [row["to"] for row in store][-1] == "again"
+
+def test_reads_never_see_popped_rows(store):
+    errors = []
+    done = threading.Event()
+
+    def undo_loop():
+        for index in range(2000):
+            store.append(_tx("undone", timestamp=1000.0 + index))
+            store.pop()
+        done.set()
+
+    def reader():
+        while not done.is_set():
+            try:
+                store.query(limit=3)
+                store.query(start=100.0, end=2000.0)
+                list(store)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=undo_loop), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(store) == 10